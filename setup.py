@@ -17,6 +17,9 @@ setup(
         "pycaw; platform_system == 'Windows'",
         "pyobjc; platform_system == 'Darwin'"
     ],
+    extras_require={
+        "zello": ["opuslib"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
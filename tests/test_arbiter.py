@@ -0,0 +1,111 @@
+import threading
+import time
+
+from zpttlink.arbiter import PttArbiter, TimerWheel
+
+
+def test_timer_fires_after_delay():
+    wheel = TimerWheel(tick_ms=5.0).start()
+    try:
+        fired = threading.Event()
+        started = time.monotonic()
+        wheel.schedule(0.05, fired.set)
+        assert fired.wait(1.0)
+        assert 0.045 <= time.monotonic() - started < 0.2
+    finally:
+        wheel.stop()
+
+
+def test_cancelled_timer_does_not_fire():
+    wheel = TimerWheel(tick_ms=5.0).start()
+    try:
+        fired = threading.Event()
+        wheel.cancel(wheel.schedule(0.02, fired.set))
+        assert not fired.wait(0.1)
+        assert wheel.pending == 0
+    finally:
+        wheel.stop()
+
+
+def test_timer_scheduled_on_idle_wheel_is_not_skipped():
+    wheel = TimerWheel(tick_ms=5.0).start()
+    try:
+        first = threading.Event()
+        wheel.schedule(0.0, first.set)
+        assert first.wait(1.0)
+        time.sleep(0.05)
+
+        # Hold the wheel lock so its thread wakes several ticks after the timer was
+        # due; it used to jump straight to "now" and miss the slot until wrap-around.
+        fired = threading.Event()
+        with wheel.cond:
+            wheel.schedule(0.0, fired.set)
+            time.sleep(0.03)
+        assert fired.wait(0.2)
+    finally:
+        wheel.stop()
+
+
+class SlowPtt:
+    """A backend whose writes take write_s, like a USB control transfer."""
+
+    def __init__(self, write_s=0.05):
+        self.write_s = write_s
+        self.calls = []
+
+    def down(self, source="unknown"):
+        time.sleep(self.write_s)
+        self.calls.append(("down", threading.current_thread().name))
+
+    def up(self, source="unknown"):
+        time.sleep(self.write_s)
+        self.calls.append(("up", threading.current_thread().name))
+
+
+def wait_for(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not predicate():
+        time.sleep(0.005)
+    return predicate()
+
+
+def make_arbiter(ptt):
+    wheel = TimerWheel(tick_ms=5.0).start()
+    arbiter = PttArbiter(ptt, wheel=wheel)
+    arbiter.add_source("vox", priority=1)
+    return wheel, arbiter
+
+
+def test_backend_writes_run_off_the_caller_thread():
+    ptt = SlowPtt()
+    wheel, arbiter = make_arbiter(ptt)
+    try:
+        started = time.monotonic()
+        arbiter.set("vox", True)
+        arbiter.set("vox", False)
+        # The caller (the audio callback, for VOX) never waits for the backend.
+        assert time.monotonic() - started < 0.02
+        assert wait_for(lambda: len(ptt.calls) == 2)
+        assert [kind for kind, _ in ptt.calls] == ["down", "up"]
+        assert all(name == "ptt-writer" for _, name in ptt.calls)
+    finally:
+        arbiter.close()
+        wheel.stop()
+
+
+def test_reset_drops_writes_not_yet_started():
+    ptt = SlowPtt(write_s=0.1)
+    wheel, arbiter = make_arbiter(ptt)
+    try:
+        arbiter.set("vox", True)
+        assert wait_for(lambda: arbiter.writer.busy)
+        arbiter.set("vox", False)
+        # Returns once the write in progress is done; the queued release is dropped
+        # because the caller forces PTT off itself.
+        arbiter.reset()
+        assert [kind for kind, _ in ptt.calls] == ["down"]
+        time.sleep(0.15)
+        assert [kind for kind, _ in ptt.calls] == ["down"]
+    finally:
+        arbiter.close()
+        wheel.stop()
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from zpttlink import dtmf, main, radio
+from zpttlink.bench import dtmf_digits, speech_like
+
+RATE = 48000
+BLOCK = 480
+
+
+def decode(signal, blocksize=BLOCK):
+    decoder = dtmf.DtmfDecoder(RATE)
+    for i in range(0, len(signal) - blocksize + 1, blocksize):
+        decoder.process(signal[i:i + blocksize])
+    return "".join(digit for digit, _ in decoder.digits)
+
+
+def test_decodes_keyed_sequence():
+    keys = "1234*0#D"
+    signal = np.concatenate([dtmf_digits(RATE, keys), np.zeros(RATE // 5, np.float32)])
+    assert decode(signal) == keys
+
+
+def test_speech_gives_no_digits():
+    assert decode(speech_like(RATE, 10.0, 0.5)) == ""
+
+
+def test_commands_need_the_pin():
+    ran = dtmf.DtmfCommands("1234", {"10": "link_disable"}, max_failures=2, lockout_s=60.0)
+    keyed = lambda keys, now: [ran.feed(k, now) for k in keys][-1]  # noqa: E731
+    assert keyed("123410#", 0.0) == "link_disable"
+    assert keyed("999910#", 1.0) is None
+    assert keyed("12*123410#", 2.0) == "link_disable"
+    assert ran.entering(2.0) is False
+    ran.feed("1", 3.0)
+    assert not ran.entering(3.0)
+    ran.feed("2", 3.1)
+    assert ran.entering(3.1) and not ran.entering(9.0)
+    ran.feed("9", 3.2)
+    assert not ran.entering(3.2)
+    # Two wrong PINs in a row lock DTMF out, even for the right one.
+    assert keyed("000010#", 10.0) is None
+    assert keyed("000010#", 10.5) is None
+    assert keyed("123410#", 11.0) is None
+    assert ran.stats(11.0)["locked_out_s"] > 0
+
+
+def test_clip_command_needs_its_clip():
+    cfg = {"enabled": True, "pin": "1234", "commands": {"90": "force_id"}}
+    actions = ("force_id",)
+    with pytest.raises(RuntimeError, match="clips.callsign"):
+        dtmf.build_dtmf(cfg, RATE, actions)
+    with pytest.raises(RuntimeError, match="'id' clip"):
+        dtmf.build_dtmf(cfg, RATE, actions, clips=("courtesy",))
+    assert dtmf.build_dtmf(cfg, RATE, actions, clips=("id",)) is not None
+
+
+def prepare_link(**overrides):
+    cfg = main.merge_defaults(main.DEFAULT_CONFIG, dict({
+        "vox": {"threshold": 0.01, "log_levels": False},
+        "audio": {"dc_block": False, "tx_gain": 1.0},
+    }, **overrides))
+    args = main.build_arg_parser().parse_args(["--dry-run", "--vox"])
+    rt = main.LinkRuntime(cfg, args)
+    ch = rt.channels[0]
+    ch.open(backend=radio.RadioInterfaceBase())
+    try:
+        ch.sync_params()
+        ch.prepare(RATE, BLOCK)
+    except Exception:
+        ch.close()
+        raise
+    return rt, ch
+
+
+def test_force_id_without_an_id_clip_fails_startup():
+    keyed = {"enabled": True, "pin": "1234", "commands": {"90": "force_id"}}
+    with pytest.raises(RuntimeError, match="force_id"):
+        prepare_link(dtmf=keyed)
+    _, ch = prepare_link(dtmf=keyed, clips={"enabled": True, "callsign": "N0CALL"})
+    ch.close()
+
+
+def run_link(signal, mute=True):
+    rt, ch = prepare_link(dtmf={"enabled": True, "pin": "1234", "mute": mute})
+    out = np.zeros((len(signal) // BLOCK, BLOCK, 1), dtype=np.float32)
+    try:
+        for i, block in enumerate(signal[:len(out) * BLOCK].reshape(-1, BLOCK, 1)):
+            rt.audio_callback(block, out[i], BLOCK, None, None)
+            ch.poll_dtmf()
+    finally:
+        ch.close()
+    return ch, out.reshape(-1)
+
+
+@pytest.mark.parametrize("mute", [True, False])
+def test_keyed_pin_is_silent_on_tx(mute):
+    before = speech_like(RATE, 0.5, 0.2, seed=1)
+    keys = dtmf_digits(RATE, "123421#")
+    after = speech_like(RATE, 1.0, 0.2, seed=2)
+    ch, out = run_link(np.concatenate([before, keys, after]), mute=mute)
+    assert ch.chain.dtmf_commands.accepted == 1
+
+    delay = ch.chain.preroll.frames if ch.chain.preroll is not None else 0
+    start = len(before) + delay
+    end = start + len(keys)
+    peak = np.max(np.abs(out[start:end]))
+    if mute:
+        assert delay >= RATE * dtmf.MUTE_LOOKAHEAD_MS / 1000.0
+        assert peak == 0.0
+        # Voice on either side still gets through.
+        assert np.max(np.abs(out[delay:start])) > 0.05
+        assert np.max(np.abs(out[end + RATE // 10:])) > 0.05
+    else:
+        assert peak > 0.1
+
+
+def test_stray_digit_does_not_mute_voice():
+    before = speech_like(RATE, 0.5, 0.2, seed=1)
+    # The first digit of the PIN, keyed once and never followed up.
+    stray = dtmf_digits(RATE, "1")
+    after = speech_like(RATE, 5.0, 0.2, seed=2)
+    ch, out = run_link(np.concatenate([before, stray, after]))
+    assert ch.chain.dtmf_commands.buffer == "1"
+
+    delay = ch.chain.preroll.frames
+    start = len(before) + delay
+    end = start + len(stray)
+    assert np.max(np.abs(out[start:end])) == 0.0
+    # Only the tone and the delay-line hold are muted; the voice after it is not.
+    resumed = end + delay + 2 * BLOCK
+    voiced = np.abs(out[resumed:]).reshape(-1, RATE // 10).max(axis=1)
+    assert np.all(voiced > 0.01)
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+import pytest
+
+from zpttlink import engines
+
+
+def test_needs_jack_client(monkeypatch):
+    monkeypatch.setattr(engines, "jack", None)
+    with pytest.raises(RuntimeError, match="JACK-Client"):
+        engines.JackEngine(lambda *a: None)
+
+
+@pytest.fixture
+def jack_server():
+    """A running JACK server (for example `jackd -d dummy`), or skip."""
+    try:
+        import jack
+    except Exception as e:
+        # The module raises OSError, not ImportError, when libjack is missing.
+        pytest.skip(f"JACK-Client not usable: {e}")
+    try:
+        probe = jack.Client("zpttlink-probe", no_start_server=True)
+    except Exception as e:
+        pytest.skip(f"no JACK server running: {e}")
+    probe.close()
+    return jack
+
+
+@pytest.fixture
+def peer(jack_server):
+    """A second client that plays a constant into the engine and records what comes back."""
+    client = jack_server.Client("zpttlink-peer", no_start_server=True)
+    out = client.outports.register("out")
+    inp = client.inports.register("in")
+    heard = []
+    got = threading.Event()
+
+    @client.set_process_callback
+    def process(frames):
+        out.get_array()[:] = 0.25
+        block = inp.get_array()
+        if np.any(block):
+            heard.append(float(np.max(block)))
+            got.set()
+
+    client.activate()
+    client.heard, client.got = heard, got
+    yield client
+    client.deactivate()
+    client.close()
+
+
+def test_ports_shaping_and_latency(peer):
+    calls = []
+
+    def callback(indata, outdata, frames, time_info, status):
+        calls.append((frames, time_info.outputBufferDacTime - time_info.currentTime))
+        np.multiply(indata, 2.0, out=outdata)
+
+    engine = engines.JackEngine(
+        callback, channels=(1, 1), client_name="zpttlink-test",
+        connect_inputs=["zpttlink-peer:out"], connect_outputs=["zpttlink-peer:in"],
+    )
+    try:
+        name = engine.client.name
+        ports = {p.name for p in engine.client.get_ports(f"{name}:")}
+        assert ports == {f"{name}:in_1", f"{name}:out_1"}
+        assert engine.samplerate == peer.samplerate
+        assert engine.blocksize == peer.blocksize
+
+        engine.start()
+        assert engine.active
+        assert peer.got.wait(2.0)
+        # The process cycle ran the callback on in_1 and wrote the shaped block to out_1.
+        assert max(peer.heard) == pytest.approx(0.5)
+        assert all(frames == engine.blocksize for frames, _ in calls)
+        assert all(ahead > 0 for _, ahead in calls)
+
+        period = engine.blocksize / float(engine.samplerate)
+        capture, playback = engine.latency()
+        assert capture >= period and playback >= period
+        assert engine.stats() == {"xruns": engine.xruns}
+    finally:
+        engine.stop()
+        engine.close()
+    assert not engine.active
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from zpttlink.ptt import PttScheduler
+
+
+class FakePtt:
+    """Records the PTT line changes the scheduler makes."""
+
+    hotkeys = False
+
+    def __init__(self):
+        self.is_down = False
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def down(self, source="unknown"):
+        with self.lock:
+            self.is_down = True
+            self.calls.append("down")
+
+    def up(self, source="unknown"):
+        with self.lock:
+            self.is_down = False
+            self.calls.append("up")
+
+    def force_off(self, source="unknown"):
+        self.up(source)
+
+
+def make(**kw):
+    ptt = FakePtt()
+    return ptt, PttScheduler(ptt, **kw)
+
+
+def test_events_follow_latency():
+    ptt, sched = make(keyup_ms=0, tail_ms=0)
+    try:
+        sched.latency = 0.05
+        started = time.monotonic()
+        sched.down("test")
+        time.sleep(0.02)
+        assert ptt.calls == []
+        time.sleep(0.08)
+        assert ptt.calls == ["down"]
+        assert sched.last_wake_ms < 5.0
+        assert time.monotonic() - started >= 0.05
+    finally:
+        sched.close()
+
+
+def test_rekey_inside_tail_keeps_ptt_down():
+    ptt, sched = make(keyup_ms=40, tail_ms=200)
+    try:
+        sched.down("test")
+        time.sleep(0.05)
+        assert ptt.calls == ["down"]
+        sched.up("test")
+        time.sleep(0.05)
+        # Re-keyed 50 ms into a 200 ms tail: the new key-up lead lands before the
+        # pending release, which must be dropped rather than run afterwards.
+        sched.down("test")
+        time.sleep(0.3)
+        assert ptt.calls == ["down", "down"]
+        assert ptt.is_down
+        assert sched.stats()["pending"] == 0
+    finally:
+        sched.close()
+
+
+def test_rekey_after_tail_releases_first():
+    ptt, sched = make(keyup_ms=0, tail_ms=30)
+    try:
+        sched.down("test")
+        sched.up("test")
+        time.sleep(0.1)
+        sched.down("test")
+        time.sleep(0.05)
+        assert ptt.calls == ["down", "up", "down"]
+        assert ptt.is_down
+    finally:
+        sched.close()
+
+
+def test_release_inside_keyup_lead_is_kept_in_order():
+    ptt, sched = make(keyup_ms=0, tail_ms=20)
+    try:
+        sched.latency = 0.05
+        sched.down("test")
+        sched.up("test")
+        time.sleep(0.15)
+        assert ptt.calls == ["down", "up"]
+        assert not ptt.is_down
+    finally:
+        sched.close()
+
+
+def test_force_off_cancels_pending():
+    ptt, sched = make(keyup_ms=0, tail_ms=0)
+    try:
+        sched.latency = 0.1
+        sched.down("test")
+        sched.force_off("test")
+        time.sleep(0.15)
+        assert ptt.calls == ["up"]
+    finally:
+        sched.close()
@@ -0,0 +1,38 @@
+import os
+
+from zpttlink.recorder import TxRecorder
+
+
+def touch(directory, name, age_s, size=1000):
+    path = directory / name
+    path.write_bytes(b"\0" * size)
+    when = 1_700_000_000 - age_s
+    os.utime(path, (when, when))
+    return path
+
+
+def test_quota_only_removes_this_recorders_files(tmp_path):
+    others = [
+        touch(tmp_path, "20240101-000000.000-b.wav", 900),
+        touch(tmp_path, "20240101-000000.000-a-b.wav", 800),
+        touch(tmp_path, "my-notes.wav", 700),
+        touch(tmp_path, "20240101-000000.000-a.flac.bak", 600),
+    ]
+    own = [touch(tmp_path, f"20240101-00000{i}.000-a.wav", 500 - i) for i in range(4)]
+    own.append(touch(tmp_path, "20240101-000009.000-a.flac", 10))
+
+    TxRecorder(str(tmp_path), 8000, source="a", max_files=2, max_total_mb=0).enforce_quota()
+
+    assert all(p.exists() for p in others)
+    assert [p.exists() for p in own] == [False, False, False, True, True]
+
+
+def test_quota_by_size_counts_only_own_files(tmp_path):
+    big = touch(tmp_path, "20240101-000000.000-other.wav", 900, size=3 * 1024 * 1024)
+    own = [touch(tmp_path, f"20240101-00000{i}.000-tx.wav", 500 - i, size=400 * 1024)
+           for i in range(3)]
+
+    TxRecorder(str(tmp_path), 8000, source="tx", max_total_mb=1, max_files=0).enforce_quota()
+
+    assert big.exists()
+    assert [p.exists() for p in own] == [False, True, True]
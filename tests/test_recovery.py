@@ -0,0 +1,227 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from zpttlink import main, radio
+from zpttlink.engines import AudioEngine
+from zpttlink.radio.digirig import DigiRigRadio
+
+
+class Hardware:
+    """What the fakes share across reopen: failure switches and a log of PTT writes."""
+
+    def __init__(self):
+        self.serial_fails = False
+        self.device_gone = False
+        self.bad_config = False
+        self.ptt = []
+        self.engines = []
+
+
+class FakeRadio(radio.RadioInterfaceBase):
+    name = "fake"
+
+    def __init__(self, hw):
+        self.hw = hw
+
+    def open(self):
+        if self.hw.bad_config:
+            raise radio.RadioConfigError("no serial port configured")
+        if self.hw.device_gone:
+            raise OSError("no such device")
+
+    def ptt_on(self, dry=False):
+        if self.hw.bad_config:
+            raise radio.RadioConfigError("unsupported ptt_output: none")
+        if self.hw.serial_fails:
+            raise OSError("serial write failed")
+        self.hw.ptt.append("on")
+
+    def ptt_off(self, dry=False):
+        self.hw.ptt.append("off")
+
+
+class FakeStream(AudioEngine):
+    """Feeds a steady tone to the callback every 10 ms from its own thread."""
+
+    name = "fake"
+    samplerate = 48000
+    blocksize = 480
+
+    def __init__(self, hw, callback, finished_callback):
+        if hw.device_gone:
+            raise RuntimeError("audio device disappeared")
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.running = False
+        self._thread = None
+
+    @property
+    def active(self):
+        return self.running
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        indata = np.full((self.blocksize, 1), 0.2, dtype=np.float32)
+        outdata = np.zeros((self.blocksize, 1), dtype=np.float32)
+        while self.running:
+            self.callback(indata, outdata, self.blocksize, None, None)
+            time.sleep(0.01)
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+    def die(self):
+        """The device went away under a running stream."""
+        self.running = False
+        self.finished_callback()
+
+
+def wait_for(predicate, timeout=2.0, step=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if step is not None:
+            step()
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def link(monkeypatch):
+    hw = Hardware()
+
+    def open_engine(self, channels):
+        stream = FakeStream(hw, self.audio_callback, self._on_stream_finished)
+        hw.engines.append(stream)
+        return stream
+
+    monkeypatch.setattr(main, "build_radio_backend", lambda cfg, args: FakeRadio(hw))
+    monkeypatch.setattr(main.LinkRuntime, "open_engine", open_engine)
+    cfg = main.merge_defaults(main.DEFAULT_CONFIG, {
+        "vox": {"threshold": 0.01, "log_levels": False},
+        "recovery": {"initial_backoff_s": 0.02, "max_backoff_s": 0.2},
+    })
+    args = main.build_arg_parser().parse_args(["--dry-run", "--vox"])
+    rt = main.LinkRuntime(cfg, args)
+    delays = []
+    backoff_next = rt.backoff.next
+    rt.backoff.next = lambda: delays.append(backoff_next()) or delays[-1]
+    rt.open()
+    rt.start()
+    yield rt, hw, delays
+    rt._close_stream()
+    rt.close()
+
+
+def keyed(rt):
+    return rt.channels[0].ptt.is_down
+
+
+def test_backoff_grows_to_its_cap():
+    backoff = main.Backoff(initial=0.5, maximum=4.0)
+    assert [backoff.next() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+    backoff.reset()
+    assert backoff.next() == 0.5
+
+
+def test_stream_failure_forces_ptt_off_and_recovers(link):
+    rt, hw, delays = link
+    assert wait_for(lambda: keyed(rt))
+    assert hw.ptt[-1] == "on"
+
+    hw.device_gone = True
+    hw.engines[-1].die()
+    rt.supervise()
+    assert rt.recovering
+    assert not keyed(rt)
+    assert hw.ptt[-1] == "off"
+
+    # Every failed reopen waits longer than the one before, up to max_backoff_s.
+    assert wait_for(lambda: len(delays) >= 5, step=rt.supervise)
+    assert delays[:5] == pytest.approx([0.02, 0.04, 0.08, 0.16, 0.2])
+    assert rt.metrics.counters["recovery_attempts"] >= 4
+
+    hw.device_gone = False
+    assert wait_for(lambda: not rt.recovering, step=rt.supervise)
+    assert rt.stream.active
+    assert rt.metrics.counters["recoveries"] == 1
+    assert rt.backoff.attempts == 0
+    # VOX keys the radio again on the reopened stream.
+    assert wait_for(lambda: keyed(rt) and hw.ptt[-1] == "on")
+
+
+def test_serial_failure_forces_ptt_off_and_recovers(link):
+    rt, hw, delays = link
+    assert wait_for(lambda: keyed(rt))
+    rt.channels[0].arbiter.set("vox", False)
+    assert wait_for(lambda: not keyed(rt))
+
+    hw.serial_fails = True
+    rt.channels[0].arbiter.set("vox", True)
+    assert wait_for(lambda: rt.fault_reason is not None)
+    assert "serial write failed" in rt.fault_reason
+    rt.supervise()
+    assert rt.recovering
+    assert not keyed(rt)
+    assert rt.stream is None
+
+    hw.serial_fails = False
+    assert wait_for(lambda: not rt.recovering, step=rt.supervise)
+    assert rt.metrics.counters["backend_errors"] >= 1
+    assert wait_for(lambda: keyed(rt) and hw.ptt[-1] == "on")
+
+
+def test_config_error_on_reopen_stops_recovery(link):
+    rt, hw, delays = link
+    hw.device_gone = True
+    hw.engines[-1].die()
+    rt.supervise()
+    assert wait_for(lambda: len(delays) >= 2, step=rt.supervise)
+
+    # The device is back but the reopen now hits a config error: no point retrying it.
+    hw.device_gone = False
+    hw.bad_config = True
+    assert wait_for(lambda: rt.failed, step=rt.supervise)
+    attempts = rt.metrics.counters["recovery_attempts"]
+    time.sleep(0.3)
+    for _ in range(5):
+        rt.supervise()
+    assert rt.metrics.counters["recovery_attempts"] == attempts
+    assert not rt.recovering
+    assert rt.stream is None
+    health = rt.health()
+    assert health["failed"]
+    assert "no serial port configured" in health["error"]
+    assert health["metrics"]["gauges"]["state"] == "failed"
+
+
+def test_config_error_from_ptt_write_is_not_retried(link):
+    rt, hw, delays = link
+    assert wait_for(lambda: keyed(rt))
+    rt.channels[0].arbiter.set("vox", False)
+    assert wait_for(lambda: not keyed(rt))
+
+    hw.bad_config = True
+    rt.channels[0].arbiter.set("vox", True)
+    assert wait_for(lambda: rt.fault_reason is not None)
+    rt.supervise()
+    assert rt.failed
+    assert not rt.recovering
+    assert not keyed(rt)
+    assert "recovery_attempts" not in rt.metrics.counters
+    assert "unsupported ptt_output" in rt.error
+
+
+def test_digirig_rejects_unusable_ptt_output():
+    with pytest.raises(radio.RadioConfigError, match="ptt_output"):
+        DigiRigRadio("/dev/ttyUSB0", 9600, ptt_output="none")
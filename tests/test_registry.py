@@ -0,0 +1,52 @@
+import logging
+from importlib import metadata
+
+import pytest
+
+from zpttlink import radio
+from zpttlink.radio import registry
+from zpttlink.radio.digirig import DigiRigRadio
+
+
+class PluginRadio(radio.RadioInterfaceBase):
+    @classmethod
+    def from_config(cls, cfg, args=None):
+        return cls()
+
+
+class EntryPoints(list):
+    def select(self, group):
+        return [ep for ep in self if ep.group == group]
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    eps = EntryPoints()
+    monkeypatch.setattr(metadata, "entry_points", lambda: eps)
+    monkeypatch.setattr(registry, "_entry_points", None)
+    monkeypatch.setattr(registry, "_loaded", {})
+
+    def install(name, target):
+        eps.append(metadata.EntryPoint(name, target, registry.ENTRY_POINT_GROUP))
+
+    return install
+
+
+def test_entry_point_cannot_shadow_a_builtin(plugins, caplog):
+    plugins("digirig", "tests.test_registry:PluginRadio")
+    plugins("myrig", "tests.test_registry:PluginRadio")
+
+    with caplog.at_level(logging.WARNING, logger="zpttlink"):
+        assert radio.available_backends() == ["cm108", "digirig", "myrig", "signalink"]
+    assert "shadow the built-in" in caplog.text
+    assert radio.load_backend("digirig") is DigiRigRadio
+    assert radio.load_backend("myrig") is PluginRadio
+
+
+def test_plugin_class_is_not_renamed(plugins):
+    plugins("myrig", "tests.test_registry:PluginRadio")
+    plugins("otherrig", "tests.test_registry:PluginRadio")
+
+    assert radio.create_backend("myrig", {}).name == "myrig"
+    assert radio.create_backend("otherrig", {}).name == "otherrig"
+    assert PluginRadio.name == "base"
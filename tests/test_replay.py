@@ -0,0 +1,51 @@
+import json
+
+from zpttlink import main, replay
+
+GATE_SETTINGS = (
+    "threshold", "attack_ms", "release_ms", "hang_ms", "open_ratio", "close_ratio",
+    "max_threshold",
+)
+
+
+def gate_settings(gate):
+    window = gate.noise_floor.sub_s if gate.noise_floor is not None else None
+    return {key: getattr(gate, key) for key in GATE_SETTINGS}, window
+
+
+def runtime_chain(path):
+    args = main.build_arg_parser().parse_args(["--dry-run", "--config", str(path)])
+    return main.LinkRuntime(main.load_config(str(path)), args).channels[0].chain
+
+
+def test_replay_uses_runtime_defaults_for_omitted_keys(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"vox": {"threshold": 0.05}}))
+    vox, audio, adaptive, _ = replay.load_settings(str(path))
+    defaults = main.DEFAULT_CONFIG["vox"]
+    assert vox["threshold"] == 0.05
+    assert vox["attack_ms"] == defaults["attack_ms"]
+    assert vox["release_ms"] == defaults["release_ms"]
+    assert vox["hang_ms"] == defaults["hang_ms"]
+    assert audio["tx_gain"] == main.DEFAULT_CONFIG["audio"]["tx_gain"]
+    gate = runtime_chain(path).gate
+    assert gate_settings(replay.build_gate(vox, adaptive)) == gate_settings(gate)
+
+
+def test_replay_and_runtime_build_the_same_gate(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({
+        "vox": {
+            "attack_ms": 35, "hang_ms": 200,
+            "adaptive": {"enabled": True, "open_ratio": 4.0, "window_s": 3.0},
+        },
+        "dtmf": {"enabled": True, "pin": "1234"},
+    }))
+    vox, _, adaptive, _ = replay.load_settings(str(path))
+    chain = runtime_chain(path)
+    gate = chain.gate
+    assert gate.noise_floor is not None
+    assert gate_settings(replay.build_gate(vox, adaptive)) == gate_settings(gate)
+    # The clip tolerance follows the delay line the runtime will actually use.
+    assert vox["preroll_ms"] == chain.preroll_ms
+    assert vox["preroll_ms"] > 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from zpttlink import squelch
+from zpttlink.bench import dcs_signal, speech_like
+
+RATE = 48000
+BLOCK = 480
+
+
+def open_fraction(decoder, signal, settle_s=1.0):
+    """Fraction of blocks after settle_s for which the squelch was open."""
+    states = [decoder.process(signal[i:i + BLOCK]) for i in range(0, len(signal), BLOCK)]
+    return float(np.mean(states[int(settle_s * RATE / BLOCK):]))
+
+
+def test_ctcss_opens_on_its_tone_only():
+    t = np.arange(3 * RATE) / RATE
+    tone = (0.05 * np.sin(2 * np.pi * 100.0 * t)).astype(np.float32)
+    assert open_fraction(squelch.CtcssDecoder(RATE, 100.0), tone) == 1.0
+    assert open_fraction(squelch.CtcssDecoder(RATE, 97.4), tone) == 0.0
+
+
+def test_dcs_inverted_polarity():
+    code = dcs_signal(RATE, 3.0, "023", 0.05)
+    assert open_fraction(squelch.DcsDecoder(RATE, "023", inverted=True), -code) == 1.0
+    assert open_fraction(squelch.DcsDecoder(RATE, "023", inverted=True), code) == 0.0
+
+
+@pytest.mark.parametrize("level", [0.1, 0.05, 0.03])
+def test_dcs_stays_open_with_voice(level):
+    voice = speech_like(RATE, 4.0, 0.3, seed=1)
+    assert np.max(np.abs(voice)) == pytest.approx(0.3, rel=0.05)
+    signal = voice + dcs_signal(RATE, 4.0, "023", level)
+    assert open_fraction(squelch.DcsDecoder(RATE, "023"), signal) == 1.0
+    assert open_fraction(squelch.DcsDecoder(RATE, "025"), signal) == 0.0
+
+
+def test_dcs_closes_on_voice_alone():
+    voice = speech_like(RATE, 3.0, 0.3, seed=2)
+    assert open_fraction(squelch.DcsDecoder(RATE, "023"), voice) == 0.0
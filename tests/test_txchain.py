@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from zpttlink import main
+from zpttlink.txchain import SplitChains, TxChain
+
+RATE = 48000
+BLOCK = 480
+
+
+def chain(name, **overrides):
+    cfg = main.merge_defaults(main.DEFAULT_CONFIG, overrides)
+    args = main.build_arg_parser().parse_args([])
+    c = TxChain(cfg, main.tx_params(cfg, args), name=name)
+    c.prepare(RATE, BLOCK)
+    return c
+
+
+def radios():
+    return (
+        chain("a", audio={"tx_gain": 0.5}),
+        chain("b", audio={"tx_gain": 0.2, "dc_block": False}, vox={"preroll_ms": 20}),
+    )
+
+
+def test_split_matches_each_chain_alone():
+    rng = np.random.default_rng(1)
+    blocks = [rng.uniform(-0.5, 0.5, (BLOCK, 2)).astype(np.float32) + 0.1 for _ in range(20)]
+    # a reads column 1 and writes column 0; b the other way round.
+    split = SplitChains(radios(), [1, 0], [0, 1])
+    alone = radios()
+
+    for block in blocks:
+        out = np.zeros((BLOCK, 2), dtype=np.float32)
+        levels = split.shape(block.copy(), out)
+        for col, (c, src) in enumerate(zip(alone, (1, 0))):
+            mono = np.zeros((BLOCK, 1), dtype=np.float32)
+            level = c.shape(block[:, src:src + 1].copy(), mono)
+            assert levels[col] == pytest.approx(level, rel=1e-5)
+            np.testing.assert_allclose(out[:, col], mono[:, 0], atol=1e-5)
+
+
+def test_split_rejects_shared_output_columns():
+    with pytest.raises(RuntimeError, match="unique"):
+        SplitChains(radios(), [0, 1], [0, 0])
+
+
+def test_gain_change_is_ramped_across_one_block():
+    c = chain(None, audio={"tx_gain": 0.1, "dc_block": False})
+    steady = chain(None, audio={"tx_gain": 0.2, "dc_block": False})
+    block = np.full((BLOCK, 1), 0.5, dtype=np.float32)
+    expected = np.zeros((BLOCK, 1), dtype=np.float32)
+    steady.shape(block, expected)
+
+    c.set_params(c.params._replace(tx_gain=0.2))
+    assert c.sync_params()
+    ramp = np.zeros((BLOCK, 1), dtype=np.float32)
+    c.shape(block, ramp)
+    assert np.all(np.diff(ramp[:, 0]) > 0)
+    assert ramp[-1, 0] == pytest.approx(expected[-1, 0])
+    after = np.zeros((BLOCK, 1), dtype=np.float32)
+    c.shape(block, after)
+    np.testing.assert_allclose(after, expected)
@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+import pytest
+
+from zpttlink import zello
+
+
+class FakeCodec:
+    """Stands in for OpusCodec: 16-bit PCM in each packet, so no opuslib is needed."""
+
+    name = "opus"
+
+    def __init__(self, samplerate):
+        self.samplerate = samplerate
+
+    def encode(self, frame):
+        return (np.clip(frame, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+    def decode(self, data, frame_size):
+        pcm = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32767.0
+        assert len(pcm) == frame_size
+        return pcm
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def server():
+    s = zello.StandInServer(echo=True).start()
+    yield s
+    s.stop()
+
+
+@pytest.fixture
+def client(server):
+    received = []
+    states = []
+    c = zello.ZelloClient(
+        url=server.url,
+        channel="test",
+        username="user",
+        codec_rate=16000,
+        frame_ms=20,
+        codec=FakeCodec,
+        on_rx=received.append,
+        on_rx_state=lambda active, who: states.append((active, who)),
+        timeout=2.0,
+    )
+    c.received = received
+    c.rx_states = states
+    c.prepare(16000)
+    c.start()
+    yield c
+    c.stop()
+
+
+def transmit(client, seconds, blocksize=320):
+    tone = (0.5 * np.sin(2 * np.pi * 440.0 * np.arange(blocksize) / 16000.0)).astype(np.float32)
+    client.request(True)
+    for _ in range(int(seconds * 16000 / blocksize)):
+        client.push(tone)
+        time.sleep(0.002)
+    client.request(False)
+
+
+def test_audio_packet_framing():
+    data = zello.pack_audio(7, 3, b"payload")
+    assert data[0] == zello.AUDIO_PACKET
+    assert len(data) == 9 + len(b"payload")
+    assert zello.unpack_audio(data) == (7, 3, b"payload")
+    with pytest.raises(ValueError):
+        zello.unpack_audio(b"\x02" + data[1:])
+    assert zello.parse_codec_header(zello.codec_header(16000, 1, 20)) == (16000, 1, 20)
+
+
+def test_logon(server, client):
+    assert wait_for(lambda: client.connected)
+    assert wait_for(lambda: len(server.clients) == 1)
+    assert client.stats()["errors"] == 0
+
+
+def test_stream_start_stop_and_echo(server, client):
+    assert wait_for(lambda: client.connected)
+    transmit(client, 0.2)
+    assert wait_for(lambda: client.stats()["streams"] == 1 and not client.stats()["streaming"])
+    # 0.2 s at 20 ms per packet; the partial last frame is padded and sent on stop_stream.
+    assert wait_for(lambda: server.packets == client.stats()["packets"])
+    assert 10 <= server.packets <= 11
+    assert server.streams == 1
+    assert server.bytes == server.packets * (9 + 2 * client.frame_size)
+
+    # The stand-in plays the stream back: one RX stream, every packet decoded.
+    assert wait_for(lambda: client.stats()["rx_packets"] == server.packets)
+    assert wait_for(lambda: client.rx_states == [(True, "echo"), (False, "echo")])
+    audio = np.concatenate(client.received)
+    assert len(audio) == server.packets * client.frame_size
+    assert np.max(np.abs(audio)) == pytest.approx(0.5, abs=0.01)
+
+
+def test_release_before_open_sends_nothing(server, client):
+    assert wait_for(lambda: client.connected)
+    client.request(True)
+    client.request(False)
+    time.sleep(0.2)
+    assert server.packets == 0
+
+
+def test_reconnect_after_drop(server, client):
+    assert wait_for(lambda: client.connected)
+    old = client.ws
+    for ws in list(server.clients):
+        ws.close()
+    assert wait_for(lambda: client.ws is not None and client.ws is not old)
+    assert wait_for(lambda: len(server.clients) == 1)
+    transmit(client, 0.1)
+    assert wait_for(lambda: server.streams == 1 and client.stats()["packets"] >= 5)
+    assert wait_for(lambda: server.packets == client.stats()["packets"])
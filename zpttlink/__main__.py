@@ -2,6 +2,16 @@ import sys
 
 
 def main_entry():
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        from .replay import main as replay_main
+
+        raise SystemExit(replay_main(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        from .bench import main as bench_main
+
+        raise SystemExit(bench_main(sys.argv[2:]))
+
     if "--gui" in sys.argv:
         argv = [arg for arg in sys.argv if arg != "--gui"]
         from .gui import launch_gui
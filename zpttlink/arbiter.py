@@ -0,0 +1,371 @@
+import collections
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger("zpttlink")
+
+
+class Timer:
+    __slots__ = ("tick", "fn", "args", "cancelled")
+
+    def __init__(self, tick, fn, args):
+        self.tick = tick
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel on time.monotonic(), driven by one thread.
+
+    schedule() and cancel() are O(1) and safe from any thread, including
+    the audio callback. Callbacks run on the wheel thread and must be
+    short. When nothing is scheduled the thread sleeps until something is.
+    """
+
+    def __init__(self, tick_ms=5.0, slots=512):
+        self.tick_s = max(float(tick_ms), 0.5) / 1000.0
+        self.slots = [[] for _ in range(int(slots))]
+        self.origin = time.monotonic()
+        self.current = 0
+        self.pending = 0
+        self.cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    def _now_tick(self):
+        return int((time.monotonic() - self.origin) / self.tick_s)
+
+    def schedule(self, delay_s, fn, *args):
+        with self.cond:
+            now = time.monotonic() - self.origin
+            if not self.pending:
+                # The wheel thread does not advance current while idle; catch it up
+                # so the first tick it visits is the one the new timer can land on.
+                self.current = max(self.current, int(now / self.tick_s) - 1)
+            due = now + max(float(delay_s), 0.0)
+            timer = Timer(max(self.current + 1, int(math.ceil(due / self.tick_s))), fn, args)
+            self.slots[timer.tick % len(self.slots)].append(timer)
+            self.pending += 1
+            if self.pending == 1:
+                self.cond.notify()
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancelled = True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self.cond:
+            self._stop = True
+            self.cond.notify()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _collect(self, upto):
+        due = []
+        n = len(self.slots)
+        # After a long stall every slot may hold due timers; visit each at most once.
+        first = max(self.current + 1, upto - n + 1)
+        for tick in range(first, upto + 1):
+            slot = self.slots[tick % n]
+            keep = []
+            for timer in slot:
+                if timer.tick <= upto:
+                    self.pending -= 1
+                    if not timer.cancelled:
+                        due.append(timer)
+                else:
+                    keep.append(timer)
+            self.slots[tick % n] = keep
+        self.current = upto
+        return due
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self._stop:
+                    self.cond.wait()
+                if self._stop:
+                    return
+                next_at = self.origin + (self.current + 1) * self.tick_s
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    if self._stop:
+                        return
+                due = self._collect(self._now_tick())
+            for timer in due:
+                try:
+                    timer.fn(*timer.args)
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {e}")
+
+
+_wheel = None
+_wheel_lock = threading.Lock()
+
+
+def default_wheel():
+    """The process-wide wheel, started on first use."""
+    global _wheel
+    with _wheel_lock:
+        if _wheel is None:
+            _wheel = TimerWheel().start()
+        return _wheel
+
+
+class PttWriter:
+    """
+    One thread that makes the PTT writes an arbiter decides on, in order.
+
+    Backend writes are serial ioctls or CM108 USB transfers; handing them
+    here keeps them off the audio callback, out of the arbiter's lock and
+    off the timer wheel. cancel() drops writes that have not started and
+    waits for the one in progress, so a forced release is not overtaken.
+    """
+
+    def __init__(self, ptt, on_error=None, name="ptt-writer"):
+        self.ptt = ptt
+        self.on_error = on_error
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.busy = False
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def down(self, source="unknown"):
+        self._put(True, source)
+
+    def up(self, source="unknown"):
+        self._put(False, source)
+
+    def _put(self, down, source):
+        with self.cond:
+            self.queue.append((down, source))
+            self.cond.notify_all()
+
+    def cancel(self, timeout=1.0):
+        with self.cond:
+            self.queue.clear()
+            self.cond.wait_for(lambda: not self.busy, timeout)
+
+    def close(self, timeout=1.0):
+        with self.cond:
+            self._stop = True
+            self.queue.clear()
+            self.cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self._stop:
+                    self.cond.wait()
+                if self._stop:
+                    return
+                down, source = self.queue.popleft()
+                self.busy = True
+            try:
+                if down:
+                    self.ptt.down(source=source)
+                else:
+                    self.ptt.up(source=source)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    logger.error(f"PTT write failed: {e}")
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+
+class PttSource:
+    def __init__(self, name, priority, press_ms=0, release_ms=0, ignore_initial=False):
+        self.name = name
+        self.priority = int(priority)
+        self.press_s = max(float(press_ms), 0.0) / 1000.0
+        self.release_s = max(float(release_ms), 0.0) / 1000.0
+        self.raw = False
+        self.active = False
+        self.active_since = 0.0
+        self.ignore_until_idle = bool(ignore_initial)
+        self.timer = None
+        self.poll_timer = None
+
+
+class PttArbiter:
+    """
+    Merges PTT requests from several sources into one PTTController.
+
+    Each source is debounced on its own press/release delay using the
+    shared timer wheel; a zero delay is decided at once in the caller's
+    thread (VOX already has its own attack/release timing). Decisions are
+    made under the arbiter's lock, but the PTT write itself goes to a
+    PttWriter thread, so no caller ever waits on backend I/O. The owner is
+    the highest-priority active source; an equal-priority source does not
+    take over from the current owner, and when the owner lets go the next
+    active source takes over without unkeying. lock() keeps every source
+    below a priority from keying, and forces PTT up if the owner is one.
+    """
+
+    def __init__(self, ptt, wheel=None, prefix="", on_error=None):
+        self.ptt = ptt
+        self.wheel = wheel or default_wheel()
+        self.prefix = prefix
+        self.on_error = on_error
+        self.sources = {}
+        self.owner = None
+        self.lock_level = None
+        self.lock_reason = None
+        self.closed = False
+        self._lock = threading.RLock()
+        name = prefix.rstrip("/")
+        self.writer = PttWriter(
+            ptt, on_error=on_error, name=f"ptt-writer-{name}" if name else "ptt-writer"
+        )
+
+    def add_source(self, name, priority, press_ms=0, release_ms=0, ignore_initial=False):
+        with self._lock:
+            src = PttSource(name, priority, press_ms, release_ms, ignore_initial)
+            self.sources[name] = src
+            return src
+
+    def set(self, name, active):
+        """Report a source's raw state; safe from any thread."""
+        active = bool(active)
+        with self._lock:
+            src = self.sources.get(name)
+            if src is None or self.closed:
+                return
+            if src.ignore_until_idle:
+                if active:
+                    return
+                src.ignore_until_idle = False
+            if active == src.raw:
+                return
+            src.raw = active
+            self.wheel.cancel(src.timer)
+            src.timer = None
+            if active == src.active:
+                # Bounced back before the debounce fired.
+                return
+            delay = src.press_s if active else src.release_s
+            if delay <= 0:
+                self._commit(src, active)
+            else:
+                src.timer = self.wheel.schedule(delay, self._debounced, src, active)
+
+    def _debounced(self, src, active):
+        with self._lock:
+            if self.closed or src.raw != active or src.active == active:
+                return
+            src.timer = None
+            self._commit(src, active)
+
+    def _commit(self, src, active):
+        src.active = active
+        src.active_since = time.monotonic() if active else 0.0
+        self._evaluate()
+
+    def _allowed(self, src):
+        return self.lock_level is None or src.priority >= self.lock_level
+
+    def _evaluate(self):
+        candidates = [s for s in self.sources.values() if s.active and self._allowed(s)]
+        owner = self.owner
+        if candidates:
+            best = max(candidates, key=lambda s: (s.priority, -s.active_since))
+            if owner is not None and owner in candidates and owner.priority >= best.priority:
+                best = owner
+        else:
+            best = None
+
+        if best is owner:
+            return
+        self.owner = best
+        if best is None:
+            self.writer.up(source=self.prefix + owner.name)
+        elif owner is None:
+            self.writer.down(source=self.prefix + best.name)
+        else:
+            logger.info(f"PTT owner: {self.prefix}{owner.name} -> {self.prefix}{best.name}")
+
+    def lock(self, level=None, reason="locked"):
+        """Lock out sources below level (all sources if None) until unlock()."""
+        with self._lock:
+            self.lock_level = math.inf if level is None else int(level)
+            self.lock_reason = reason
+            logger.warning(f"PTT lockout ({self.prefix}{reason})")
+            self._evaluate()
+
+    def unlock(self):
+        with self._lock:
+            if self.lock_level is None:
+                return
+            logger.info(f"PTT lockout cleared ({self.prefix}{self.lock_reason})")
+            self.lock_level = None
+            self.lock_reason = None
+            self._evaluate()
+
+    def add_poll(self, name, read, interval_ms):
+        """Sample read() every interval_ms on the wheel and feed it to source name."""
+        src = self.sources[name]
+        interval = max(float(interval_ms), 1.0) / 1000.0
+
+        def poll():
+            if self.closed:
+                return
+            try:
+                state = read()
+            except Exception as e:
+                # Leave recovery to the owner; a reopened backend gets a new arbiter.
+                self.set(name, False)
+                if self.on_error is not None:
+                    self.on_error(RuntimeError(f"input read failed: {e}"))
+                return
+            self.set(name, state)
+            src.poll_timer = self.wheel.schedule(interval, poll)
+
+        src.poll_timer = self.wheel.schedule(interval, poll)
+
+    def reset(self):
+        """Drop every source's state without touching PTT (the caller forces it off)."""
+        with self._lock:
+            for src in self.sources.values():
+                self.wheel.cancel(src.timer)
+                src.timer = None
+                src.raw = src.active = False
+            self.owner = None
+        self.writer.cancel()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            for src in self.sources.values():
+                self.wheel.cancel(src.timer)
+                self.wheel.cancel(src.poll_timer)
+                src.timer = src.poll_timer = None
+        self.writer.close()
+
+    def state(self):
+        with self._lock:
+            return {
+                "owner": self.owner.name if self.owner is not None else None,
+                "locked": self.lock_reason if self.lock_level is not None else None,
+                "active": sorted(s.name for s in self.sources.values() if s.active),
+            }
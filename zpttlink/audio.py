@@ -1,7 +1,328 @@
 import logging
-logger = logging.getLogger("ZPTTLink")
+import os
+import re
+import shutil
+import subprocess
+import threading
 
-def init(input_device, output_device):
-    logger.info(f"Audio input: {input_device}")
-    logger.info(f"Audio output: {output_device}")
-    # TODO: Integrate Virtual Audio Cable routing here
+try:
+    import pulsectl
+except Exception:
+    pulsectl = None
+
+logger = logging.getLogger("zpttlink")
+
+TX_SINK = "zpttlink_tx"
+RX_SINK = "zpttlink_rx"
+DEFAULT_MATCH = "waydroid|bluestacks|hd-player|audioflinger"
+
+_METADATA_RE = re.compile(r"key:'([^']+)' value:'([^']*)'")
+
+
+def _run(cmd):
+    return subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=5).stdout
+
+
+def _stream_text(stream):
+    props = stream.proplist
+    keys = ("application.name", "application.process.binary", "media.name", "node.name")
+    return " ".join(str(props[k]) for k in keys if props.get(k))
+
+
+class AudioRouter:
+    """
+    Routes emulator audio through PulseAudio or PipeWire (pipewire-pulse)
+    so each direction crosses exactly one buffer, replacing hand-built
+    loopback chains.
+
+    TX: ZPTTLink plays into a dedicated null sink, and the emulator's
+    record stream is moved onto that sink's monitor. RX: the emulator's
+    playback streams are moved straight onto the radio's sink (rx_sink),
+    or onto a second null sink if none is set. No loopback modules are
+    used, so there is no extra resample or buffer. On PipeWire the graph
+    rate and quantum are forced via pw-metadata, and extra port links
+    can be made with pw-link. Everything is undone by stop().
+    """
+
+    def __init__(
+        self,
+        samplerate=48000,
+        quantum=256,
+        emulator_match=DEFAULT_MATCH,
+        rx_sink=None,
+        links=(),
+        poll_s=1.0,
+    ):
+        if pulsectl is None:
+            raise RuntimeError("Audio routing needs pulsectl (pip install pulsectl)")
+        self.samplerate = int(samplerate)
+        self.quantum = int(quantum or 0)
+        self.match = re.compile(emulator_match or DEFAULT_MATCH, re.IGNORECASE)
+        self.rx_sink_name = rx_sink
+        self.links = [tuple(link) for link in links or ()]
+        self.poll_s = max(float(poll_s), 0.1)
+
+        self.pulse = None
+        self.pipewire = False
+        self.modules = []
+        self.moved = {}
+        self.made_links = []
+        self.forced_metadata = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self._thread = None
+        self._reported = False
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            samplerate=cfg.get("samplerate", 48000),
+            quantum=cfg.get("quantum", 256),
+            emulator_match=cfg.get("emulator_match", DEFAULT_MATCH),
+            rx_sink=cfg.get("rx_sink"),
+            links=cfg.get("links") or (),
+            poll_s=cfg.get("poll_s", 1.0),
+        )
+
+    # --- setup and teardown -----------------------------------------------
+
+    def start(self):
+        try:
+            self._setup()
+        except Exception:
+            self.stop()
+            raise
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="audio-router", daemon=True)
+        self._thread.start()
+        return self
+
+    def _setup(self):
+        with self.lock:
+            self.pulse = pulsectl.Pulse("zpttlink-router")
+            info = self.pulse.server_info()
+            self.pipewire = "pipewire" in (info.server_name or "").lower()
+            logger.info(f"Audio routing on {info.server_name} {info.server_version}")
+            self._unload_stale()
+            self._load_sink(TX_SINK, "ZPTTLink TX")
+            if not self.rx_sink_name:
+                self._load_sink(RX_SINK, "ZPTTLink RX")
+        if self.pipewire:
+            self._force_clock()
+        self._make_links()
+
+        # ZPTTLink's own TX stream, when it plays through the pulse or pipewire
+        # ALSA device, opens straight on the TX sink.
+        os.environ["PULSE_SINK"] = TX_SINK
+        os.environ["PIPEWIRE_NODE"] = TX_SINK
+
+    def stop(self):
+        self.stop_event.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        for out_port, in_port in reversed(self.made_links):
+            try:
+                _run(["pw-link", "-d", out_port, in_port])
+            except Exception as e:
+                logger.warning(f"pw-link -d {out_port} {in_port} failed: {e}")
+        self.made_links = []
+        for key in self.forced_metadata:
+            try:
+                _run(["pw-metadata", "-n", "settings", "0", key, "0"])
+            except Exception as e:
+                logger.warning(f"Resetting {key} failed: {e}")
+        self.forced_metadata = []
+        with self.lock:
+            if self.pulse is None:
+                return
+            self._restore_streams()
+            for index in reversed(self.modules):
+                try:
+                    self.pulse.module_unload(index)
+                except Exception as e:
+                    logger.warning(f"Unloading module {index} failed: {e}")
+            self.modules = []
+            self.pulse.close()
+            self.pulse = None
+        logger.info("Audio routing removed")
+
+    def _unload_stale(self):
+        # A crashed run leaves its sinks behind; never stack a second set.
+        for module in self.pulse.module_list():
+            ours = "sink_name=zpttlink_" in (module.argument or "")
+            if module.name == "module-null-sink" and ours:
+                logger.info(f"Removing stale routing module {module.index}")
+                self.pulse.module_unload(module.index)
+
+    def _load_sink(self, name, description):
+        props = f"device.description={description.replace(' ', '_')}"
+        if self.pipewire and self.quantum:
+            props += f" node.latency={self.quantum}/{self.samplerate}"
+        index = self.pulse.module_load(
+            "module-null-sink",
+            f"sink_name={name} sink_properties='{props}' "
+            f"rate={self.samplerate} channels=1 format=float32le",
+        )
+        self.modules.append(index)
+        logger.info(f"Created null sink {name} ({self.samplerate} Hz, mono)")
+
+    def _force_clock(self):
+        if shutil.which("pw-metadata") is None:
+            logger.warning("pw-metadata not found; graph rate and quantum left to PipeWire")
+            return
+        settings = [("clock.force-rate", self.samplerate)]
+        if self.quantum:
+            settings.append(("clock.force-quantum", self.quantum))
+        for key, value in settings:
+            try:
+                _run(["pw-metadata", "-n", "settings", "0", key, str(value)])
+                self.forced_metadata.append(key)
+            except Exception as e:
+                logger.warning(f"Setting {key}={value} failed: {e}")
+
+    def _make_links(self):
+        if not self.links:
+            return
+        if shutil.which("pw-link") is None:
+            logger.warning("pw-link not found; routing.links ignored")
+            return
+        for out_port, in_port in self.links:
+            try:
+                _run(["pw-link", out_port, in_port])
+                self.made_links.append((out_port, in_port))
+                logger.info(f"Linked {out_port} -> {in_port}")
+            except Exception as e:
+                logger.warning(f"pw-link {out_port} {in_port} failed: {e}")
+
+    # --- stream placement -------------------------------------------------
+
+    def _find_rx_sink(self):
+        name = self.rx_sink_name or RX_SINK
+        sinks = self.pulse.sink_list()
+        for sink in sinks:
+            if sink.name == name:
+                return sink
+        for sink in sinks:
+            if name.lower() in f"{sink.name} {sink.description}".lower():
+                return sink
+        return None
+
+    def poll(self):
+        """Move emulator streams that are not where they belong yet."""
+        with self.lock:
+            if self.pulse is None:
+                return
+            tx_monitor = self.pulse.get_source_by_name(f"{TX_SINK}.monitor")
+            target = self._find_rx_sink()
+            if target is None and not self._reported:
+                logger.warning(f"routing.rx_sink '{self.rx_sink_name}' not found; RX left as is")
+            moved = False
+            for stream in self.pulse.sink_input_list():
+                if not self.match.search(_stream_text(stream)):
+                    continue
+                if target is not None and stream.sink != target.index:
+                    self.moved.setdefault(("sink", stream.index), stream.sink)
+                    self.pulse.sink_input_move(stream.index, target.index)
+                    logger.info(
+                        f"Routed playback '{_stream_text(stream).strip()}' to {target.name}"
+                    )
+                    moved = True
+            for stream in self.pulse.source_output_list():
+                if not self.match.search(_stream_text(stream)):
+                    continue
+                if stream.source != tx_monitor.index:
+                    self.moved.setdefault(("source", stream.index), stream.source)
+                    self.pulse.source_output_move(stream.index, tx_monitor.index)
+                    logger.info(
+                        f"Routed capture '{_stream_text(stream).strip()}' to {tx_monitor.name}"
+                    )
+                    moved = True
+        if moved or not self._reported:
+            self._reported = True
+            self.log_report()
+
+    def _restore_streams(self):
+        for (kind, index), original in self.moved.items():
+            try:
+                if kind == "sink":
+                    self.pulse.sink_input_move(index, original)
+                else:
+                    self.pulse.source_output_move(index, original)
+            except Exception:
+                # The stream has ended since; nothing to put back.
+                pass
+        self.moved = {}
+
+    def _run(self):
+        while not self.stop_event.wait(self.poll_s):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Audio routing poll failed: {e}")
+
+    # --- latency ----------------------------------------------------------
+
+    def clock(self):
+        """PipeWire's (rate, quantum) in effect, or None off PipeWire."""
+        if not self.pipewire or shutil.which("pw-metadata") is None:
+            return None
+        try:
+            values = dict(_METADATA_RE.findall(_run(["pw-metadata", "-n", "settings"])))
+        except Exception:
+            return None
+        rate = int(values.get("clock.force-rate") or 0) or int(values.get("clock.rate") or 0)
+        quantum = int(values.get("clock.force-quantum") or 0)
+        quantum = quantum or int(values.get("clock.quantum") or 0)
+        return (rate, quantum) if rate and quantum else None
+
+    def report(self):
+        """Current per-stream and graph latency, in ms."""
+        result = {"server": "pipewire" if self.pipewire else "pulseaudio", "streams": []}
+        clock = self.clock()
+        if clock is not None:
+            rate, quantum = clock
+            result.update(rate=rate, quantum=quantum, quantum_ms=1000.0 * quantum / rate)
+        with self.lock:
+            if self.pulse is None:
+                return result
+            sink = self.pulse.get_sink_by_name(TX_SINK)
+            result["tx_sink_ms"] = sink.latency / 1000.0
+            result["tx_sink_configured_ms"] = sink.configured_latency / 1000.0
+            pid = str(os.getpid())
+            for stream in self.pulse.sink_input_list():
+                own = stream.proplist.get("application.process.id") == pid
+                if own or self.match.search(_stream_text(stream)):
+                    result["streams"].append({
+                        "name": "zpttlink" if own else _stream_text(stream).strip(),
+                        "path": "tx" if own else "rx",
+                        "latency_ms": (stream.buffer_usec + stream.sink_usec) / 1000.0,
+                    })
+            for stream in self.pulse.source_output_list():
+                if self.match.search(_stream_text(stream)):
+                    result["streams"].append({
+                        "name": _stream_text(stream).strip(),
+                        "path": "tx",
+                        "latency_ms": (stream.buffer_usec + stream.source_usec) / 1000.0,
+                    })
+        for path in ("tx", "rx"):
+            total = sum(s["latency_ms"] for s in result["streams"] if s["path"] == path)
+            if path == "tx":
+                total += result["tx_sink_ms"]
+            result[f"{path}_ms"] = total
+        return result
+
+    def log_report(self):
+        try:
+            r = self.report()
+        except Exception as e:
+            logger.warning(f"Audio routing latency unavailable: {e}")
+            return
+        graph = (
+            f", quantum {r['quantum']}/{r['rate']} ({r['quantum_ms']:.1f} ms)"
+            if "quantum" in r else ""
+        )
+        logger.info(
+            f"Audio routing latency: TX {r['tx_ms']:.1f} ms, RX {r['rx_ms']:.1f} ms, "
+            f"{len(r['streams'])} routed stream(s){graph}"
+        )
@@ -0,0 +1,425 @@
+import argparse
+import json
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+try:
+    from . import clips, dtmf, engines, squelch, zello
+    from .dsp import LIMITERS, LookaheadAgc, TruePeakLimiter, limit_audio, sanitize_audio
+except ImportError:
+    import clips
+    import dtmf
+    import engines
+    import squelch
+    import zello
+    from dsp import LIMITERS, LookaheadAgc, TruePeakLimiter, limit_audio, sanitize_audio
+
+# name -> (function(args) returning result rows, one-line description)
+CASES = {}
+
+
+def case(name, description):
+    def register(fn):
+        CASES[name] = (fn, description)
+        return fn
+    return register
+
+
+def speech_like(samplerate, seconds, amplitude, seed=0):
+    """Syllable-shaped voiced signal over a little hiss; deterministic for a seed."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(samplerate * seconds)) / float(samplerate)
+    syllables = (0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t)) ** 2
+    voiced = np.sin(2 * np.pi * 180.0 * t) + 0.5 * np.sin(2 * np.pi * 900.0 * t + 0.3)
+    hiss = 0.002 * rng.standard_normal(t.size)
+    return (amplitude * syllables * voiced / 1.5 + hiss).astype(np.float32)
+
+
+def blocks_of(signal, blocksize):
+    usable = (len(signal) // blocksize) * blocksize
+    return signal[:usable].reshape(-1, blocksize, 1)
+
+
+def time_blocks(process, blocks):
+    """Run process(block) over every block; return (outputs, per-block microseconds)."""
+    out = np.empty_like(blocks)
+    times = np.empty(len(blocks))
+    for i, block in enumerate(blocks):
+        started = time.perf_counter()
+        out[i] = process(block)
+        times[i] = (time.perf_counter() - started) * 1e6
+    return out.reshape(-1), times
+
+
+def timing_row(name, variant, times, args, **extra):
+    period_us = 1e6 * args.blocksize / float(args.samplerate)
+    row = {
+        "case": name,
+        "variant": variant,
+        "p50_us": float(np.percentile(times, 50)),
+        "p99_us": float(np.percentile(times, 99)),
+        "load": float(np.mean(times)) / period_us,
+    }
+    row.update(extra)
+    return row
+
+
+def dbfs(x):
+    return float(20.0 * np.log10(np.sqrt(np.mean(np.square(x))) + 1e-12))
+
+
+@case("shaping", "fixed tx_gain + tanh clip vs look-ahead AGC/compressor")
+def bench_shaping(args):
+    sr = args.samplerate
+    talkers = {"quiet": 0.02, "loud": 0.9}
+    rows = []
+    for variant in ("tanh", "agc"):
+        levels = {}
+        all_times = []
+        for label, amplitude in talkers.items():
+            agc = LookaheadAgc(sr) if variant == "agc" else None
+            blocks = blocks_of(speech_like(sr, args.seconds, amplitude), args.blocksize)
+            out, times = time_blocks(
+                lambda b: sanitize_audio(b, tx_gain=1.0, limit=0.9, dc_block=True, agc=agc),
+                blocks,
+            )
+            # Skip the first second so the AGC has settled.
+            levels[label] = dbfs(out[sr:])
+            all_times.append(times)
+        rows.append(timing_row(
+            "shaping", variant, np.concatenate(all_times), args,
+            notes=f"out quiet {levels['quiet']:.1f} dBFS, loud {levels['loud']:.1f} dBFS, "
+                  f"spread {levels['loud'] - levels['quiet']:.1f} dB",
+        ))
+    return rows
+
+
+def true_peak(x, factor=8):
+    """Peak of x band-limited-upsampled by factor (FFT zero padding)."""
+    n = len(x)
+    spectrum = np.fft.rfft(x)
+    return float(np.max(np.abs(np.fft.irfft(spectrum, n * factor))) * factor)
+
+
+@case("limiter", "soft-clip engines (tanh, lut, rational) and the true-peak limiter")
+def bench_limiter(args):
+    sr = args.samplerate
+    limit = 0.9
+    # Hot speech plus a loud tone near fs/4: clipping it squares it off and
+    # the overshoot lands between samples, where a sample-domain clip cannot see it.
+    t = np.arange(int(sr * args.seconds)) / float(sr)
+    hot = speech_like(sr, args.seconds, 0.6) + 1.6 * np.sin(2 * np.pi * 0.23 * sr * t + 0.7)
+    blocks = blocks_of(hot.astype(np.float32), args.blocksize)
+    reference = None
+    rows = []
+    for engine in LIMITERS:
+        limiter = TruePeakLimiter(sr) if engine == "truepeak" else engine
+        out, times = time_blocks(lambda b: limit_audio(b[:, 0], limit, limiter)[:, None], blocks)
+        if reference is None:
+            reference = out
+        notes = f"sample peak {np.max(np.abs(out)):.3f}, true peak {true_peak(out):.3f}"
+        if engine in ("lut", "rational"):
+            notes += f", max err vs tanh {np.max(np.abs(out - reference)):.1e}"
+        elif engine == "truepeak":
+            notes += f", delay {len(limiter.delay)} samples"
+        rows.append(timing_row("limiter", engine, times, args, notes=notes))
+    return rows
+
+
+def radio_voice(samplerate, seconds, amplitude):
+    """speech_like() through a radio's 300 Hz TX high-pass, leaving the sub-audible band clear."""
+    voice = speech_like(samplerate, seconds, amplitude)
+    spectrum = np.fft.rfft(voice)
+    spectrum[np.fft.rfftfreq(len(voice), 1.0 / samplerate) < 300.0] = 0.0
+    return np.fft.irfft(spectrum, len(voice)).astype(np.float32)
+
+
+def dcs_signal(samplerate, seconds, code, amplitude):
+    bits = 2.0 * np.array(squelch.dcs_bits(code)) - 1.0
+    n = np.arange(int(samplerate * seconds))
+    return (amplitude * bits[(n * squelch.DCS_BAUD / samplerate).astype(int) % 23]).astype(
+        np.float32
+    )
+
+
+def squelch_run(decoder, signal, blocksize, samplerate):
+    """Per-block times, time to first open (s, or None) and the share of blocks open."""
+    blocks = blocks_of(signal, blocksize)
+    states = np.empty(len(blocks), dtype=bool)
+    times = np.empty(len(blocks))
+    for i, block in enumerate(blocks):
+        started = time.perf_counter()
+        states[i] = decoder.process(block[:, 0])
+        times[i] = (time.perf_counter() - started) * 1e6
+    opened = int(np.argmax(states)) * blocksize / samplerate if states.any() else None
+    return times, opened, float(states.mean())
+
+
+@case("squelch", "CTCSS Goertzel bank and DCS decoder: cost per block and detection")
+def bench_squelch(args):
+    sr = args.samplerate
+    voice = radio_voice(sr, args.seconds, 0.5)
+    t = np.arange(len(voice)) / float(sr)
+    rows = []
+
+    def tone(hz):
+        return (0.05 * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+    def fmt(opened):
+        return f"{opened * 1000:.0f} ms" if opened is not None else "never"
+
+    times, opened, _ = squelch_run(squelch.CtcssDecoder(sr, 100.0), voice + tone(100.0),
+                                   args.blocksize, sr)
+    _, _, wrong = squelch_run(squelch.CtcssDecoder(sr, 97.4), voice + tone(100.0),
+                              args.blocksize, sr)
+    _, _, bare = squelch_run(squelch.CtcssDecoder(sr, 100.0), voice, args.blocksize, sr)
+    rows.append(timing_row(
+        "squelch", "ctcss", times, args,
+        notes=f"100.0 Hz opens in {fmt(opened)}; open {wrong * 100:.0f}% on 97.4 Hz, "
+              f"{bare * 100:.0f}% on voice alone",
+    ))
+
+    times, opened, _ = squelch_run(squelch.DcsDecoder(sr, "023"),
+                                   voice + dcs_signal(sr, args.seconds, "023", 0.08),
+                                   args.blocksize, sr)
+    _, _, wrong = squelch_run(squelch.DcsDecoder(sr, "023"),
+                              voice + dcs_signal(sr, args.seconds, "025", 0.08),
+                              args.blocksize, sr)
+    rows.append(timing_row(
+        "squelch", "dcs", times, args,
+        notes=f"023N opens in {fmt(opened)}; open {wrong * 100:.0f}% on 025N",
+    ))
+    return rows
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def dtmf_digits(samplerate, keys, on_ms=70, off_ms=60, amplitude=0.15):
+    tones = dict(zip("".join(dtmf.DTMF_KEYS), [
+        (row, col) for row in dtmf.DTMF_ROWS for col in dtmf.DTMF_COLS
+    ]))
+    t = np.arange(int(samplerate * on_ms / 1000.0)) / float(samplerate)
+    gap = np.zeros(int(samplerate * off_ms / 1000.0))
+    parts = []
+    for key in keys:
+        row, col = tones[key]
+        parts += [amplitude * (np.sin(2 * np.pi * row * t) + np.sin(2 * np.pi * col * t)), gap]
+    return np.concatenate(parts).astype(np.float32)
+
+
+@case("dtmf", "streaming DTMF decoder: cost per block, decoding and talk-off on speech")
+def bench_dtmf(args):
+    sr = args.samplerate
+    keys = "123410#"
+    decoder = dtmf.DtmfDecoder(sr)
+    voice = speech_like(sr, args.seconds, 0.5)
+    blocks = blocks_of(voice, args.blocksize)
+    _, times = time_blocks(lambda b: decoder.process(b[:, 0]) or b, blocks)
+    talk_off = len(decoder.digits)
+
+    decoder = dtmf.DtmfDecoder(sr)
+    signal = dtmf_digits(sr, keys)
+    signal[:len(voice)] += 0.1 * voice[:len(signal)]
+    time_blocks(lambda b: decoder.process(b[:, 0]) or b, blocks_of(signal, args.blocksize))
+    decoded = "".join(d for d, _ in decoder.digits)
+    return [timing_row(
+        "dtmf", "goertzel", times, args,
+        notes=f"'{keys}' over speech decoded as '{decoded}'; {talk_off} false digit(s) in "
+              f"{args.seconds:g}s of speech",
+    )]
+
+
+@case("clips", "CW ID render (once, cached) and mixing a clip into live TX audio")
+def bench_clips(args):
+    sr = args.samplerate
+    started = time.perf_counter()
+    cw = clips.render_cw("N0CALL/R", sr, wpm=20, tone_hz=800.0, level=0.3)
+    render_ms = (time.perf_counter() - started) * 1000.0
+    started = time.perf_counter()
+    again = clips.render_cw("N0CALL/R", sr, wpm=20, tone_hz=800.0, level=0.3)
+    cached_us = (time.perf_counter() - started) * 1e6
+
+    player = clips.ClipPlayer({"id": cw}, sr, lead_ms=0, tail_ms=0)
+    blocks = blocks_of(speech_like(sr, min(args.seconds, len(cw) / float(sr)), 0.3),
+                       args.blocksize)
+    player.play("id")
+
+    def mix(block):
+        player.mix(block[:, 0])
+        return block
+
+    _, times = time_blocks(mix, blocks)
+    return [timing_row(
+        "clips", "mix", times, args,
+        notes=f"{len(cw) / float(sr):.1f}s CW ID rendered in {render_ms:.1f} ms, "
+              f"{cached_us:.0f} us from cache ({'same' if again is cw else 'new'} array)",
+    )]
+
+
+@case("zello", "native Zello client: Opus encode + websocket to a local stand-in server")
+def bench_zello(args):
+    if zello.opuslib is None:
+        print("zello: skipped, needs opuslib and libopus")
+        return []
+    sr = args.samplerate
+    server = zello.StandInServer().start()
+    client = zello.ZelloClient(url=server.url, channel="bench", max_queue_s=args.seconds + 1.0)
+    client.prepare(sr)
+    client.start()
+    try:
+        if not wait_for(lambda: client.connected, 5.0):
+            raise RuntimeError("stand-in server did not accept the logon")
+        blocks = blocks_of(speech_like(sr, args.seconds, 0.3), args.blocksize)
+        cpu = time.process_time()
+        client.request(True)
+        wait_for(lambda: client.stats()["streaming"], 5.0)
+        _, times = time_blocks(lambda b: client.push(b) or b, blocks)
+        client.request(False)
+        wait_for(lambda: client.stats()["streams"] and not client.stats()["streaming"], 30.0)
+        cpu = time.process_time() - cpu
+    finally:
+        client.stop()
+        server.stop()
+    stats = client.stats()
+    notes = (
+        f"{cpu / args.seconds * 100.0:.1f}% of a core per realtime second, "
+        f"encode {stats['encode_ms']:.2f} ms/packet, {server.packets} packets, "
+        f"{8.0 * server.bytes / args.seconds / 1000.0:.1f} kbit/s"
+    )
+    if resource is not None:
+        notes += f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0:.0f} MB"
+    # The audio-thread cost is only push(); encoding runs on the client's thread.
+    return [timing_row("zello", "push", times, args, notes=notes)]
+
+
+def gil_load(stop):
+    """Pure-Python busy work: competes for the GIL like a GUI or logging burst."""
+    while not stop.is_set():
+        sum(i * i for i in range(20000))
+
+
+@case("engines", "xruns on the default device: PortAudio callback vs blocking engine under load")
+def bench_engines(args):
+    if engines.sd is None:
+        print("engines: skipped, needs sounddevice")
+        return []
+    try:
+        engines.sd.query_devices(kind="input")
+        engines.sd.query_devices(kind="output")
+    except Exception as e:
+        print(f"engines: skipped, no default audio device ({e})")
+        return []
+    sr = args.samplerate
+    period = args.blocksize / float(sr)
+    rows = []
+    for name in ("sounddevice", "blocking"):
+        times = []
+        counts = {"callbacks": 0, "status": 0}
+
+        def callback(indata, outdata, frames, time_info, status):
+            started = time.perf_counter()
+            counts["callbacks"] += 1
+            if status:
+                counts["status"] += 1
+            outdata[:] = sanitize_audio(indata, tx_gain=1.0, limit=0.9)
+            # Every 50th period one step runs long, as a GC pause or a slow backend would.
+            if counts["callbacks"] % 50 == 0:
+                while time.perf_counter() - started < 1.5 * period:
+                    pass
+            times.append((time.perf_counter() - started) * 1e6)
+
+        engine = engines.build_engine(
+            name, callback=callback, channels=1, samplerate=sr, blocksize=args.blocksize
+        )
+        stop = threading.Event()
+        load = threading.Thread(target=gil_load, args=(stop,), daemon=True)
+        load.start()
+        engine.start()
+        try:
+            time.sleep(args.seconds)
+        finally:
+            stop.set()
+            engine.stop()
+            engine.close()
+            load.join()
+        notes = f"{counts['status']} xrun periods in {counts['callbacks']} callbacks"
+        extra = engine.stats()
+        if extra:
+            notes += ", " + ", ".join(f"{k} {v}" for k, v in extra.items())
+        rows.append(timing_row("engines", name, np.array(times or [0.0]), args, notes=notes))
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'case':<10} {'variant':<12} {'p50 us':>9} {'p99 us':>9} {'load':>7}  notes")
+    for r in rows:
+        print(
+            f"{r['case']:<10} {r['variant']:<12} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f} "
+            f"{r['load'] * 100.0:>6.2f}%  {r.get('notes', '')}"
+        )
+    print("load = mean time per block as a share of the block period.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="zpttlink bench",
+        description="Time TX pipeline stages offline on synthetic audio.",
+    )
+    parser.add_argument("cases", nargs="*", help="Cases to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="List cases and exit")
+    parser.add_argument("--samplerate", type=int, default=48000)
+    parser.add_argument("--blocksize", type=int, default=480)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio per variant")
+    parser.add_argument("--json", help="Write results as JSON")
+    return parser
+
+
+def main(argv=None):
+    if np is None:
+        print("numpy is required for bench")
+        return 5
+
+    args = build_parser().parse_args(argv)
+    if args.list:
+        for name, (_, description) in CASES.items():
+            print(f"{name:<10} {description}")
+        return 0
+
+    names = args.cases or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        print(f"Unknown case(s): {', '.join(unknown)} (available: {', '.join(CASES)})")
+        return 2
+
+    rows = []
+    for name in names:
+        rows.extend(CASES[name][0](args))
+    print_rows(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
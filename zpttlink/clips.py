@@ -0,0 +1,268 @@
+import collections
+import os
+import threading
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from .dsp import Resampler
+    from .replay import read_audio
+except ImportError:
+    from dsp import Resampler
+    from replay import read_audio
+
+MORSE = {
+    "A": ".-", "B": "-...", "C": "-.-.", "D": "-..", "E": ".", "F": "..-.", "G": "--.",
+    "H": "....", "I": "..", "J": ".---", "K": "-.-", "L": ".-..", "M": "--", "N": "-.",
+    "O": "---", "P": ".--.", "Q": "--.-", "R": ".-.", "S": "...", "T": "-", "U": "..-",
+    "V": "...-", "W": ".--", "X": "-..-", "Y": "-.--", "Z": "--..",
+    "0": "-----", "1": ".----", "2": "..---", "3": "...--", "4": "....-", "5": ".....",
+    "6": "-....", "7": "--...", "8": "---..", "9": "----.",
+    "/": "-..-.", "?": "..--..", ".": ".-.-.-", ",": "--..--", "=": "-...-", "-": "-....-",
+}
+
+# Rendered clips by everything that went into them; shared by every channel and
+# kept across stream restarts, so a clip is rendered or resampled only once.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(key, render):
+    with _cache_lock:
+        clip = _cache.get(key)
+        if clip is None:
+            clip = np.ascontiguousarray(render(), dtype=np.float32)
+            clip.setflags(write=False)
+            _cache[key] = clip
+        return clip
+
+
+def _tone(samplerate, hz, frames, level, ramp_ms=5.0):
+    """A sine with raised-cosine edges, so keying it does not click."""
+    t = np.arange(frames) / float(samplerate)
+    x = level * np.sin(2 * np.pi * hz * t)
+    ramp = min(int(samplerate * ramp_ms / 1000.0), frames // 2)
+    if ramp:
+        edge = 0.5 - 0.5 * np.cos(np.pi * np.arange(ramp) / ramp)
+        x[:ramp] *= edge
+        x[frames - ramp:] *= edge[::-1]
+    return x
+
+
+def render_cw(text, samplerate, wpm=20, tone_hz=800.0, level=0.3):
+    """Morse for text at wpm (PARIS timing); characters without a code are skipped."""
+
+    def render():
+        dit = int(round(samplerate * 1.2 / float(wpm)))
+        mark = {".": _tone(samplerate, tone_hz, dit, level),
+                "-": _tone(samplerate, tone_hz, 3 * dit, level)}
+        parts = []
+        for word in str(text).upper().split():
+            for ch in word:
+                code = MORSE.get(ch)
+                if code is None:
+                    continue
+                for element in code:
+                    parts += [mark[element], np.zeros(dit)]
+                parts.append(np.zeros(2 * dit))
+            parts.append(np.zeros(4 * dit))
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    return _cached(("cw", str(text).upper(), samplerate, wpm, tone_hz, level), render)
+
+
+def render_tones(steps, samplerate, level=0.3):
+    """A tone sequence from (hz, ms) steps; hz 0 is a pause."""
+    steps = tuple((float(hz), float(ms)) for hz, ms in steps)
+
+    def render():
+        parts = []
+        for hz, ms in steps:
+            frames = int(samplerate * ms / 1000.0)
+            parts.append(_tone(samplerate, hz, frames, level) if hz > 0 else np.zeros(frames))
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    return _cached(("tones", steps, samplerate, level), render)
+
+
+def load_clip(path, samplerate, level=0.5):
+    """A WAV (or, with soundfile, any) file as mono at samplerate, peak-normalised to level."""
+    path = os.path.abspath(path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        raise RuntimeError(f"Cannot read clip {path}: {e}")
+
+    def render():
+        data, sr = read_audio(path)
+        mono = data.mean(axis=1)
+        if sr != samplerate:
+            # Zero padding flushes the resampler's filter delay.
+            pad = np.zeros(int(sr * 0.01), dtype=np.float32)
+            mono = Resampler(sr, samplerate).process(np.concatenate([mono, pad]))
+        peak = float(np.max(np.abs(mono))) if len(mono) else 0.0
+        return mono * (level / peak) if peak > 0 else mono
+
+    return _cached(("file", path, mtime, samplerate, level), render)
+
+
+class ClipPlayer:
+    """
+    Mixes pre-rendered clips into one TX output column.
+
+    play() queues a clip by name from any thread. mix() runs on the audio
+    thread once per block and adds the current clip into the output in
+    place, then clips the mixed span to the limit; nothing is allocated
+    per block. Each clip is framed by lead frames of silence (PTT is up
+    before the audio starts) and tail_ms after it, and keyed is True for
+    that whole span and while more clips are queued, so PTT can follow it.
+    """
+
+    def __init__(self, clips, samplerate, lead_ms=150, tail_ms=100):
+        self.clips = dict(clips)
+        self.samplerate = int(samplerate)
+        self.lead = int(self.samplerate * max(float(lead_ms), 0.0) / 1000.0)
+        self.tail = int(self.samplerate * max(float(tail_ms), 0.0) / 1000.0)
+        self.queue = collections.deque(maxlen=16)
+        self.current = None
+        self.name = None
+        self.pos = 0
+        self.start = 0
+        self.end = 0
+        self.length = 0
+        self.played = 0
+
+    def play(self, name, lead=None):
+        if name not in self.clips:
+            raise RuntimeError(f"no clip named '{name}' (have: {', '.join(self.clips)})")
+        self.queue.append((name, self.lead if lead is None else int(lead)))
+
+    @property
+    def keyed(self):
+        return self.current is not None or bool(self.queue)
+
+    def mix(self, out, limit=1.0):
+        """Audio thread: add this block's share of the current clip to out (1-D)."""
+        if self.current is None:
+            if not self.queue:
+                return False
+            self.name, lead = self.queue.popleft()
+            self.current = self.clips[self.name]
+            self.pos = 0
+            self.start = lead
+            self.end = lead + len(self.current)
+            self.length = self.end + self.tail
+        pos = self.pos
+        a = max(pos, self.start)
+        b = min(pos + len(out), self.end)
+        if b > a:
+            span = out[a - pos:b - pos]
+            np.add(span, self.current[a - self.start:b - self.start], out=span)
+            np.clip(span, -limit, limit, out=span)
+        self.pos = pos + len(out)
+        if self.pos >= self.length:
+            self.current = None
+            self.name = None
+            self.played += 1
+        return self.keyed
+
+    def stats(self):
+        return {"playing": self.name, "queued": len(self.queue), "played": self.played}
+
+
+class ClipSchedule:
+    """
+    When clips play. Timers are checked from the main loop by tick(): a
+    timed clip plays every every_s, and one marked only_if_active waits
+    until there has been traffic since it last played (the usual rule for
+    a station ID). released() is called on the audio thread when the
+    radio user lets go and queues the after-release clips (courtesy
+    tones) with release_lead frames of lead-in, long enough for pre-roll
+    audio still in flight to play out first.
+    """
+
+    def __init__(self, player, timers=(), after_release=(), release_lead=None):
+        self.player = player
+        self.timers = [
+            {"name": name, "every_s": float(every_s), "only_if_active": bool(only_if_active),
+             "next_at": None, "active": False}
+            for name, every_s, only_if_active in timers
+        ]
+        self.after_release = list(after_release)
+        self.release_lead = release_lead
+
+    def activity(self):
+        for timer in self.timers:
+            timer["active"] = True
+
+    def tick(self, now):
+        for timer in self.timers:
+            if timer["next_at"] is None:
+                timer["next_at"] = now + timer["every_s"]
+            if now < timer["next_at"]:
+                continue
+            if timer["only_if_active"] and not timer["active"]:
+                continue
+            self._play(timer, now)
+
+    def _play(self, timer, now):
+        self.player.play(timer["name"])
+        timer["next_at"] = now + timer["every_s"]
+        timer["active"] = False
+
+    def force(self, name, now):
+        """Play name now; a timer for it restarts from here."""
+        for timer in self.timers:
+            if timer["name"] == name:
+                self._play(timer, now)
+                return
+        self.player.play(name)
+
+    def released(self):
+        for name in self.after_release:
+            self.player.play(name, lead=self.release_lead)
+        return bool(self.after_release)
+
+
+def build_clips(cfg, samplerate, preroll_ms=0.0):
+    """(player, schedule) for the "clips" config section, or None when it is off."""
+    if not cfg.get("enabled", False):
+        return None
+    level = float(cfg.get("level", 0.3))
+    clips = {}
+    timers = []
+    after_release = []
+
+    callsign = str(cfg.get("callsign") or "").strip()
+    if callsign:
+        clips["id"] = render_cw(
+            callsign, samplerate, wpm=cfg.get("cw_wpm", 20), tone_hz=cfg.get("cw_hz", 800.0),
+            level=level,
+        )
+        if float(cfg.get("id_interval_s", 600) or 0) > 0:
+            timers.append(("id", cfg.get("id_interval_s", 600), cfg.get("id_only_if_active", True)))
+
+    courtesy = cfg.get("courtesy") or []
+    if courtesy:
+        clips["courtesy"] = render_tones(courtesy, samplerate, level=level)
+        after_release.append("courtesy")
+
+    for entry in cfg.get("announcements") or []:
+        path = entry.get("file")
+        if not path:
+            raise RuntimeError("clips.announcements entries need a file")
+        name = str(entry.get("name") or os.path.splitext(os.path.basename(path))[0])
+        clips[name] = load_clip(path, samplerate, level=float(entry.get("level", level)))
+        if float(entry.get("every_s", 0) or 0) > 0:
+            timers.append((name, entry["every_s"], entry.get("only_if_active", False)))
+        if entry.get("after_release", False):
+            after_release.append(name)
+
+    player = ClipPlayer(
+        clips, samplerate, lead_ms=cfg.get("lead_ms", 150), tail_ms=cfg.get("tail_ms", 100)
+    )
+    release_lead = max(player.lead, int(samplerate * float(preroll_ms) / 1000.0))
+    return player, ClipSchedule(player, timers, after_release, release_lead=release_lead)
@@ -0,0 +1,88 @@
+import hmac
+import json
+import logging
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger("zpttlink")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            reply = self.server.control.dispatch(line)
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ControlServer:
+    """
+    Line-delimited JSON commands over TCP, meant for localhost.
+
+    Each request is an object with a "cmd" name and, if a token is
+    configured, a matching "token". Handlers take the request and return a
+    dict that is sent back with "ok": true; errors come back as "ok": false.
+    """
+
+    def __init__(self, host="127.0.0.1", port=7355, token=None):
+        self.host = host
+        self.port = int(port)
+        self.token = token
+        self.handlers = {}
+        self._server = None
+        self._thread = None
+
+    def register(self, cmd, handler):
+        self.handlers[cmd] = handler
+
+    def dispatch(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RuntimeError("request must be a JSON object")
+            if self.token and not hmac.compare_digest(str(request.get("token", "")), self.token):
+                raise RuntimeError("bad token")
+            handler = self.handlers.get(request.get("cmd"))
+            if handler is None:
+                raise RuntimeError(f"unknown command: {request.get('cmd')}")
+            result = handler(request) or {}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return dict(result, ok=True)
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.control = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="control", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Control channel listening on {self.host}:{self.port}")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def send_command(request, host="127.0.0.1", port=7355, token=None, timeout=1.0):
+    """Send one request to a running ControlServer and return its reply."""
+    if token:
+        request = dict(request, token=token)
+    with socket.create_connection((host, int(port)), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        raise RuntimeError("control channel closed without a reply")
+    return json.loads(line)
@@ -0,0 +1,781 @@
+import math
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+class NoiseFloorEstimator:
+    """
+    Streaming noise floor from block RMS levels using minimum statistics.
+
+    Levels are smoothed with a short time constant, and the floor is the
+    minimum over the last window_s seconds (kept as a ring of sub-window
+    minima) times a bias factor. Each update is O(1); the ring minimum is
+    only recomputed when a sub-window rolls over. Speech rarely stays loud
+    for a whole window, so the floor tracks fans and band noise, not talkers.
+    """
+
+    def __init__(self, window_s=5.0, subwindows=8, smoothing_ms=50.0, bias=1.1):
+        self.subwindows = max(1, int(subwindows))
+        self.sub_s = float(window_s) / self.subwindows
+        self.tau = max(float(smoothing_ms), 1e-3) / 1000.0
+        self.bias = float(bias)
+
+        self.minima = [math.inf] * self.subwindows
+        self.pos = 0
+        self.ring_min = math.inf
+        self.sub_min = math.inf
+        self.sub_started = None
+        self.smoothed = None
+        self.floor = None
+        self._last = None
+
+    def seed(self, floor):
+        """Start from a previously persisted floor instead of recalibrating."""
+        base = float(floor) / self.bias
+        self.minima = [base] * self.subwindows
+        self.ring_min = base
+        self.floor = float(floor)
+
+    def update(self, level, now):
+        if self.smoothed is None:
+            self.smoothed = level
+        else:
+            a = math.exp(-max(now - self._last, 0.0) / self.tau)
+            self.smoothed = a * self.smoothed + (1.0 - a) * level
+        self._last = now
+
+        if self.smoothed < self.sub_min:
+            self.sub_min = self.smoothed
+
+        if self.sub_started is None:
+            self.sub_started = now
+        elif now - self.sub_started >= self.sub_s:
+            self.minima[self.pos] = self.sub_min
+            self.pos = (self.pos + 1) % self.subwindows
+            self.ring_min = min(self.minima)
+            self.sub_min = math.inf
+            self.sub_started = now
+
+        self.floor = min(self.ring_min, self.sub_min) * self.bias
+        return self.floor
+
+    def state(self):
+        return {"floor": self.floor, "updated": time.time()}
+
+
+class AudioGate:
+    def __init__(
+        self,
+        threshold=0.02,
+        attack_ms=40,
+        release_ms=120,
+        hang_ms=300,
+        noise_floor=None,
+        open_ratio=3.0,
+        close_ratio=1.5,
+        max_threshold=0.25,
+    ):
+        # Adaptive mode: thresholds follow the noise floor, with hysteresis
+        # (open_ratio > close_ratio); self.threshold becomes the minimum.
+        self.noise_floor = noise_floor
+        self.configure(
+            threshold, attack_ms, release_ms, hang_ms, open_ratio, close_ratio, max_threshold
+        )
+        self.open_threshold = self.threshold
+        self.close_threshold = self.threshold
+        # Optional extra condition (e.g. a tone squelch): audio only counts while .open.
+        self.condition = None
+
+        self.active = False
+        self.audio_started_at = None
+        self.silence_started_at = None
+        self.hang_until = 0.0
+
+    def configure(
+        self,
+        threshold,
+        attack_ms,
+        release_ms,
+        hang_ms,
+        open_ratio=3.0,
+        close_ratio=1.5,
+        max_threshold=0.25,
+    ):
+        """Change settings in place; an open gate stays open and keeps its timers."""
+        self.threshold = float(threshold)
+        self.attack_ms = int(attack_ms)
+        self.release_ms = int(release_ms)
+        self.hang_ms = int(hang_ms)
+        self.open_ratio = float(open_ratio)
+        self.close_ratio = min(float(close_ratio), self.open_ratio)
+        self.max_threshold = float(max_threshold)
+
+    def reset(self):
+        self.active = False
+        self.audio_started_at = None
+        self.silence_started_at = None
+        self.hang_until = 0.0
+
+    def update_thresholds(self, level, now):
+        floor = self.noise_floor.update(level, now)
+        self.open_threshold = min(max(self.threshold, floor * self.open_ratio), self.max_threshold)
+        min_close = self.threshold * self.close_ratio / self.open_ratio
+        self.close_threshold = min(max(min_close, floor * self.close_ratio), self.open_threshold)
+
+    def process(self, level, now=None):
+        now = time.monotonic() if now is None else now
+        if self.noise_floor is None:
+            above = level >= self.threshold
+        else:
+            self.update_thresholds(level, now)
+            above = level >= (self.close_threshold if self.active else self.open_threshold)
+        if self.condition is not None and not self.condition.open:
+            above = False
+
+        if above:
+            self.silence_started_at = None
+            self.hang_until = 0.0
+            if self.audio_started_at is None:
+                self.audio_started_at = now
+
+            if not self.active and (now - self.audio_started_at) * 1000.0 >= self.attack_ms:
+                self.active = True
+                return "start"
+            return None
+
+        self.audio_started_at = None
+
+        if self.active:
+            if self.silence_started_at is None:
+                self.silence_started_at = now
+                return None
+
+            silence_ms = (now - self.silence_started_at) * 1000.0
+            if silence_ms >= self.release_ms:
+                if self.hang_until == 0.0:
+                    self.hang_until = now + (self.hang_ms / 1000.0)
+
+                if now >= self.hang_until:
+                    self.active = False
+                    self.silence_started_at = None
+                    self.hang_until = 0.0
+                    return "stop"
+
+        return None
+
+
+def choose_hop(samplerate, frame_ms, blocksize=0):
+    """
+    STFT hop in samples: about frame_ms / 2, but when the stream has a fixed
+    blocksize, a divisor of it, so every block yields the same number of frames.
+    """
+    target = max(16, int(round(samplerate * float(frame_ms) / 2000.0)))
+    blocksize = int(blocksize or 0)
+    if blocksize <= 0:
+        return target
+    for frames in range(max(1, -(-blocksize // target)), blocksize + 1):
+        if blocksize % frames == 0 and blocksize // frames >= 16:
+            return blocksize // frames
+    return blocksize
+
+
+class SpectralGate:
+    """
+    Streaming spectral noise gate: STFT overlap-add with a learned noise profile.
+
+    Frames are n_fft = 2 * hop samples with a periodic sqrt-Hann window on
+    both analysis and synthesis, which reconstructs exactly at 50% overlap.
+    Every frame completed by a block goes through one batched rfft/irfft, so
+    the per-block cost is a few array operations regardless of frame count.
+    Output lags input by n_fft samples.
+
+    The noise profile is a per-bin power estimate that drops to quiet bins
+    quickly and rises over learn_s (bins well above it by at most CREEP_DB_S
+    per second); process(learn=False) freezes it while the caller transmits.
+    Bins near the profile are attenuated by up to reduction_db. If a block
+    takes longer than budget (a fraction of the block period) for several
+    blocks in a row, the gate sets bypassed and passes audio through
+    untouched from then on.
+    """
+
+    STRIKES = 3
+    CREEP_DB_S = 1.0
+
+    def __init__(
+        self,
+        samplerate,
+        frame_ms=10.0,
+        blocksize=0,
+        reduction_db=18.0,
+        threshold=3.0,
+        learn_s=2.0,
+        budget=0.25,
+    ):
+        self.samplerate = int(samplerate)
+        self.hop = choose_hop(self.samplerate, frame_ms, blocksize)
+        self.n_fft = 2 * self.hop
+        n = np.arange(self.n_fft, dtype=np.float64)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2.0 * np.pi * n / self.n_fft)).astype(np.float32)
+        self.configure(reduction_db, threshold, learn_s, budget)
+
+        self.profile = None
+        self.pending = np.zeros(self.hop, dtype=np.float32)
+        self.tail = np.zeros(self.hop, dtype=np.float32)
+        self.ready = np.zeros(self.hop, dtype=np.float32)
+        self.bypassed = False
+        self.last_ms = 0.0
+        self._strikes = 0
+
+    def configure(self, reduction_db, threshold, learn_s, budget):
+        """Change settings in place (keeps the noise profile); re-arms a bypassed gate."""
+        self.floor = np.float32(10.0 ** (-abs(float(reduction_db)) / 20.0))
+        self.threshold = np.float32(max(float(threshold), 1.0))
+        self.learn_s = max(float(learn_s), 0.05)
+        self.budget = max(float(budget), 0.0)
+        self.bypassed = False
+        self._strikes = 0
+
+    def _learn(self, power, block_s):
+        mean = power.mean(axis=0)
+        if self.profile is None:
+            self.profile = mean
+            return
+        fall = math.exp(-block_s / (self.learn_s * 0.05))
+        rise = math.exp(-block_s / self.learn_s)
+        a = np.where(mean < self.profile, fall, rise).astype(np.float32)
+        learned = a * self.profile + (1.0 - a) * mean
+        # Bins well above the profile are probably signal; a sustained change
+        # (a fan switched on) still creeps in at CREEP_DB_S.
+        creep = self.profile * np.float32(10.0 ** (self.CREEP_DB_S * block_s / 10.0))
+        above = mean > self.profile * self.threshold
+        self.profile = np.where(above, np.minimum(creep, mean), learned).astype(np.float32)
+
+    def _gains(self, power):
+        # Decide on power averaged with neighbouring bins, so lone noise bins
+        # don't chirp through while a tone still opens its own bins fully.
+        smoothed = power.copy()
+        smoothed[:, 1:-1] = (power[:, :-2] + power[:, 1:-1] + power[:, 2:]) / np.float32(3.0)
+        gains = 1.0 - (self.profile * self.threshold) / np.maximum(smoothed, np.float32(1e-20))
+        return np.clip(gains, self.floor, 1.0, out=gains)
+
+    def process(self, x, learn=True):
+        """Filter a mono block (1-D float32); returns a block of the same length."""
+        if self.bypassed:
+            return x
+        started = time.perf_counter()
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        hop = self.hop
+
+        pending = np.concatenate((self.pending, x))
+        count = (len(pending) - self.n_fft) // hop + 1 if len(pending) >= self.n_fft else 0
+        ready = self.ready
+        if count > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(pending, self.n_fft)[::hop][:count]
+            spec = np.fft.rfft(frames * self.window, axis=1)
+            power = (spec.real * spec.real + spec.imag * spec.imag).astype(np.float32)
+            if learn or self.profile is None:
+                self._learn(power, len(x) / float(self.samplerate))
+            spec *= self._gains(power)
+            out = np.fft.irfft(spec, n=self.n_fft, axis=1).astype(np.float32) * self.window
+
+            # 50% overlap: each hop of output is one frame's first half plus the
+            # previous frame's second half.
+            first, second = out[:, :hop], out[:, hop:]
+            done = first.copy()
+            done[0] += self.tail
+            done[1:] += second[:-1]
+            self.tail = second[-1].copy()
+            ready = np.concatenate((ready, done.reshape(-1)))
+            pending = pending[count * hop:]
+
+        self.pending = pending
+        y = ready[:len(x)]
+        self.ready = ready[len(x):]
+
+        self.last_ms = (time.perf_counter() - started) * 1000.0
+        period_ms = 1000.0 * len(x) / float(self.samplerate)
+        if self.budget > 0 and self.last_ms > self.budget * period_ms:
+            self._strikes += 1
+            if self._strikes >= self.STRIKES:
+                self.bypassed = True
+        else:
+            self._strikes = 0
+        return y
+
+
+# Keyword settings of LookaheadAgc, as named in the "agc" config section.
+AGC_SETTINGS = (
+    "target_dbfs",
+    "max_gain_db",
+    "min_gain_db",
+    "gate_dbfs",
+    "threshold_dbfs",
+    "ratio",
+    "attack_ms",
+    "release_ms",
+    "window_ms",
+    "lookahead_ms",
+    "sub_block_ms",
+)
+
+
+class LookaheadAgc:
+    """
+    Look-ahead AGC and compressor for a mono stream.
+
+    The block is cut into sub-blocks of about sub_block_ms; each gets a mean
+    power and a peak in one vectorized pass. Per sub-block, the AGC wants
+    target / RMS (RMS smoothed over window_ms, gain held while the level is
+    below gate_dbfs so noise isn't pumped up, and bounded by min/max_gain_db).
+    The compressor then reduces peaks above threshold_dbfs by ratio. The
+    result is smoothed with attack_ms/release_ms, interpolated to per-sample
+    gain and applied to audio delayed by lookahead_ms, so the gain is
+    already down when a transient arrives.
+    """
+
+    def __init__(
+        self,
+        samplerate,
+        target_dbfs=-18.0,
+        max_gain_db=20.0,
+        min_gain_db=-20.0,
+        gate_dbfs=-50.0,
+        threshold_dbfs=-6.0,
+        ratio=4.0,
+        attack_ms=5.0,
+        release_ms=300.0,
+        window_ms=50.0,
+        lookahead_ms=5.0,
+        sub_block_ms=1.0,
+    ):
+        self.samplerate = int(samplerate)
+        self.delay = np.zeros(max(0, int(round(self.samplerate * lookahead_ms / 1000.0))),
+                              dtype=np.float32)
+        self.sub = max(8, int(round(self.samplerate * sub_block_ms / 1000.0)))
+        self.configure(
+            target_dbfs, max_gain_db, min_gain_db, gate_dbfs, threshold_dbfs, ratio,
+            attack_ms, release_ms, window_ms,
+        )
+        self.gain = 1.0
+        self.power = None
+
+    def configure(
+        self,
+        target_dbfs,
+        max_gain_db,
+        min_gain_db,
+        gate_dbfs,
+        threshold_dbfs,
+        ratio,
+        attack_ms,
+        release_ms,
+        window_ms,
+    ):
+        """Change settings in place; the running gain and level carry over."""
+        self.target = 10.0 ** (float(target_dbfs) / 20.0)
+        self.max_gain = 10.0 ** (float(max_gain_db) / 20.0)
+        self.min_gain = 10.0 ** (float(min_gain_db) / 20.0)
+        self.gate_power = 10.0 ** (float(gate_dbfs) / 10.0)
+        self.threshold = 10.0 ** (float(threshold_dbfs) / 20.0)
+        self.inv_ratio = 1.0 / max(float(ratio), 1.0)
+        self.attack_s = max(float(attack_ms), 0.01) / 1000.0
+        self.release_s = max(float(release_ms), 0.01) / 1000.0
+        self.window_s = max(float(window_ms), 0.01) / 1000.0
+
+    def process(self, x):
+        """Level a 1-D float32 block; returns a block of the same length."""
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        n = len(x)
+        if n == 0:
+            return x
+
+        count = max(1, n // self.sub)
+        starts = (np.arange(count) * n) // count
+        sizes = np.diff(np.append(starts, n))
+        power = np.add.reduceat(x * x, starts) / sizes
+        peak = np.maximum.reduceat(np.abs(x), starts)
+
+        sub_s = n / float(count * self.samplerate)
+        a_env = math.exp(-sub_s / self.window_s)
+        a_att = math.exp(-sub_s / self.attack_s)
+        a_rel = math.exp(-sub_s / self.release_s)
+
+        level = self.power if self.power is not None else float(power[0])
+        g = self.gain
+        gains = np.empty(count, dtype=np.float32)
+        for j, (pw, pk) in enumerate(zip(power.tolist(), peak.tolist())):
+            level = a_env * level + (1.0 - a_env) * pw
+            if level > self.gate_power:
+                want = min(max(self.target / math.sqrt(level), self.min_gain), self.max_gain)
+            else:
+                want = g
+            out_peak = pk * want
+            if out_peak > self.threshold:
+                want *= (self.threshold / out_peak) ** (1.0 - self.inv_ratio)
+            a = a_att if want < g else a_rel
+            g = a * g + (1.0 - a) * want
+            gains[j] = g
+        self.power = level
+
+        # Gains are reached at the end of each sub-block; ramp between them.
+        knots = np.append(-1, starts + sizes - 1)
+        curve = np.interp(np.arange(n), knots, np.append(np.float32(self.gain), gains))
+        self.gain = g
+
+        if len(self.delay):
+            buf = np.concatenate((self.delay, x))
+            x, self.delay = buf[:n], buf[n:]
+        return (x * curve).astype(np.float32, copy=False)
+
+
+LIMITERS = ("tanh", "lut", "rational", "truepeak")
+
+_LUT_RANGE = 8.0
+_LUT_SIZE = 2048
+_lut = None
+
+
+def _tanh_lut():
+    global _lut
+    if _lut is None:
+        grid = np.linspace(0.0, _LUT_RANGE, _LUT_SIZE + 1, dtype=np.float64)
+        table = np.tanh(grid)
+        _lut = (table[:-1].astype(np.float32), np.diff(table).astype(np.float32))
+    return _lut
+
+
+def soft_clip(x, limit, engine="tanh"):
+    """
+    limit * tanh(x / limit) by the named engine.
+
+    "lut" interpolates a 2048-point table and "rational" uses
+    u(27 + u^2) / (27 + 9u^2) clamped at |u| = 3 (where it reaches 1
+    exactly). Both avoid the transcendental per sample, which matters
+    where numpy has no SIMD tanh (many ARM builds); the table is within
+    1e-5 of tanh, the rational form within 0.025. Work is done in place
+    to keep temporaries down.
+    """
+    lim = np.maximum(np.asarray(limit, dtype=np.float32), np.float32(1e-6))
+    u = x / lim
+    if engine == "lut":
+        table, slope = _tanh_lut()
+        a = np.abs(u)
+        a *= np.float32(_LUT_SIZE / _LUT_RANGE)
+        np.minimum(a, np.float32(_LUT_SIZE - 1e-3), out=a)
+        i = a.astype(np.intp)
+        a -= i
+        y = slope[i]
+        y *= a
+        y += table[i]
+        np.copysign(y, u, out=y)
+        y *= lim
+        return y
+    if engine == "rational":
+        np.maximum(u, np.float32(-3.0), out=u)
+        np.minimum(u, np.float32(3.0), out=u)
+        u2 = u * u
+        y = u2 + np.float32(27.0)
+        y *= u
+        u2 *= np.float32(9.0)
+        u2 += np.float32(27.0)
+        y /= u2
+        y *= lim
+        return y
+    u = np.tanh(u, out=u)
+    u *= lim
+    return u
+
+
+def running_min(x, width):
+    """
+    min(x[i:i + width]) for every full window, in O(n) (van Herk/Gil-Werman):
+    prefix and suffix minima over width-sized chunks, combined pairwise.
+    """
+    n = len(x)
+    chunks = -(-n // width)
+    padded = np.full(chunks * width, np.inf, dtype=x.dtype)
+    padded[:n] = x
+    grid = padded.reshape(chunks, width)
+    prefix = np.minimum.accumulate(grid, axis=1).reshape(-1)
+    suffix = np.minimum.accumulate(grid[:, ::-1], axis=1)[:, ::-1].reshape(-1)
+    count = n - width + 1
+    return np.minimum(suffix[:count], prefix[width - 1:width - 1 + count])
+
+
+class TruePeakLimiter:
+    """
+    Look-ahead limiter on 4x-oversampled (inter-sample) peaks.
+
+    A polyphase windowed-sinc interpolator estimates the true peak around
+    each sample, as the radio's own reconstruction filter would see it. The
+    gain needed to keep it under the ceiling is min-held over twice the
+    look-ahead and averaged over the look-ahead, all vectorized, then
+    applied to audio delayed by the look-ahead, so gain is already down
+    when a peak arrives and never more than needed. A final clip at the
+    ceiling only catches what interpolation error leaves over.
+    """
+
+    OVERSAMPLE = 4
+    TAPS = 12
+
+    def __init__(self, samplerate, lookahead_ms=1.0):
+        self.lookahead = max(self.TAPS, int(round(samplerate * lookahead_ms / 1000.0)))
+        k = np.arange(-(self.TAPS // 2) + 1, self.TAPS // 2 + 1, dtype=np.float64)
+        window = np.kaiser(self.TAPS, 6.0)
+        # Fractional delays 1/4, 2/4, 3/4 between samples (phase 0 is the sample
+        # itself), as columns so all phases come out of one matrix product.
+        phases = np.stack([
+            np.sinc(k - p / float(self.OVERSAMPLE)) * window for p in range(1, self.OVERSAMPLE)
+        ], axis=1)
+        self.phases = (phases / phases.sum(axis=0))[::-1].astype(np.float32)
+        self.history = np.zeros(self.TAPS - 1, dtype=np.float32)
+        hold = 2 * self.lookahead
+        self.wants = np.ones(hold, dtype=np.float32)
+        self.held = np.ones(self.lookahead - 1, dtype=np.float32)
+        self.delay = np.zeros(self.lookahead + self.TAPS // 2, dtype=np.float32)
+
+    def process(self, x, ceiling):
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        n = len(x)
+        if n == 0:
+            return x
+        ceiling = np.float32(max(ceiling, 1e-6))
+
+        # Peak estimate per input sample, lagging by TAPS // 2 (the interpolator delay).
+        ext = np.concatenate((self.history, x))
+        self.history = ext[-(self.TAPS - 1):]
+        taps = np.lib.stride_tricks.sliding_window_view(ext, self.TAPS)
+        peak = np.abs(taps @ self.phases).max(axis=1)
+        np.maximum(peak, np.abs(ext[self.TAPS // 2:self.TAPS // 2 + n]), out=peak)
+        want = np.minimum(np.float32(1.0), ceiling / np.maximum(peak, np.float32(1e-12)))
+
+        # Min-hold then moving average: the average of held values never exceeds
+        # the want of any sample inside the hold window.
+        wants = np.concatenate((self.wants, want))
+        self.wants = wants[-len(self.wants):]
+        held = running_min(wants, len(self.wants) + 1)
+        held = np.concatenate((self.held, held))
+        self.held = held[-(self.lookahead - 1):]
+        csum = np.concatenate(([0.0], np.cumsum(held, dtype=np.float64)))
+        gain = ((csum[self.lookahead:] - csum[:-self.lookahead]) / self.lookahead)
+
+        buf = np.concatenate((self.delay, x))
+        delayed, self.delay = buf[:n], buf[n:]
+        return np.clip(delayed * gain.astype(np.float32), -ceiling, ceiling)
+
+
+def limit_audio(x, limit, limiter="tanh"):
+    """Apply a limiter engine: an engine name from LIMITERS or a TruePeakLimiter."""
+    if isinstance(limiter, TruePeakLimiter):
+        return limiter.process(x, limit)
+    return soft_clip(x, limit, limiter)
+
+
+class Resampler:
+    """
+    Streaming mono sample-rate converter.
+
+    Integer ratios (48000 -> 16000, 16000 -> 48000) use a windowed-sinc
+    FIR with the filter history carried between blocks, so the output is
+    seamless whatever the block sizes. Other ratios fall back to linear
+    interpolation, which is adequate for speech but not for music.
+    """
+
+    TAPS_PER_PHASE = 16
+
+    def __init__(self, src_rate, dst_rate):
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        g = math.gcd(self.src_rate, self.dst_rate)
+        self.up = self.dst_rate // g
+        self.down = self.src_rate // g
+        self.integer = self.up == 1 or self.down == 1
+        self.phase = 0
+        self.position = 0.0
+        self.last = np.float32(0.0)
+        if self.integer and self.up != self.down:
+            factor = max(self.up, self.down)
+            n = self.TAPS_PER_PHASE * factor + 1
+            k = np.arange(n) - (n - 1) / 2.0
+            h = np.sinc(k / factor) / factor * np.kaiser(n, 8.0)
+            self.taps = (h / h.sum() * self.up).astype(np.float32)
+            self.history = np.zeros(n - 1, dtype=np.float32)
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        if self.up == self.down:
+            return x
+        if not self.integer:
+            return self._linear(x)
+        if self.up > 1:
+            stuffed = np.zeros(len(x) * self.up, dtype=np.float32)
+            stuffed[::self.up] = x
+        else:
+            stuffed = x
+        ext = np.concatenate((self.history, stuffed))
+        self.history = ext[len(ext) - len(self.history):]
+        y = np.convolve(ext, self.taps, mode="valid")[:len(stuffed)]
+        out = y[self.phase::self.down]
+        self.phase = (self.phase - len(y)) % self.down
+        return out.astype(np.float32, copy=False)
+
+    def _linear(self, x):
+        step = self.src_rate / float(self.dst_rate)
+        ext = np.concatenate(([self.last], x))
+        # Positions are relative to ext, whose first sample is the last input seen.
+        pos = np.arange(self.position, len(x), step)
+        self.position = pos[-1] + step - len(x) if len(pos) else self.position - len(x)
+        self.last = x[-1] if len(x) else self.last
+        return np.interp(pos, np.arange(len(ext)), ext).astype(np.float32)
+
+
+class DelayLine:
+    """
+    Fixed delay of frames samples in a preallocated ring, for VOX pre-roll.
+
+    process(x, out) stores x and fills out with the samples from frames
+    earlier, copying directly between the caller's arrays and the ring:
+    nothing is allocated per block and any block size works. out must not
+    overlap x.
+    """
+
+    def __init__(self, frames):
+        self.frames = max(int(frames), 0)
+        self.ring = np.zeros(self.frames, dtype=np.float32)
+        self.pos = 0
+
+    def reset(self):
+        self.ring.fill(0.0)
+        self.pos = 0
+
+    def process(self, x, out):
+        n = len(x)
+        d = self.frames
+        ring = self.ring
+        pos = self.pos
+        if d == 0:
+            out[:] = x
+        elif n <= d:
+            # The n oldest samples go out and x takes their slots, wrapping at most once.
+            a = min(n, d - pos)
+            out[:a] = ring[pos:pos + a]
+            ring[pos:pos + a] = x[:a]
+            if a < n:
+                out[a:] = ring[:n - a]
+                ring[:n - a] = x[a:]
+            self.pos = (pos + n) % d
+        else:
+            # Longer than the delay: the whole ring, then the head of x; its tail is kept.
+            a = d - pos
+            out[:a] = ring[pos:]
+            out[a:d] = ring[:pos]
+            out[d:] = x[:n - d]
+            ring[:] = x[n - d:]
+            self.pos = 0
+        return out
+
+
+def rms_level(data):
+    if np is None or data is None:
+        return 0.0
+    try:
+        arr = np.asarray(data, dtype=np.float32)
+        if arr.size == 0:
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(arr))))
+    except Exception:
+        return 0.0
+
+
+def rms_levels(block):
+    if np is None or block is None:
+        return []
+    arr = np.asarray(block, dtype=np.float32)
+    if arr.size == 0:
+        return [0.0] * (arr.shape[1] if arr.ndim == 2 else 1)
+    return np.sqrt(np.mean(np.square(arr), axis=0)).tolist()
+
+
+def zero_out(outdata):
+    try:
+        outdata.fill(0)
+    except Exception:
+        try:
+            outdata[:] = 0
+        except Exception:
+            pass
+
+
+def sanitize_audio(indata, tx_gain=0.02, limit=0.80, dc_block=True, agc=None, limiter="tanh"):
+    if np is None:
+        return indata
+
+    arr = np.asarray(indata, dtype=np.float32)
+
+    if arr.ndim == 2 and arr.shape[1] > 1:
+        mono = np.mean(arr, axis=1, dtype=np.float32)
+    elif arr.ndim == 2 and arr.shape[1] == 1:
+        mono = arr[:, 0]
+    else:
+        mono = arr.reshape(-1)
+
+    if dc_block and mono.size:
+        mono = mono - np.mean(mono, dtype=np.float32)
+
+    if agc is not None:
+        mono = agc.process(mono)
+
+    mono = mono * np.float32(tx_gain)
+
+    if limit > 0:
+        mono = limit_audio(mono, limit, limiter)
+
+    return mono.astype(np.float32).reshape(-1, 1)
+
+
+def sanitize_channels(block, tx_gain, limit, dc_block, agcs=None, limiters="tanh"):
+    """
+    Shape a (frames, channels) block with per-channel parameters in one pass.
+
+    tx_gain and limit are float32 arrays of length channels, dc_block is a
+    0/1 float32 mask and agcs an optional per-column list of LookaheadAgc
+    (or None). limiters is one engine name for every column or a per-column
+    list of names / TruePeakLimiter. Mirrors sanitize_audio() column by column.
+    """
+    arr = np.asarray(block, dtype=np.float32)
+    if arr.size == 0:
+        return arr
+
+    if dc_block.any():
+        arr = arr - np.mean(arr, axis=0, dtype=np.float32) * dc_block
+
+    if agcs is not None:
+        if arr is block:
+            arr = arr.copy()
+        for i, agc in enumerate(agcs):
+            if agc is not None:
+                arr[:, i] = agc.process(arr[:, i])
+
+    arr = arr * tx_gain
+
+    limited = limit > 0
+    if not limited.any():
+        return arr.astype(np.float32, copy=False)
+    if not isinstance(limiters, str):
+        # The common case, one soft-clip engine for every column, stays vectorized.
+        if all(isinstance(x, str) for x in limiters) and len(set(limiters)) == 1:
+            limiters = limiters[0]
+    if isinstance(limiters, str):
+        safe = np.where(limited, limit, np.float32(1.0))
+        arr = np.where(limited, soft_clip(arr, safe, limiters), arr)
+    else:
+        arr = np.array(arr, dtype=np.float32)
+        for i, limiter in enumerate(limiters):
+            if limited[i]:
+                arr[:, i] = limit_audio(arr[:, i], limit[i], limiter)
+
+    return arr.astype(np.float32, copy=False)
@@ -0,0 +1,289 @@
+import collections
+import hmac
+import logging
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from .squelch import Decimator
+except ImportError:
+    from squelch import Decimator
+
+logger = logging.getLogger("zpttlink")
+
+DTMF_ROWS = (697.0, 770.0, 852.0, 941.0)
+DTMF_COLS = (1209.0, 1336.0, 1477.0, 1633.0)
+DTMF_KEYS = ("123A", "456B", "789C", "*0#D")
+# A digit shows up in the decoder at most a window plus a hop (38.4 ms) after
+# it starts; TX audio delayed by this much can be muted from its first sample.
+MUTE_LOOKAHEAD_MS = 40.0
+# Command actions that play a clip, by the clip they need.
+CLIP_ACTIONS = {"force_id": "id"}
+
+
+class DtmfDecoder:
+    """
+    Streaming DTMF detector for the radio-side input.
+
+    The input is decimated to about 8 kHz (FIR low-pass at 1.8 kHz) and a
+    window of window_ms is evaluated every half window against the eight
+    DTMF frequencies. Like the CTCSS bank this is Goertzel in direct form,
+    one small matrix product per window. A window holds a digit when the
+    strongest row and column tone are both above min_level (peak
+    amplitude), each beats the runner-up of its group by 6 dB, their twist
+    is within twist_db (row louder) / reverse_twist_db (column louder) and
+    together they carry at least min_ratio of the window's energy, which
+    is what rejects speech.
+
+    A digit is reported once it has held for min_on_ms and is only
+    reported again after min_off_ms without it, so a held key gives one
+    digit and short talk-off hits are ignored. Reported digits are queued
+    as (digit, monotonic time) in digits for a non-audio thread to drain.
+    """
+
+    def __init__(
+        self, samplerate, window_ms=25.6, min_level=0.01, min_ratio=0.7, twist_db=8.0,
+        reverse_twist_db=4.0, min_on_ms=40, min_off_ms=40,
+    ):
+        factor = max(int(samplerate // 8000), 1)
+        self.rate = samplerate / float(factor)
+        self.decimator = Decimator(samplerate, factor, cutoff=1800.0)
+        n = max(int(self.rate * window_ms / 1000.0), 32)
+        self.n = n
+        self.hop = n // 2
+        hop_ms = 1000.0 * self.hop / self.rate
+        # A window passes the energy test once min_ratio of it is tone, so a tone
+        # of d ms fills about (d - (2 * min_ratio - 1) * window) / hop windows.
+        edge = (2.0 * float(min_ratio) - 1.0) * 1000.0 * n / self.rate
+        self.on_frames = max(int((min_on_ms - edge) // hop_ms), 1)
+        self.off_frames = max(int((min_off_ms + edge) // hop_ms), 1)
+
+        freqs = np.array(DTMF_ROWS + DTMF_COLS)
+        t = np.arange(n) / self.rate
+        self.bank = np.exp(-2j * np.pi * t[:, None] * freqs[None, :]).astype(np.complex64)
+        self.powers = np.zeros(len(freqs), dtype=np.float32)
+        # Tone power -> amplitude: a sine of amplitude a gives |X| = a * n / 2.
+        self.min_power = (min_level * n / 2.0) ** 2
+        self.min_ratio = float(min_ratio)
+        self.peak_ratio = 10.0 ** (6.0 / 10.0)
+        self.twist = 10.0 ** (-float(twist_db) / 10.0)
+        self.reverse_twist = 10.0 ** (float(reverse_twist_db) / 10.0)
+
+        # Every sample is stored twice, so the last n are always one contiguous slice.
+        self.ring = np.zeros(2 * n, dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+        self.pending = 0
+        self.candidate = None
+        self.count = 0
+        self.current = None
+        self.missed = 0
+        self.digits = collections.deque(maxlen=64)
+
+    def _push(self, y):
+        n = self.n
+        k = len(y)
+        a = min(k, n - self.pos)
+        self.ring[self.pos:self.pos + a] = y[:a]
+        self.ring[self.pos + n:self.pos + n + a] = y[:a]
+        if a < k:
+            self.ring[:k - a] = y[a:]
+            self.ring[n:n + k - a] = y[a:]
+        self.pos = (self.pos + k) % n
+        self.filled = min(self.filled + k, n)
+
+    def process(self, x):
+        y = self.decimator.process(x)
+        start = 0
+        while start < len(y):
+            # Feed up to the next hop boundary so every window is evaluated.
+            step = min(len(y) - start, self.hop - self.pending)
+            self._push(y[start:start + step])
+            start += step
+            self.pending += step
+            if self.pending >= self.hop:
+                self.pending = 0
+                if self.filled >= self.n:
+                    self._update(self.detect(self.ring[self.pos:self.pos + self.n]))
+
+    def detect(self, window):
+        """The digit in one window, or None."""
+        np.square(np.abs(window @ self.bank), out=self.powers)
+        p = self.powers.tolist()
+        rows = p[:4]
+        cols = p[4:]
+        r = rows.index(max(rows))
+        c = cols.index(max(cols))
+        pr = rows.pop(r)
+        pc = cols.pop(c)
+        if pr < self.min_power or pc < self.min_power:
+            return None
+        if not self.twist <= pc / pr <= self.reverse_twist:
+            return None
+        if pr < self.peak_ratio * max(rows) or pc < self.peak_ratio * max(cols):
+            return None
+        energy = float(window @ window)
+        if (pr + pc) * 2.0 / self.n < self.min_ratio * energy:
+            return None
+        return DTMF_KEYS[r][c]
+
+    def _update(self, digit):
+        if digit is not None and digit == self.candidate:
+            self.count += 1
+        else:
+            self.candidate = digit
+            self.count = 1
+        if digit is not None and digit == self.current:
+            self.missed = 0
+            return
+        if self.current is not None:
+            self.missed += 1
+            if self.missed < self.off_frames:
+                return
+            self.current = None
+        if digit is not None and self.count >= self.on_frames:
+            self.current = digit
+            self.missed = 0
+            self.digits.append((digit, time.monotonic()))
+
+    @property
+    def tone(self):
+        """A digit is sounding in the current window."""
+        return self.candidate is not None or self.current is not None
+
+    def reset(self):
+        self.candidate = None
+        self.count = 0
+        self.current = None
+        self.missed = 0
+
+
+class DtmfCommands:
+    """
+    PIN-protected command entry: <pin><code># runs the action mapped to
+    code, * clears what has been keyed so far and a pause of timeout_s
+    starts over. After max_failures wrong PINs in a row every digit is
+    ignored for lockout_s.
+    """
+
+    def __init__(self, pin, commands, timeout_s=5.0, max_failures=3, lockout_s=60.0, label=""):
+        self.pin = str(pin or "")
+        self.commands = {str(code): action for code, action in (commands or {}).items()}
+        self.timeout_s = float(timeout_s)
+        self.max_failures = max(int(max_failures), 1)
+        self.lockout_s = float(lockout_s)
+        self.label = label
+        # Everything a valid entry can start with, for muting only a plausible one.
+        self.entries = tuple(self.pin + code for code in self.commands) or (self.pin,)
+        self.buffer = ""
+        self.last_at = None
+        self.failures = 0
+        self.locked_until = 0.0
+        self.accepted = 0
+        self.rejected = 0
+
+    def entering(self, now):
+        """
+        True while at least two keyed digits start a valid PIN and command and
+        have not timed out. A single digit is as likely to be talk-off or a
+        stray key, so it does not count.
+        """
+        buffer = self.buffer
+        if len(buffer) < 2 or now - self.last_at > self.timeout_s:
+            return False
+        return any(entry.startswith(buffer) for entry in self.entries)
+
+    def feed(self, digit, now):
+        """Take one digit; returns the action name when a command completes."""
+        if now < self.locked_until:
+            return None
+        if self.last_at is not None and now - self.last_at > self.timeout_s:
+            self.buffer = ""
+        self.last_at = now
+        if digit == "*":
+            self.buffer = ""
+            return None
+        if digit != "#":
+            self.buffer = (self.buffer + digit)[-32:]
+            return None
+        entered, self.buffer = self.buffer, ""
+        if not hmac.compare_digest(entered[:len(self.pin)], self.pin):
+            self.rejected += 1
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.failures = 0
+                self.locked_until = now + self.lockout_s
+                logger.warning(
+                    f"{self.label}DTMF: {self.max_failures} wrong PINs, "
+                    f"ignoring DTMF for {self.lockout_s:g}s"
+                )
+            else:
+                logger.warning(f"{self.label}DTMF: wrong PIN")
+            return None
+        self.failures = 0
+        code = entered[len(self.pin):]
+        action = self.commands.get(code)
+        if action is None:
+            self.rejected += 1
+            logger.warning(f"{self.label}DTMF: unknown command {code or '(empty)'}")
+            return None
+        self.accepted += 1
+        return action
+
+    def stats(self, now=None):
+        now = time.monotonic() if now is None else now
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "locked_out_s": max(self.locked_until - now, 0.0),
+        }
+
+
+def build_dtmf(cfg, samplerate, actions, label="", clips=()):
+    """
+    (decoder, commands) for the "dtmf" config section, or None when it is off.
+    clips names the clips the channel can play; a command whose action needs
+    a missing one is refused here rather than failing when it is keyed.
+    """
+    if not cfg.get("enabled", False):
+        return None
+    pin = str(cfg.get("pin") or "")
+    if not pin.isdigit() or len(pin) < 4:
+        raise RuntimeError("dtmf.pin must be at least 4 digits (0-9) when dtmf is enabled")
+    commands = cfg.get("commands") or {}
+    for code, action in commands.items():
+        if not str(code) or any(d not in "0123456789ABCD" for d in str(code)):
+            raise RuntimeError(f"dtmf.commands: '{code}' is not a DTMF code (0-9, A-D)")
+        if action not in actions:
+            raise RuntimeError(
+                f"dtmf.commands: unknown action '{action}' (choose from {', '.join(actions)})"
+            )
+        clip = CLIP_ACTIONS.get(action)
+        if clip is not None and clip not in clips:
+            hint = "clips.enabled and clips.callsign" if clip == "id" else "clips.enabled"
+            raise RuntimeError(
+                f"dtmf.commands: '{code}' runs {action}, which plays the '{clip}' clip, "
+                f"but there is no such clip (set {hint})"
+            )
+    decoder = DtmfDecoder(
+        samplerate,
+        min_level=cfg.get("min_level", 0.01),
+        min_ratio=cfg.get("min_ratio", 0.7),
+        twist_db=cfg.get("twist_db", 8.0),
+        reverse_twist_db=cfg.get("reverse_twist_db", 4.0),
+        min_on_ms=cfg.get("min_on_ms", 40),
+        min_off_ms=cfg.get("min_off_ms", 40),
+    )
+    commands = DtmfCommands(
+        pin,
+        commands,
+        timeout_s=cfg.get("timeout_s", 5.0),
+        max_failures=cfg.get("max_failures", 3),
+        lockout_s=cfg.get("lockout_s", 60.0),
+        label=label,
+    )
+    return decoder, commands
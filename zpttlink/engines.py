@@ -0,0 +1,395 @@
+import logging
+import threading
+import types
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import sounddevice as sd
+except Exception:
+    sd = None
+
+try:
+    import jack
+except Exception:
+    jack = None
+
+logger = logging.getLogger("zpttlink")
+
+
+class AudioEngine:
+    """
+    Runs the TX chain on some audio API.
+
+    An engine is built with the duplex channel layout and two callbacks:
+    callback(indata, outdata, frames, time_info, status) with float32
+    (frames, channels) arrays, called once per period, and
+    finished_callback() if the engine stops on its own. samplerate and
+    blocksize are what the engine actually runs at, known once it is
+    built, so the DSP chain is prepared after construction and before
+    start(). time_info carries inputBufferAdcTime, outputBufferDacTime and
+    currentTime on the clock returned by time().
+    """
+
+    name = "base"
+
+    samplerate = None
+    blocksize = 0
+
+    @property
+    def active(self):
+        return False
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        pass
+
+    def time(self):
+        raise NotImplementedError
+
+    def latency(self):
+        """(input, output) latency in seconds as reported by the engine."""
+        return (0.0, 0.0)
+
+    def stats(self):
+        """Engine-specific counters (xruns and the like) for health reports."""
+        return {}
+
+
+class SoundDeviceEngine(AudioEngine):
+    """PortAudio duplex stream through sounddevice: the original engine."""
+
+    name = "sounddevice"
+
+    def __init__(
+        self, callback, finished_callback=None, channels=1, samplerate=48000, blocksize=0,
+        device=None, **_
+    ):
+        if sd is None:
+            raise RuntimeError("sounddevice is not available")
+        self.stream = sd.Stream(
+            device=device,
+            samplerate=samplerate,
+            blocksize=blocksize,
+            channels=channels,
+            dtype="float32",
+            callback=callback,
+            finished_callback=finished_callback,
+        )
+        self.samplerate = int(samplerate)
+        self.blocksize = int(blocksize or 0)
+
+    @property
+    def active(self):
+        return bool(self.stream.active)
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def abort(self):
+        self.stream.abort()
+
+    def close(self):
+        self.stream.close()
+
+    def time(self):
+        return self.stream.time
+
+    def latency(self):
+        return tuple(self.stream.latency)
+
+
+class BlockingEngine(AudioEngine):
+    """
+    PortAudio in blocking mode: a dedicated thread reads the input stream,
+    runs the chain and writes the output stream, so a slow step stalls
+    only this thread instead of PortAudio's callback. The output starts
+    jitter_blocks periods ahead, which absorbs the occasional slow block.
+    When the input has fallen behind, up to max_batch periods are read
+    and processed in one call to catch up.
+    """
+
+    name = "blocking"
+
+    def __init__(
+        self, callback, finished_callback=None, channels=1, samplerate=48000, blocksize=0,
+        device=None, jitter_blocks=2, max_batch=4, **_
+    ):
+        if sd is None:
+            raise RuntimeError("sounddevice is not available")
+        in_ch, out_ch = channels if isinstance(channels, (tuple, list)) else (channels, channels)
+        in_dev, out_dev = device if isinstance(device, (tuple, list)) else (device, device)
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.samplerate = int(samplerate)
+        # Blocking reads need a fixed period; 10 ms unless one is configured.
+        self.blocksize = int(blocksize or 0) or self.samplerate // 100
+        self.jitter_blocks = max(int(jitter_blocks), 0)
+        self.max_batch = max(int(max_batch), 1)
+
+        self.instream = sd.InputStream(
+            device=in_dev, samplerate=self.samplerate, blocksize=self.blocksize,
+            channels=in_ch, dtype="float32",
+        )
+        self.outstream = sd.OutputStream(
+            device=out_dev, samplerate=self.samplerate, blocksize=self.blocksize,
+            channels=out_ch, dtype="float32",
+        )
+        frames = self.blocksize * self.max_batch
+        self.outdata = np.zeros((frames, out_ch), dtype=np.float32)
+        self.silence = np.zeros((self.blocksize, out_ch), dtype=np.float32)
+        self.time_info = types.SimpleNamespace(
+            inputBufferAdcTime=0.0, outputBufferDacTime=0.0, currentTime=0.0
+        )
+        self.overflows = 0
+        self.underflows = 0
+        self.batches = 0
+        self._running = False
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._running
+
+    def start(self):
+        self.instream.start()
+        self.outstream.start()
+        for _ in range(self.jitter_blocks):
+            self.outstream.write(self.silence)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="audio-blocking", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        block = self.blocksize
+        status = None
+        try:
+            while self._running:
+                behind = self.instream.read_available // block
+                frames = block * min(max(behind, 1), self.max_batch)
+                if frames > block:
+                    self.batches += 1
+                indata, overflowed = self.instream.read(frames)
+                if overflowed:
+                    self.overflows += 1
+                    status = "input overflow"
+                now = self.outstream.time
+                t = self.time_info
+                t.currentTime = now
+                t.inputBufferAdcTime = now - self.instream.latency - frames / self.samplerate
+                t.outputBufferDacTime = now + self.outstream.latency
+                outdata = self.outdata[:frames]
+                self.callback(indata, outdata, frames, t, status)
+                status = None
+                if self.outstream.write(outdata):
+                    self.underflows += 1
+                    status = "output underflow"
+        except Exception as e:
+            if self._running:
+                logger.error(f"Blocking audio thread failed: {e}")
+                self._running = False
+                if self.finished_callback is not None:
+                    self.finished_callback()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        self.instream.stop()
+        self.outstream.stop()
+
+    def abort(self):
+        self._running = False
+        self.instream.abort()
+        self.outstream.abort()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def close(self):
+        self.instream.close()
+        self.outstream.close()
+
+    def time(self):
+        return self.outstream.time
+
+    def latency(self):
+        queued = self.jitter_blocks * self.blocksize / float(self.samplerate)
+        return (self.instream.latency, self.outstream.latency + queued)
+
+    def stats(self):
+        return {
+            "overflows": self.overflows,
+            "underflows": self.underflows,
+            "batches": self.batches,
+        }
+
+
+class JackEngine(AudioEngine):
+    """
+    JACK client (also PipeWire's JACK API): the chain runs in the server's
+    process cycle at its rate and quantum, with no PortAudio buffering in
+    between. Ports are named in_N/out_N and connected to the configured
+    ports on start(). A change of server quantum or a server shutdown ends
+    the engine, and the runtime's recovery rebuilds it at the new size.
+    """
+
+    name = "jack"
+
+    def __init__(
+        self, callback, finished_callback=None, channels=1, samplerate=None, blocksize=0,
+        client_name="zpttlink", server=None, connect_inputs=(), connect_outputs=(), **_
+    ):
+        if jack is None:
+            raise RuntimeError("The JACK engine needs the JACK-Client package and libjack")
+        in_ch, out_ch = channels if isinstance(channels, (tuple, list)) else (channels, channels)
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.connect_inputs = list(connect_inputs or ())
+        self.connect_outputs = list(connect_outputs or ())
+
+        self.client = jack.Client(client_name, no_start_server=True, servername=server)
+        self.samplerate = int(self.client.samplerate)
+        self.blocksize = int(self.client.blocksize)
+        if samplerate and int(samplerate) != self.samplerate:
+            logger.warning(
+                f"JACK server runs at {self.samplerate} Hz; audio.samplerate {samplerate} ignored"
+            )
+        self.inports = [self.client.inports.register(f"in_{i + 1}") for i in range(in_ch)]
+        self.outports = [self.client.outports.register(f"out_{i + 1}") for i in range(out_ch)]
+
+        # Preallocated so the process cycle never allocates.
+        self.indata = np.zeros((self.blocksize, in_ch), dtype=np.float32)
+        self.outdata = np.zeros((self.blocksize, out_ch), dtype=np.float32)
+        self.time_info = types.SimpleNamespace(
+            inputBufferAdcTime=0.0, outputBufferDacTime=0.0, currentTime=0.0
+        )
+        self.xruns = 0
+        self._xrun_pending = False
+        self._running = False
+
+        self.client.set_process_callback(self._process)
+        self.client.set_xrun_callback(self._xrun)
+        self.client.set_blocksize_callback(self._blocksize)
+        self.client.set_shutdown_callback(self._shutdown)
+
+    def _process(self, frames):
+        if frames != self.blocksize:
+            # The quantum is changing; _blocksize() hands over to recovery.
+            for port in self.outports:
+                port.get_array().fill(0.0)
+            return
+        for i, port in enumerate(self.inports):
+            self.indata[:, i] = port.get_array()
+        # Cycle start on the JACK clock; output reaches the DAC one period later.
+        start = self.client.last_frame_time
+        t = self.time_info
+        t.currentTime = self.client.frames_to_time(self.client.frame_time) / 1e6
+        t.inputBufferAdcTime = self.client.frames_to_time(start - frames) / 1e6
+        t.outputBufferDacTime = self.client.frames_to_time(start + frames) / 1e6
+        status = "xrun" if self._xrun_pending else None
+        self._xrun_pending = False
+        self.callback(self.indata, self.outdata, frames, t, status)
+        for i, port in enumerate(self.outports):
+            port.get_array()[:] = self.outdata[:, i]
+
+    def _xrun(self, delay_usecs):
+        self.xruns += 1
+        self._xrun_pending = True
+
+    def _blocksize(self, blocksize):
+        if blocksize != self.blocksize and self._running:
+            logger.warning(f"JACK quantum changed {self.blocksize} -> {blocksize}")
+            self._finish()
+
+    def _shutdown(self, status, reason):
+        logger.warning(f"JACK server shut down: {reason}")
+        self._finish()
+
+    def _finish(self):
+        self._running = False
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+    @property
+    def active(self):
+        return self._running
+
+    def start(self):
+        self.client.activate()
+        self._running = True
+        for port, target in zip(self.inports, self.connect_inputs):
+            self._connect(target, port)
+        for port, target in zip(self.outports, self.connect_outputs):
+            self._connect(port, target)
+        logger.info(
+            f"JACK client '{self.client.name}': {self.samplerate} Hz, quantum {self.blocksize} "
+            f"({1000.0 * self.blocksize / self.samplerate:.1f} ms)"
+        )
+
+    def _connect(self, source, destination):
+        try:
+            self.client.connect(source, destination)
+        except Exception as e:
+            logger.warning(f"JACK connect {source} -> {destination} failed: {e}")
+
+    def stop(self):
+        self._running = False
+        self.client.deactivate()
+
+    def close(self):
+        self.client.close()
+
+    def time(self):
+        return self.client.frames_to_time(self.client.frame_time) / 1e6
+
+    def latency(self):
+        def port_latency(ports, mode):
+            worst = 0
+            for port in ports:
+                try:
+                    worst = max(worst, max(port.get_latency_range(mode)))
+                except Exception:
+                    pass
+            return worst
+
+        sr = float(self.samplerate)
+        period = self.blocksize / sr
+        capture = port_latency(self.inports, getattr(jack, "CAPTURE", 0)) / sr
+        playback = port_latency(self.outports, getattr(jack, "PLAYBACK", 1)) / sr
+        return (capture + period, playback + period)
+
+    def stats(self):
+        return {"xruns": self.xruns}
+
+
+ENGINES = {
+    "sounddevice": SoundDeviceEngine,
+    "blocking": BlockingEngine,
+    "jack": JackEngine,
+}
+
+# Engines that open PortAudio devices by index.
+PORTAUDIO_ENGINES = ("sounddevice", "blocking")
+
+
+def build_engine(name, **kwargs):
+    engine = ENGINES.get(name)
+    if engine is None:
+        raise RuntimeError(f"Unknown audio engine '{name}' (choose from {', '.join(ENGINES)})")
+    return engine(**kwargs)
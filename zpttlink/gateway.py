@@ -0,0 +1,308 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+try:
+    from . import main as core
+except ImportError:
+    import main as core
+
+logger = logging.getLogger("zpttlink")
+
+
+def build_link_configs(cfg):
+    base = {k: v for k, v in cfg.items() if k not in ("links", "gateway")}
+    links = []
+    seen = set()
+    for i, link in enumerate(cfg.get("links") or []):
+        if not isinstance(link, dict):
+            raise RuntimeError(f"links[{i}] must be an object")
+        link_cfg = core.merge_defaults(base, link)
+        name = str(link.get("name") or f"link{i + 1}")
+        if name in seen:
+            raise RuntimeError(f"Duplicate link name: {name}")
+        seen.add(name)
+        link_cfg["name"] = name
+        links.append(link_cfg)
+    return links
+
+
+def available_cores():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except Exception:
+        return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(link_count, workers=0, cores=None):
+    """Assign links round-robin to workers and workers round-robin to cores."""
+    cores = list(cores) if cores else available_cores()
+    if workers <= 0:
+        workers = min(link_count, len(cores))
+    workers = max(1, min(workers, link_count))
+    plan = []
+    for w in range(workers):
+        plan.append({
+            "worker": w,
+            "core": cores[w % len(cores)],
+            "links": list(range(w, link_count, workers)),
+        })
+    return plan
+
+
+def pin_to_core(core_id):
+    if core_id is None or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, {int(core_id)})
+        return True
+    except Exception:
+        return False
+
+
+def worker_main(worker_id, core_id, pin, link_cfgs, args, health_queue, stop, interval):
+    # The supervisor owns Ctrl+C; workers only leave when told to.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    lg = core.configure_logging(link_cfgs[0], args.log_level, suffix=f"w{worker_id}")
+    pinned = pin_to_core(core_id) if pin else False
+    lg.info(
+        f"Worker {worker_id} (pid={os.getpid()}) serving {len(link_cfgs)} link(s)"
+        + (f", pinned to core {core_id}" if pinned else "")
+    )
+
+    runtimes = []
+    for link_cfg in link_cfgs:
+        rt = core.LinkRuntime(link_cfg, args, name=link_cfg["name"])
+        runtimes.append(rt)
+        try:
+            if rt.input_index is None or rt.output_index is None:
+                raise RuntimeError("audio_input_index and audio_output_index must be set")
+            rt.init_hotkey()
+            rt.open()
+            rt.log_settings()
+            rt.start()
+        except (Exception, SystemExit) as e:
+            rt.error = str(e) or e.__class__.__name__
+            lg.error(f"{rt.label}Link failed to start: {rt.error}")
+            rt.stop()
+            rt.close()
+            rt.report_fault(f"start failed: {rt.error}")
+
+    def report():
+        for rt in runtimes:
+            h = rt.health()
+            h.update({"worker": worker_id, "core": core_id if pinned else None, "pid": os.getpid()})
+            health_queue.put(h)
+
+    def apply(cfg):
+        by_name = {c["name"]: c for c in build_link_configs(cfg)}
+        for rt in runtimes:
+            if rt.name in by_name:
+                rt.apply_config(by_name[rt.name])
+
+    # The supervisor does not own the control channel; workers only follow the file.
+    _, _, services = core.start_live_config(link_cfgs[0], args, apply, control=False)
+
+    try:
+        report()
+        next_report = time.monotonic() + interval
+        while not stop.wait(0.1):
+            for rt in runtimes:
+                rt.supervise()
+            if time.monotonic() >= next_report:
+                next_report += interval
+                report()
+    finally:
+        for service in services:
+            service.stop()
+        for rt in runtimes:
+            rt.stop()
+            rt.close()
+        lg.info(f"Worker {worker_id} stopped.")
+
+
+class GatewaySupervisor:
+    def __init__(self, cfg, args):
+        self.args = core.scoped_args(args)
+        self.links = build_link_configs(cfg)
+
+        gw = cfg.get("gateway", {})
+        self.pin = bool(gw.get("pin_cores", True))
+        self.interval = float(gw.get("health_interval_s", 5.0))
+        self.health_file = gw.get("health_file")
+        self.backoff = float(gw.get("restart_backoff_s", 2.0))
+        self.backoff_max = float(gw.get("restart_backoff_max_s", 60.0))
+        self.plan = plan_workers(len(self.links), int(gw.get("workers", 0) or 0), gw.get("cores"))
+
+        # Spawn, not fork: PortAudio is initialized at import time in this process.
+        self.ctx = multiprocessing.get_context("spawn")
+        self.stop = self.ctx.Event()
+        self.health_queue = self.ctx.Queue()
+        self.procs = {}
+        self.backoffs = {
+            entry["worker"]: core.Backoff(self.backoff, self.backoff_max) for entry in self.plan
+        }
+        self.restart_at = {}
+        self.health = {}
+        self._last_summary = 0.0
+
+    def start_worker(self, entry):
+        link_cfgs = [self.links[i] for i in entry["links"]]
+        proc = self.ctx.Process(
+            target=worker_main,
+            name=f"zpttlink-w{entry['worker']}",
+            args=(
+                entry["worker"],
+                entry["core"],
+                self.pin,
+                link_cfgs,
+                self.args,
+                self.health_queue,
+                self.stop,
+                self.interval,
+            ),
+            daemon=True,
+        )
+        proc.start()
+        self.procs[entry["worker"]] = proc
+        logger.info(
+            f"Started worker {entry['worker']} (pid={proc.pid}, core={entry['core']}): "
+            + ", ".join(c["name"] for c in link_cfgs)
+        )
+
+    def start(self):
+        for entry in self.plan:
+            self.start_worker(entry)
+
+    def drain_health(self, timeout):
+        try:
+            h = self.health_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            h["received_at"] = time.time()
+            self.health[h["name"]] = h
+            try:
+                h = self.health_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def check_workers(self):
+        now = time.monotonic()
+        for entry in self.plan:
+            wid = entry["worker"]
+            proc = self.procs.get(wid)
+            if proc is not None and proc.is_alive():
+                continue
+
+            if wid not in self.restart_at:
+                delay = self.backoffs[wid].next()
+                self.restart_at[wid] = now + delay
+                exitcode = proc.exitcode if proc is not None else None
+                logger.error(f"Worker {wid} exited (code={exitcode}); restarting in {delay:.1f}s")
+                for i in entry["links"]:
+                    name = self.links[i]["name"]
+                    h = self.health.setdefault(name, {"name": name})
+                    h["error"] = f"worker {wid} exited"
+                    h["stream_active"] = False
+                    h["ptt"] = False
+            elif now >= self.restart_at[wid]:
+                del self.restart_at[wid]
+                self.start_worker(entry)
+
+    def link_status(self, h):
+        if h.get("recovering"):
+            return "recovering"
+        if h.get("error"):
+            return "error"
+        if time.time() - h.get("received_at", 0) > 3 * self.interval:
+            return "stale"
+        return "up" if h.get("stream_active") else "down"
+
+    def summary(self):
+        out = []
+        for link in self.links:
+            h = self.health.get(link["name"], {"name": link["name"]})
+            m = h.get("metrics", {})
+            out.append({
+                "name": link["name"],
+                "status": self.link_status(h),
+                "worker": h.get("worker"),
+                "core": h.get("core"),
+                "pid": h.get("pid"),
+                "backend": h.get("backend"),
+                "ptt": h.get("ptt", False),
+                "error": h.get("error"),
+                "counters": m.get("counters", {}),
+                "gauges": m.get("gauges", {}),
+                "callback_ms": m.get("timings", {}).get("callback_ms", {}),
+            })
+        return out
+
+    def log_summary(self):
+        for s in self.summary():
+            cb = s["callback_ms"]
+            logger.info(
+                f"[{s['name']}] {s['status']} worker={s['worker']} core={s['core']} "
+                f"ptt={'ON' if s['ptt'] else 'off'} callbacks={s['counters'].get('callbacks', 0)} "
+                f"xruns={s['counters'].get('status_flags', 0)} "
+                f"level={s['gauges'].get('level', 0.0):.4f} "
+                f"cb_max={cb.get('max', 0.0):.2f}ms"
+                + (f" error={s['error']}" if s["error"] else "")
+            )
+
+    def write_health_file(self):
+        if not self.health_file:
+            return
+        tmp = f"{self.health_file}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"time": time.time(), "links": self.summary()}, f, indent=2)
+                f.write("\n")
+            os.replace(tmp, self.health_file)
+        except Exception as e:
+            logger.warning(f"Failed to write health file: {e}")
+
+    def run(self, stop_event):
+        self.start()
+        while not stop_event.is_set():
+            self.drain_health(timeout=0.2)
+            self.check_workers()
+            now = time.monotonic()
+            if now - self._last_summary >= self.interval:
+                self._last_summary = now
+                self.log_summary()
+                self.write_health_file()
+
+    def shutdown(self):
+        self.stop.set()
+        deadline = time.monotonic() + 5.0
+        for proc in self.procs.values():
+            proc.join(max(0.0, deadline - time.monotonic()))
+        for proc in self.procs.values():
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(1.0)
+
+
+def run_gateway(cfg, args, stop_event):
+    try:
+        supervisor = GatewaySupervisor(cfg, args)
+    except RuntimeError as e:
+        logger.error(f"Invalid gateway config: {e}")
+        return 9
+
+    logger.info(
+        f"Gateway mode: {len(supervisor.links)} link(s) on {len(supervisor.plan)} worker(s)"
+    )
+    try:
+        supervisor.run(stop_event)
+    finally:
+        supervisor.shutdown()
+        logger.info("ZPTTLink gateway stopped. Goodbye.")
+    return 0
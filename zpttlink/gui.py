@@ -37,8 +37,12 @@ from PySide6.QtWidgets import (
 )
 
 try:
+    from .control import send_command
+    from .keyinject import available_injectors
     from .main import DEFAULT_CONFIG, list_audio_devices, list_serial_ports, load_config
 except ImportError:
+    from control import send_command
+    from keyinject import available_injectors
     from main import DEFAULT_CONFIG, list_audio_devices, list_serial_ports, load_config
 
 
@@ -446,8 +450,10 @@ class MainWindow(QMainWindow):
         self.lbl_android_runtime.setText(android_runtime)
 
         if system == "Linux":
-            helper_ok = shutil.which("ydotool") is not None
-            self.lbl_helper.setText("ydotool: Yes" if helper_ok else "ydotool: No")
+            injectors = available_injectors()
+            self.lbl_helper.setText(
+                f"Key injection: {', '.join(injectors)}" if injectors else "Key injection: X11 only"
+            )
         else:
             self.lbl_helper.setText("n/a")
 
@@ -715,7 +721,30 @@ class MainWindow(QMainWindow):
         )
         proc.start()
 
+    def _send_gui_ptt(self, state: bool):
+        """Post the button to the running core's PTT arbiter as the "gui" source."""
+        if not self.proc:
+            return
+        ctl = self.cfg.get("control", {})
+        if not ctl.get("enabled", False):
+            self.log("Manual PTT only reaches the radio with control.enabled in config.json.")
+            return
+        try:
+            reply = send_command(
+                {"cmd": "ptt", "source": "gui", "state": state},
+                host=ctl.get("host", "127.0.0.1"),
+                port=ctl.get("port", 7355),
+                token=ctl.get("token"),
+                timeout=0.5,
+            )
+        except OSError as e:
+            self.log(f"Manual PTT: control channel unreachable: {e}")
+            return
+        if not reply.get("ok"):
+            self.log(f"Manual PTT refused: {reply.get('error')}")
+
     def manual_ptt_down(self):
+        self._send_gui_ptt(True)
         if self.current_ptt_down:
             return
         self.current_ptt_down = True
@@ -723,6 +752,7 @@ class MainWindow(QMainWindow):
         self.log("Manual PTT DOWN")
 
     def manual_ptt_up(self):
+        self._send_gui_ptt(False)
         if not self.current_ptt_down:
             return
         self.current_ptt_down = False
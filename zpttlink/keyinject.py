@@ -0,0 +1,436 @@
+import errno
+import logging
+import os
+import platform
+import socket
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+logger = logging.getLogger("zpttlink")
+
+# Hotkeys are carried around as canonical names; each injector maps them itself.
+KEY_ALIASES = {
+    "escape": "esc",
+    "return": "enter",
+    "win": "cmd",
+    "super": "cmd",
+    "meta": "cmd",
+    "control": "ctrl",
+}
+
+# linux/input-event-codes.h
+EV_SYN = 0x00
+EV_KEY = 0x01
+SYN_REPORT = 0
+LINUX_KEYCODES = {
+    "esc": 1, "tab": 15, "enter": 28, "space": 57,
+    "ctrl": 29, "shift": 42, "alt": 56, "cmd": 125,
+    "-": 12, "=": 13, "[": 26, "]": 27, ";": 39, "'": 40, "`": 41, "\\": 43,
+    ",": 51, ".": 52, "/": 53,
+}
+LINUX_KEYCODES.update({f"f{i}": 58 + i for i in range(1, 11)})
+LINUX_KEYCODES.update({"f11": 87, "f12": 88})
+LINUX_KEYCODES.update({f"f{i}": 170 + i for i in range(13, 25)})
+LINUX_KEYCODES.update({str(d): 1 + d for d in range(1, 10)})
+LINUX_KEYCODES["0"] = 11
+for _row, _first in (("qwertyuiop", 16), ("asdfghjkl", 30), ("zxcvbnm", 44)):
+    for _i, _ch in enumerate(_row):
+        LINUX_KEYCODES[_ch] = _first + _i
+
+# struct input_event: struct timeval, __u16 type, __u16 code, __s32 value
+_INPUT_EVENT = struct.Struct("llHHi")
+
+# linux/uinput.h
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_DEV_SETUP = 0x405C5503
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+BUS_USB = 0x03
+_UINPUT_SETUP = struct.Struct("HHHH80sI")
+_UINPUT_USER_DEV = struct.Struct("80sHHHHi" + "i" * 256)
+
+UINPUT_PATH = "/dev/uinput"
+DEVICE_NAME = b"ZPTTLink virtual keyboard"
+
+
+def canonical_key(name, default="f9"):
+    if not name:
+        return default
+    s = str(name).strip().lower()
+    s = KEY_ALIASES.get(s, s)
+    if s in LINUX_KEYCODES or len(s) == 1:
+        return s
+    return default
+
+
+def _key_event(code, value):
+    return (
+        _INPUT_EVENT.pack(0, 0, EV_KEY, code, value)
+        + _INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+    )
+
+
+def _linux_code(key):
+    code = LINUX_KEYCODES.get(key)
+    if code is None:
+        raise RuntimeError(f"Key '{key}' has no Linux keycode")
+    return code
+
+
+class PynputInjector:
+    """X11, macOS and Windows through pynput; imported only when used."""
+
+    name = "pynput"
+
+    def __init__(self):
+        self.controller = None
+        self.keys = None
+
+    def open(self):
+        from pynput.keyboard import Controller, Key
+
+        self.controller = Controller()
+        self.keys = {
+            "esc": Key.esc, "tab": Key.tab, "enter": Key.enter, "space": Key.space,
+            "ctrl": Key.ctrl, "shift": Key.shift, "alt": Key.alt, "cmd": Key.cmd,
+        }
+        for i in range(1, 25):
+            if hasattr(Key, f"f{i}"):
+                self.keys[f"f{i}"] = getattr(Key, f"f{i}")
+
+    def _key(self, key):
+        return self.keys.get(key, key)
+
+    def press(self, key):
+        self.controller.press(self._key(key))
+
+    def release(self, key):
+        self.controller.release(self._key(key))
+
+    def close(self):
+        self.controller = None
+
+
+class UinputInjector:
+    """
+    Native Linux virtual keyboard on /dev/uinput.
+
+    The device is created once in open(); each key event afterwards is a
+    single write() of two input_event structs, which works under Wayland
+    and X11 alike. Needs write access to /dev/uinput (e.g. a udev rule
+    giving the "input" group rw).
+    """
+
+    name = "uinput"
+
+    def __init__(self, path=UINPUT_PATH):
+        self.path = path
+        self.fd = None
+
+    @classmethod
+    def available(cls, path=UINPUT_PATH):
+        return fcntl is not None and os.access(path, os.W_OK)
+
+    def open(self):
+        if fcntl is None:
+            raise RuntimeError("uinput needs fcntl (Linux only)")
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            raise RuntimeError(
+                f"Cannot open {self.path}: {e.strerror}. Load the uinput module and grant "
+                'write access, e.g. KERNEL=="uinput", GROUP="input", MODE="0660"'
+            )
+        try:
+            fcntl.ioctl(fd, UI_SET_EVBIT, EV_KEY)
+            for code in sorted(set(LINUX_KEYCODES.values())):
+                fcntl.ioctl(fd, UI_SET_KEYBIT, code)
+            try:
+                fcntl.ioctl(fd, UI_DEV_SETUP, _UINPUT_SETUP.pack(BUS_USB, 0x1209, 0x7a70, 1,
+                                                                 DEVICE_NAME, 0))
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOTTY):
+                    raise
+                # Kernels before 4.5 take the legacy uinput_user_dev write instead.
+                os.write(fd, _UINPUT_USER_DEV.pack(DEVICE_NAME, BUS_USB, 0x1209, 0x7a70, 1, 0,
+                                                   *([0] * 256)))
+            fcntl.ioctl(fd, UI_DEV_CREATE)
+        except Exception:
+            os.close(fd)
+            raise
+        self.fd = fd
+        # Give udev and the compositor a moment to pick up the new device, once.
+        time.sleep(0.2)
+
+    def press(self, key):
+        os.write(self.fd, _key_event(_linux_code(key), 1))
+
+    def release(self, key):
+        os.write(self.fd, _key_event(_linux_code(key), 0))
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+        except OSError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+
+def ydotool_socket_path():
+    return os.environ.get("YDOTOOL_SOCKET") or "/tmp/.ydotool_socket"
+
+
+class YdotoolInjector:
+    """
+    Key events through a running ydotoold (ydotool 1.x), over one persistent socket.
+
+    ydotoold owns the uinput device, so this works where only the daemon
+    has /dev/uinput access, without forking ydotool for every key.
+    """
+
+    name = "ydotool"
+
+    def __init__(self, path=None):
+        self.path = path or ydotool_socket_path()
+        self.sock = None
+
+    @classmethod
+    def available(cls, path=None):
+        path = path or ydotool_socket_path()
+        return hasattr(socket, "AF_UNIX") and os.path.exists(path)
+
+    def open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # A wedged daemon must not hang the PTT path; a timeout surfaces as an error.
+        sock.settimeout(0.1)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise RuntimeError(f"Cannot reach ydotoold at {self.path}: {e.strerror}")
+        self.sock = sock
+
+    def _send(self, code, value):
+        self.sock.send(_INPUT_EVENT.pack(0, 0, EV_KEY, code, value))
+        self.sock.send(_INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0))
+
+    def press(self, key):
+        self._send(_linux_code(key), 1)
+
+    def release(self, key):
+        self._send(_linux_code(key), 0)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+INJECTORS = {
+    "pynput": PynputInjector,
+    "uinput": UinputInjector,
+    "ydotool": YdotoolInjector,
+}
+
+
+def wayland_session():
+    return (
+        os.environ.get("XDG_SESSION_TYPE", "").lower() == "wayland"
+        or bool(os.environ.get("WAYLAND_DISPLAY"))
+    )
+
+
+def candidate_injectors(backend="auto"):
+    backend = str(backend or "auto").lower()
+    if backend != "auto":
+        if backend not in INJECTORS:
+            raise RuntimeError(
+                f"Unknown hotkey_backend '{backend}' (use auto, {', '.join(INJECTORS)})"
+            )
+        return [backend]
+    if platform.system() != "Linux":
+        return ["pynput"]
+    if wayland_session() or not os.environ.get("DISPLAY"):
+        return ["uinput", "ydotool", "pynput"]
+    return ["pynput", "uinput", "ydotool"]
+
+
+def available_injectors():
+    """Names of Linux injectors that look usable right now, without opening anything."""
+    found = []
+    if UinputInjector.available():
+        found.append("uinput")
+    if YdotoolInjector.available():
+        found.append("ydotool")
+    return found
+
+
+def open_injector(backend="auto"):
+    errors = []
+    for name in candidate_injectors(backend):
+        injector = INJECTORS[name]()
+        try:
+            injector.open()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        return injector
+    raise RuntimeError("No key injection backend available (" + "; ".join(errors) + ")")
+
+
+def benchmark(names, key="f20", count=200, gap_s=0.005):
+    """Time press()/release() calls per injector; returns {name: stats or error}."""
+    results = {}
+    for name in names:
+        injector = INJECTORS[name]()
+        try:
+            injector.open()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        samples = []
+        try:
+            for _ in range(count):
+                for action in (injector.press, injector.release):
+                    started = time.perf_counter()
+                    action(key)
+                    samples.append((time.perf_counter() - started) * 1000.0)
+                    time.sleep(gap_s)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        finally:
+            injector.close()
+        samples.sort()
+        n = len(samples)
+        results[name] = {
+            "n": n,
+            "p50": samples[n // 2],
+            "p99": samples[min(n - 1, int(n * 0.99))],
+            "max": samples[-1],
+        }
+    return results
+
+
+class HotkeyWorker:
+    """
+    Injects the hotkey on its own thread so PTT keying never waits on it.
+
+    request() only records the wanted key state and returns. The worker
+    acts on the latest state, so transitions queued while an injection
+    was blocked collapse into one. A pressed key is held for at least
+    min_hold_ms: a release inside that window waits, and a new press
+    during the wait cancels it, so a short up/down blip never reaches the
+    application. On stop() the key is always left released.
+    """
+
+    RETRY_S = 1.0
+
+    def __init__(self, key, press, release, min_hold_ms=100, name="hotkey"):
+        self.key = key
+        self._press = press
+        self._release = release
+        self.min_hold = max(float(min_hold_ms), 0.0) / 1000.0
+        self.name = name
+        self.trace = None
+
+        self.cond = threading.Condition()
+        self.desired = False
+        self.force = False
+        self.pressed = False
+        self.pressed_at = 0.0
+        self.stopping = False
+
+        self.requests = 0
+        self.injections = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def request(self, state, force=False):
+        with self.cond:
+            self.requests += 1
+            self.desired = bool(state)
+            self.force = bool(force and not state)
+            self.cond.notify()
+
+    def stop(self, timeout=2.0):
+        with self.cond:
+            self.stopping = True
+            self.desired = False
+            self.cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "injections": self.injections,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "pressed": self.pressed,
+        }
+
+    def _inject(self, state):
+        try:
+            if state:
+                self._press(self.key)
+                self.pressed_at = time.monotonic()
+            else:
+                self._release(self.key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Hotkey {'press' if state else 'release'} failed: {e}")
+            return False
+        self.pressed = state
+        self.injections += 1
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.desired == self.pressed and not self.stopping:
+                    self.cond.wait()
+                if self.stopping:
+                    break
+                target = self.desired
+                force = self.force
+
+            if target:
+                if self.trace is not None:
+                    self.trace("queue")
+                ok = self._inject(True)
+                if ok and self.trace is not None:
+                    self.trace("hotkey")
+            else:
+                hold = self.pressed_at + self.min_hold - time.monotonic()
+                if hold > 0 and not force:
+                    with self.cond:
+                        self.cond.wait_for(lambda: self.desired or self.stopping, timeout=hold)
+                        if self.desired and not self.stopping:
+                            # Re-pressed within the hold: keep the key down.
+                            self.coalesced += 1
+                            continue
+                ok = self._inject(False)
+
+            if not ok:
+                with self.cond:
+                    self.cond.wait(self.RETRY_S)
+
+        if self.pressed:
+            self._inject(False)
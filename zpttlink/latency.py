@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import pty
+    import tty
+except Exception:
+    pty = None
+
+try:
+    from . import main as core
+    from .radio import RadioInterfaceBase
+except ImportError:
+    import main as core
+    from radio import RadioInterfaceBase
+
+logger = logging.getLogger("zpttlink")
+
+STAGES = ("callback", "gate", "queue", "hotkey", "backend", "line")
+
+
+class PtyLoopbackRadio(RadioInterfaceBase):
+    """
+    Stand-in serial PTT: each key-up writes a byte to a pty and a peer
+    thread on the other side timestamps its arrival, so the measured path
+    includes a real kernel tty hop. Modem lines cannot be toggled on a pty.
+    """
+
+    name = "loopback"
+
+    def __init__(self, on_line=None):
+        self.on_line = on_line
+        self.master = None
+        self.slave = None
+        self._peer = None
+
+    def open(self):
+        if pty is None:
+            raise RuntimeError("pty loopback is not available on this platform")
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self._peer = threading.Thread(
+            target=self._read_peer, args=(self.master,), name="pty-peer", daemon=True
+        )
+        self._peer.start()
+
+    def _read_peer(self, fd):
+        while True:
+            try:
+                data = os.read(fd, 1)
+            except OSError:
+                return
+            if not data:
+                return
+            if data == b"1" and self.on_line is not None:
+                self.on_line()
+
+    def ptt_on(self, dry=False):
+        os.write(self.slave, b"1")
+
+    def ptt_off(self, dry=False):
+        os.write(self.slave, b"0")
+
+    def close(self):
+        for fd in (self.slave, self.master):
+            try:
+                if fd is not None:
+                    os.close(fd)
+            except OSError:
+                pass
+        self.master = self.slave = None
+
+
+class LatencyProbe:
+    """Collects perf_counter timestamps per stage, relative to burst onset."""
+
+    def __init__(self):
+        self.onset = None
+        self.callback_entry = None
+        self.samples = {stage: [] for stage in STAGES}
+        self._seen = set()
+
+    def start_burst(self, now):
+        self.onset = now
+        self._seen = set()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if self.onset is None or stage in self._seen:
+            return
+        self._seen.add(stage)
+        if stage == "gate" and self.callback_entry is not None:
+            # Entry of the callback that made the decision; gate - callback is processing time.
+            self.samples["callback"].append((self.callback_entry - self.onset) * 1000.0)
+        self.samples.setdefault(stage, []).append((now - self.onset) * 1000.0)
+
+    def summary(self):
+        out = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            arr = np.asarray(values)
+            out[stage] = {
+                "n": int(arr.size),
+                "p50": float(np.percentile(arr, 50)),
+                "p99": float(np.percentile(arr, 99)),
+                "max": float(arr.max()),
+            }
+        return out
+
+
+def drive_null_device(runtime, probe, bursts, samplerate, blocksize, burst_ms, gap_ms):
+    """Feed the runtime's callback in real time from synthesized blocks, like a null device."""
+    block_s = blocksize / float(samplerate)
+    t = np.arange(blocksize, dtype=np.float32) / samplerate
+    tone = (0.3 * np.sin(2 * np.pi * 1000.0 * t)).astype(np.float32).reshape(-1, 1)
+    silence = np.zeros((blocksize, 1), dtype=np.float32)
+    outdata = np.zeros((blocksize, 1), dtype=np.float32)
+
+    burst_blocks = max(1, int(round(burst_ms / 1000.0 / block_s)))
+    gap_blocks = max(1, int(round(gap_ms / 1000.0 / block_s)))
+    pattern = [False] * gap_blocks + [True] * burst_blocks
+
+    deadline = time.perf_counter()
+    for _ in range(bursts):
+        for i, loud in enumerate(pattern):
+            deadline += block_s
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            entry = time.perf_counter()
+            if loud and not pattern[i - 1]:
+                probe.start_burst(entry)
+            probe.callback_entry = entry
+            runtime.audio_callback(tone if loud else silence, outdata, blocksize, None, None)
+
+
+def measure_backend(cfg, args, label, backend_factory, bursts):
+    probe = LatencyProbe()
+    runtime = core.LinkRuntime(cfg, args)
+    ch = runtime.channels[0]
+    chain = ch.chain
+    chain.params = chain.params._replace(vox_enabled=True, vox_log_levels=False)
+    runtime.init_hotkey()
+
+    backend = backend_factory(probe)
+    ch.open(backend=backend)
+    ch.ptt.trace = probe.mark
+
+    samplerate = int(cfg.get("audio", {}).get("samplerate", 48000))
+    blocksize = int(cfg.get("audio", {}).get("blocksize", 0) or 480)
+    gap_ms = chain.params.vox_release_ms + chain.params.vox_hang_ms + 200
+    burst_ms = max(300, chain.params.vox_attack_ms + 200)
+
+    logger.info(f"Measuring {label}: {bursts} bursts, block={blocksize} @ {samplerate} Hz")
+    try:
+        drive_null_device(runtime, probe, bursts, samplerate, blocksize, burst_ms, gap_ms)
+        time.sleep(0.2)
+    finally:
+        ch.stop()
+        ch.close()
+    return probe.summary()
+
+
+def print_report(results):
+    print(f"{'backend':<12} {'stage':<8} {'n':>4} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for label, stages in results.items():
+        for stage in STAGES:
+            s = stages.get(stage)
+            if not s:
+                continue
+            print(
+                f"{label:<12} {stage:<8} {s['n']:>4} "
+                f"{s['p50']:>9.3f} {s['p99']:>9.3f} {s['max']:>9.3f}"
+            )
+    print("Times are ms from the first callback carrying the burst; "
+          "'callback' and 'gate' include the VOX attack time.")
+
+
+def run_latency(cfg, args):
+    bursts = max(1, int(args.latency_bursts))
+    plan = []
+    if args.latency_backend in ("both", "loopback"):
+        plan.append((
+            "loopback",
+            lambda probe: PtyLoopbackRadio(on_line=lambda: probe.mark("line")),
+        ))
+    if args.latency_backend in ("both", "configured"):
+        plan.append(("configured", lambda probe: core.build_radio_backend(cfg, args)))
+
+    results = {}
+    for label, factory in plan:
+        try:
+            summary = measure_backend(cfg, args, label, factory, bursts)
+        except (Exception, SystemExit) as e:
+            logger.error(f"Latency measurement for {label} failed: {e}")
+            continue
+        if label == "configured":
+            label = cfg.get("radio_type", "configured")
+        results[label] = summary
+
+    if not results:
+        return 1
+    print_report(results)
+
+    out = cfg.get("latency", {}).get("report_file")
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return 0
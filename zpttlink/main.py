@@ -9,7 +9,6 @@ import threading
 import time
 from logging.handlers import RotatingFileHandler
 
-import serial
 from serial.tools import list_ports
 
 try:
@@ -23,12 +22,43 @@ except Exception:
     sd = None
 
 try:
-    import usb.core
-    import usb.util
-except Exception:
-    usb = None
-
-from pynput.keyboard import Controller, Key
+    from . import keyinject
+    from .arbiter import PttArbiter, default_wheel
+    from .audio import AudioRouter
+    from .dsp import AGC_SETTINGS, LIMITERS, zero_out
+    from .dtmf import CLIP_ACTIONS
+    from .engines import ENGINES, PORTAUDIO_ENGINES, build_engine
+    from .metrics import Metrics, Timing
+    from .ptt import PttScheduler
+    from .radio import (
+        RadioConfigError,
+        available_backends,
+        get_radio,
+        load_backend,
+    )
+    from .recorder import TxRecorder
+    from .rt import RealtimeMode
+    from .txchain import SplitChains, TxChain, TxParams
+    from .zello import DEFAULT_URL as ZELLO_URL, RxBuffer, ZelloClient
+except ImportError:
+    import keyinject
+    from arbiter import PttArbiter, default_wheel
+    from audio import AudioRouter
+    from dsp import AGC_SETTINGS, LIMITERS, zero_out
+    from dtmf import CLIP_ACTIONS
+    from engines import ENGINES, PORTAUDIO_ENGINES, build_engine
+    from metrics import Metrics, Timing
+    from ptt import PttScheduler
+    from radio import (
+        RadioConfigError,
+        available_backends,
+        get_radio,
+        load_backend,
+    )
+    from recorder import TxRecorder
+    from rt import RealtimeMode
+    from txchain import SplitChains, TxChain, TxParams
+    from zello import DEFAULT_URL as ZELLO_URL, RxBuffer, ZelloClient
 
 APP_NAME = "zpttlink"
 DEFAULT_KEY = "F9"
@@ -37,37 +67,19 @@ DEFAULT_CONFIG_FILE = "config.json"
 
 stop_event = threading.Event()
 keyboard = None
-logger = None
-audio_stream = None
-_last_level_log = 0.0
-
-KEYMAP = {
-    "f1": Key.f1, "f2": Key.f2, "f3": Key.f3, "f4": Key.f4,
-    "f5": Key.f5, "f6": Key.f6, "f7": Key.f7, "f8": Key.f8,
-    "f9": Key.f9, "f10": Key.f10, "f11": Key.f11, "f12": Key.f12,
-    "esc": Key.esc, "escape": Key.esc,
-    "space": Key.space,
-    "enter": Key.enter, "return": Key.enter,
-    "tab": Key.tab,
-    "shift": Key.shift, "ctrl": Key.ctrl, "alt": Key.alt, "cmd": Key.cmd, "win": Key.cmd,
-}
+# Replaced by configure_logging(); the same named logger, so helpers work before it runs.
+logger = logging.getLogger(APP_NAME)
+_live_runtimes = set()
 
 
 def parse_hotkey(name):
-    if not name:
-        return Key.f9
-    s = str(name).strip().lower()
-    if s in KEYMAP:
-        return KEYMAP[s]
-    if s.startswith("f") and s[1:].isdigit():
-        return KEYMAP.get(s, Key.f9)
-    if len(s) == 1:
-        return s
-    return Key.f9
+    return keyinject.canonical_key(name, default=DEFAULT_KEY.lower())
 
 
 DEFAULT_CONFIG = {
     "radio_type": "auto",
+    "hotkey_backend": "auto",
+    "hotkey_min_hold_ms": 100,
     "com_port": "COM3" if platform.system() == "Windows" else "/dev/ttyUSB0",
     "baud": 9600,
 
@@ -77,6 +89,8 @@ DEFAULT_CONFIG = {
     "ptt_hotkey": DEFAULT_KEY,
     "ptt_output": "dtr",
     "ptt_active_low": False,
+    "ptt_input": "cts",
+    "ptt_input_active_low": False,
     "disable_hotkey": True,
     "force_serial_ptt": True,
     "ignore_initial_ptt_state": True,
@@ -85,7 +99,9 @@ DEFAULT_CONFIG = {
         "vendor_id": 0x0D8C,
         "product_id": None,
         "gpio_mask": 0x04,
-        "active_low": False
+        "active_low": False,
+        "input_mask": 0x02,
+        "input_active_low": False
     },
 
     "logging": {
@@ -98,22 +114,237 @@ DEFAULT_CONFIG = {
         "release_ms": 60
     },
 
+    # Who may key the radio; the highest priority active source owns PTT.
+    # press_ms/release_ms default to "debounce" where not given.
+    "ptt_sources": {
+        "vox": {"priority": 10, "press_ms": 0, "release_ms": 0},
+        "line": {"enabled": False, "priority": 20, "poll_ms": 10},
+        "gui": {"priority": 30, "press_ms": 0, "release_ms": 0},
+        "remote": {"priority": 40, "press_ms": 0, "release_ms": 0},
+        "clips": {"priority": 5, "press_ms": 0, "release_ms": 0}
+    },
+
+    # Time PTT against when the audio reaches the DAC: key keyup_ms before the
+    # speech plays out, release tail_ms after the last of it.
+    "ptt_timing": {
+        "enabled": False,
+        "keyup_ms": 40,
+        "tail_ms": 30,
+        "spin_us": 500
+    },
+
     "vox": {
         "enabled": True,
         "threshold": 0.003,
         "attack_ms": 20,
         "release_ms": 80,
         "hang_ms": 120,
-        "log_levels": True
+        # Delay TX audio this long so PTT keys before the first syllable airs;
+        # PTT release is held back by the same amount.
+        "preroll_ms": 0,
+        "log_levels": True,
+        "adaptive": {
+            "enabled": False,
+            "open_ratio": 3.0,
+            "close_ratio": 1.5,
+            "window_s": 5.0,
+            "max_threshold": 0.25,
+            "state_file": "vox_state.json"
+        }
+    },
+
+    # VOX only opens while this tone or code is present on the input ("off",
+    # "ctcss" or "dcs"); needs flat (unfiltered) receiver audio. Voice mixed
+    # with the tone or code is fine.
+    "squelch": {
+        "mode": "off",
+        "ctcss_hz": 100.0,
+        "dcs_code": "023",
+        "dcs_inverted": False,
+        "window_ms": 400,
+        "threshold": 0.45,
+        "min_level": 0.003,
+        "hold_ms": 250
+    },
+
+    # Remote control from the radio: <pin><code># runs the mapped action, *
+    # clears. Decoded on the TX input; needs a PIN of at least 4 digits. With
+    # mute, digits and an entry that starts a valid PIN and command are
+    # silenced on TX (pre-roll is raised to at least 40ms so the start of
+    # each digit is caught too).
+    "dtmf": {
+        "enabled": False,
+        "pin": "",
+        "mute": True,
+        "commands": {
+            "10": "link_disable",
+            "11": "link_enable",
+            "20": "gain_down",
+            "21": "gain_up"
+        },
+        "gain_step_db": 2.0,
+        "timeout_s": 5.0,
+        "max_failures": 3,
+        "lockout_s": 60.0,
+        "min_level": 0.01,
+        "min_on_ms": 40,
+        "min_off_ms": 40
+    },
+
+    # Clips mixed into the TX output, keying PTT as the "clips" source: a CW ID
+    # of callsign every id_interval_s (only after traffic if id_only_if_active),
+    # a courtesy tone ((Hz, ms) steps) when VOX releases, and WAV announcements
+    # ({"file", "name", "every_s", "after_release", "level"}).
+    "clips": {
+        "enabled": False,
+        "level": 0.3,
+        "lead_ms": 150,
+        "tail_ms": 100,
+        "callsign": "",
+        "cw_wpm": 20,
+        "cw_hz": 800,
+        "id_interval_s": 600,
+        "id_only_if_active": True,
+        "courtesy": [[880, 80], [660, 80]],
+        "announcements": []
     },
 
     "audio": {
         "tx_gain": 0.08,
         "samplerate": 48000,
         "limit": 0.90,
-        "dc_block": True
+        "limiter": "tanh",
+        "dc_block": True,
+        "blocksize": 0,
+        "engine": "sounddevice"
+    },
+
+    # audio.engine "blocking": read/write on a dedicated thread, output kept
+    # jitter_blocks periods ahead, up to max_batch periods processed at once.
+    "blocking": {
+        "jitter_blocks": 2,
+        "max_batch": 4
     },
 
+    # audio.engine "jack": ports in_N/out_N, wired to these on start.
+    "jack": {
+        "client_name": "zpttlink",
+        "server": None,
+        "connect_inputs": [],
+        "connect_outputs": []
+    },
+
+    "agc": {
+        "enabled": False,
+        "target_dbfs": -18.0,
+        "max_gain_db": 20.0,
+        "min_gain_db": -20.0,
+        "gate_dbfs": -50.0,
+        "threshold_dbfs": -6.0,
+        "ratio": 4.0,
+        "attack_ms": 5.0,
+        "release_ms": 300.0,
+        "window_ms": 50.0,
+        "lookahead_ms": 5.0,
+        "sub_block_ms": 1.0
+    },
+
+    "denoise": {
+        "enabled": False,
+        "frame_ms": 10.0,
+        "reduction_db": 18.0,
+        "threshold": 3.0,
+        "learn_s": 2.0,
+        "cpu_budget": 0.25
+    },
+
+    # One file per PTT session, named <time>-<link>; max_total_mb and max_files
+    # apply to each link's own files, so links can share a directory.
+    "recorder": {
+        "enabled": False,
+        "directory": "recordings",
+        "format": "wav",
+        "slot_frames": 4096,
+        "slots": 256,
+        "max_total_mb": 500,
+        "max_files": 1000,
+        "max_session_s": 600
+    },
+
+    # PulseAudio/PipeWire: null sink for TX, emulator streams moved onto it
+    # and onto rx_sink (a sink name or part of one; None = a zpttlink_rx null sink).
+    "routing": {
+        "enabled": False,
+        "samplerate": 48000,
+        "quantum": 256,
+        "emulator_match": "waydroid|bluestacks|hd-player|audioflinger",
+        "rx_sink": None,
+        "links": [],
+        "poll_s": 1.0
+    },
+
+    # Stream straight to a Zello channel instead of driving an emulator.
+    "zello": {
+        "enabled": False,
+        "url": "wss://zello.io/ws",
+        "channel": "",
+        "username": "",
+        "password": "",
+        "auth_token": "",
+        "samplerate": 16000,
+        "frame_ms": 60,
+        "rx_output_index": None,
+        "rx_buffer_ms": 300
+    },
+
+    "recovery": {
+        "enabled": True,
+        "initial_backoff_s": 0.5,
+        "max_backoff_s": 30.0,
+        "stall_timeout_s": 2.0,
+        "reinit_portaudio": True
+    },
+
+    # SCHED_FIFO audio/PTT threads, pinned to cores if set, memory locked and
+    # GC frozen ("freeze") or off ("disable"). The first compare_s seconds run
+    # without it so the worst callback time can be logged before and after.
+    "realtime": {
+        "enabled": False,
+        "priority": 70,
+        "ptt_priority": 60,
+        "cores": None,
+        "lock_memory": True,
+        "gc": "freeze",
+        "gc_interval_s": 10.0,
+        "compare_s": 10.0
+    },
+
+    "hot_reload": {
+        "enabled": True,
+        "poll_interval_s": 1.0
+    },
+
+    "control": {
+        "enabled": False,
+        "host": "127.0.0.1",
+        "port": 7355,
+        "token": None
+    },
+
+    "gateway": {
+        "workers": 0,
+        "cores": None,
+        "pin_cores": True,
+        "health_interval_s": 5.0,
+        "health_file": None,
+        "restart_backoff_s": 2.0,
+        "restart_backoff_max_s": 60.0
+    },
+
+    "links": [],
+
+    "channel_map": [],
+
     "serial_autodetect_hints": [
         "usb",
         "ttyacm",
@@ -187,20 +418,6 @@ def list_serial_ports():
     return list(list_ports.comports())
 
 
-def autodetect_serial(match_substrings):
-    ports = list_serial_ports()
-    ranked = []
-    for p in ports:
-        score = 0
-        text = f"{p.device} {p.description} {p.hwid}".lower()
-        for s in match_substrings:
-            if s.lower() in text:
-                score += 1
-        ranked.append((score, p.device))
-    ranked.sort(reverse=True)
-    return ranked[0][1] if ranked else None
-
-
 def _audio_role_label(dev):
     in_ch = int(dev.get("max_input_channels", 0) or 0)
     out_ch = int(dev.get("max_output_channels", 0) or 0)
@@ -233,6 +450,7 @@ def press_key(hotkey, dry=False):
         logger.debug(f"[DRY] press {hotkey}")
         return
     try:
+        logger.info(f"Hotkey {hotkey} down")
         keyboard.press(hotkey)
     except Exception as e:
         logger.error(f"Keyboard press failed: {e}")
@@ -244,450 +462,1454 @@ def release_key(hotkey, dry=False):
         logger.debug(f"[DRY] release {hotkey}")
         return
     try:
+        logger.info(f"Hotkey {hotkey} up")
         keyboard.release(hotkey)
     except Exception as e:
         logger.error(f"Keyboard release failed: {e}")
         raise
 
 
-def apply_active_low(state, active_low):
-    return (not state) if active_low else state
-
+def build_radio_backend(cfg, args):
+    if args.ptt_active_low and args.ptt_active_high:
+        logger.error("Use only one of --ptt-active-low or --ptt-active-high")
+        sys.exit(8)
+    try:
+        return get_radio(cfg, args)
+    except RadioConfigError as e:
+        logger.error(str(e))
+        sys.exit(2)
 
-class RadioInterfaceBase:
-    name = "base"
 
-    def open(self):
-        pass
+def bench_hotkey(args, count=200):
+    key = parse_hotkey(args.key or "f20")
+    names = [args.hotkey_backend] if args.hotkey_backend not in (None, "auto") else sorted(
+        keyinject.INJECTORS
+    )
+    print(f"Timing {count} press/release pairs of {key.upper()} per backend...")
+    results = keyinject.benchmark(names, key=key, count=count)
+    print(f"{'backend':<10} {'n':>5} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<10} unavailable: {r['error']}")
+            continue
+        print(f"{name:<10} {r['n']:>5} {r['p50']:>9.3f} {r['p99']:>9.3f} {r['max']:>9.3f}")
+
+
+def list_radio_backends():
+    for name in available_backends():
+        try:
+            caps = load_backend(name).capabilities
+        except Exception as e:
+            print(f"{name:12}  unavailable: {e}")
+            continue
+        print(
+            f"{name:12}  latency={caps.latency_class:<9} "
+            f"input_sensing={'yes' if caps.input_sensing else 'no':<3}  "
+            f"multi_line={'yes' if caps.multi_line else 'no'}"
+        )
 
-    def ptt_on(self, dry=False):
-        pass
 
-    def ptt_off(self, dry=False):
-        pass
+class PTTController:
+    def __init__(
+        self, backend, hotkey=None, hotkey_enabled=False, dry_run=False, hotkey_min_hold_ms=100,
+        zello=None,
+    ):
+        self.backend = backend
+        self.zello = zello
+        self.hotkey = hotkey
+        self.hotkey_enabled = hotkey_enabled
+        self.dry_run = dry_run
+        self.is_down = False
+        self.lock = threading.Lock()
+        self._trace = None
+
+        # Key injection can block on the windowing system, so it runs on its own
+        # worker; down()/up() only post the wanted state and go on to the radio line.
+        self.hotkeys = None
+        if self.hotkey_enabled and self.hotkey is not None:
+            self.hotkeys = keyinject.HotkeyWorker(
+                self.hotkey,
+                press=lambda key: press_key(key, dry=self.dry_run),
+                release=lambda key: release_key(key, dry=self.dry_run),
+                min_hold_ms=hotkey_min_hold_ms,
+            )
+            self.hotkeys.start()
 
-    def close(self):
-        pass
+    @property
+    def trace(self):
+        """Optional stage hook (see latency.py): called as trace(stage) while keying."""
+        return self._trace
 
+    @trace.setter
+    def trace(self, fn):
+        self._trace = fn
+        if self.hotkeys is not None:
+            self.hotkeys.trace = fn
 
-class DigiRigRadio(RadioInterfaceBase):
-    name = "digirig"
+    def down(self, source="unknown"):
+        with self.lock:
+            if self.is_down:
+                return
+            if self._trace is not None:
+                self._trace("gate")
+            self.is_down = True
+            logger.info(f"PTT DOWN ({source})")
 
-    def __init__(self, serial_port, baud, ptt_output="dtr", active_low=False):
-        self.serial_port = serial_port
-        self.baud = baud
-        self.ptt_output = (ptt_output or "dtr").lower()
-        self.active_low = bool(active_low)
-        self.ser = None
+            if self.hotkeys is not None:
+                self.hotkeys.request(True)
+            if self.zello is not None:
+                self.zello.request(True)
 
-    def open(self):
-        self.ser = serial.Serial(self.serial_port, baudrate=self.baud, timeout=0)
-        try:
-            self.ser.dtr = apply_active_low(False, self.active_low)
-            self.ser.rts = apply_active_low(False, self.active_low)
-            time.sleep(0.1)
-        except Exception:
-            pass
+            self.backend.ptt_on(dry=self.dry_run)
+            if self._trace is not None:
+                self._trace("backend")
 
-    def _set(self, logical_state, dry=False):
-        if self.ser is None:
-            raise RuntimeError("Serial port not open")
-        physical_state = apply_active_low(bool(logical_state), self.active_low)
+    def up(self, source="unknown"):
+        with self.lock:
+            if not self.is_down:
+                return
+            self.is_down = False
+            logger.info(f"PTT UP ({source})")
 
-        if dry:
-            logger.debug(
-                f"[DRY] DigiRig {self.ptt_output.upper()} logical={logical_state} "
-                f"physical={physical_state} active_low={self.active_low}"
-            )
-            return
+            if self.hotkeys is not None:
+                self.hotkeys.request(False)
+            if self.zello is not None:
+                self.zello.request(False)
 
-        if self.ptt_output == "dtr":
-            self.ser.dtr = physical_state
-        elif self.ptt_output == "rts":
-            self.ser.rts = physical_state
-        else:
-            raise RuntimeError(f"Unsupported ptt_output for DigiRig: {self.ptt_output}")
+            self.backend.ptt_off(dry=self.dry_run)
 
-        logger.info(
-            f"Serial PTT {self.ptt_output.upper()} -> {'ON' if logical_state else 'OFF'} "
-            f"(physical={'HIGH' if physical_state else 'LOW'}, active_low={self.active_low})"
-        )
+    def force_off(self, source="unknown"):
+        # Used after a fault: never raises and never waits long for a wedged holder.
+        acquired = self.lock.acquire(timeout=1.0)
+        try:
+            self.is_down = False
+            logger.warning(f"PTT UP ({source}, forced)")
 
-    def ptt_on(self, dry=False):
-        self._set(True, dry=dry)
+            if self.hotkeys is not None:
+                self.hotkeys.request(False, force=True)
+            if self.zello is not None:
+                self.zello.request(False)
 
-    def ptt_off(self, dry=False):
-        self._set(False, dry=dry)
+            try:
+                self.backend.ptt_off(dry=self.dry_run)
+            except Exception as e:
+                logger.warning(f"PTT off during recovery failed: {e}")
+        finally:
+            if acquired:
+                self.lock.release()
 
     def close(self):
-        try:
-            if self.ser is not None:
-                self.ser.close()
-        except Exception:
-            pass
-        self.ser = None
+        """Stop the hotkey worker; it leaves the key released."""
+        if self.hotkeys is not None:
+            self.hotkeys.stop()
 
 
-class CM108Radio(RadioInterfaceBase):
-    name = "cm108"
+def log_runtime_diagnostics():
+    if platform.system() != "Linux":
+        return
 
-    def __init__(self, vendor_id=0x0D8C, product_id=None, gpio_mask=0x04, active_low=False):
-        self.vendor_id = vendor_id
-        self.product_id = product_id
-        self.gpio_mask = int(gpio_mask) & 0xFF
-        self.active_low = bool(active_low)
-        self.dev = None
+    session_type = os.environ.get("XDG_SESSION_TYPE", "").lower() or "unknown"
+    desktop = os.environ.get("XDG_CURRENT_DESKTOP", "") or "unknown"
+    logger.info(f"Runtime session: {session_type} (desktop={desktop})")
 
-    def open(self):
-        if usb is None:
-            raise RuntimeError("pyusb not installed. Install with: pip install pyusb")
-        kwargs = {"idVendor": self.vendor_id}
-        if self.product_id is not None:
-            kwargs["idProduct"] = self.product_id
-        self.dev = usb.core.find(**kwargs)
-        if self.dev is None:
-            raise RuntimeError(
-                f"CM108/CM119 device not found (vendor=0x{self.vendor_id:04x}"
-                + (f", product=0x{self.product_id:04x}" if self.product_id is not None else "")
-                + ")"
+    if session_type == "wayland":
+        usable = keyinject.available_injectors()
+        if usable:
+            logger.info(f"Wayland session detected; key injection via {', '.join(usable)}.")
+        else:
+            logger.warning(
+                "Wayland session detected. Global key injection needs /dev/uinput access "
+                "or a running ydotoold. Otherwise prefer serial or CM108 PTT with "
+                "--force-serial-ptt."
             )
 
-    def _write_gpio(self, logical_state, dry=False):
-        if self.dev is None:
-            raise RuntimeError("CM108 device not open")
 
-        # Many CM108 node interfaces use inverted logic externally; keep this configurable.
-        effective_on = apply_active_low(bool(logical_state), self.active_low)
-        value = self.gpio_mask if effective_on else 0x00
+def handle_stop_signal(*_):
+    logger.info("Shutting down...")
+    stop_event.set()
 
-        if dry:
-            logger.debug(
-                f"[DRY] CM108 GPIO logical={logical_state} effective_on={effective_on} "
-                f"mask=0x{self.gpio_mask:02x} value=0x{value:02x}"
-            )
-            return
 
-        # Standard CM108-style HID control transfer used by radio node software.
-        self.dev.ctrl_transfer(0x21, 0x09, 0x0200, 0, [value])
-        logger.info(
-            f"CM108 PTT -> {'ON' if logical_state else 'OFF'} "
-            f"(gpio=0x{value:02x}, active_low={self.active_low})"
-        )
+def choose_samplerate(input_index, output_index, default_sr=48000):
+    if not sd:
+        return default_sr
+    try:
+        in_info = sd.query_devices(input_index)
+        out_info = sd.query_devices(output_index)
+        in_sr = in_info.get("default_samplerate") or default_sr
+        out_sr = out_info.get("default_samplerate") or default_sr
+        if abs(float(in_sr) - float(out_sr)) < 1.0:
+            return int(round(float(in_sr)))
+    except Exception:
+        pass
+    return default_sr
 
-    def ptt_on(self, dry=False):
-        self._write_gpio(True, dry=dry)
 
-    def ptt_off(self, dry=False):
-        self._write_gpio(False, dry=dry)
+def find_audio_device(name, kind="input"):
+    if not sd or not name:
+        return None
+    key = "max_input_channels" if kind == "input" else "max_output_channels"
+    try:
+        for i, dev in enumerate(sd.query_devices()):
+            if dev.get("name") == name and int(dev.get(key, 0) or 0) > 0:
+                return i
+    except Exception:
+        pass
+    return None
 
-    def close(self):
-        self.dev = None
 
+VOX_STATE_SAVE_INTERVAL_S = 60.0
 
-class SignalinkRadio(RadioInterfaceBase):
-    name = "signalink"
 
-    def open(self):
-        logger.info("Signalink selected: hardware VOX/PTT expected; no software PTT control.")
+def read_vox_state(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception as e:
+        logger.warning(f"Failed to read VOX state '{path}': {e}")
+        return {}
 
-    def ptt_on(self, dry=False):
-        if dry:
-            logger.debug("[DRY] Signalink PTT ON (no-op)")
-        else:
-            logger.info("Signalink PTT ON (no-op)")
 
-    def ptt_off(self, dry=False):
-        if dry:
-            logger.debug("[DRY] Signalink PTT OFF (no-op)")
-        else:
-            logger.info("Signalink PTT OFF (no-op)")
+def write_vox_state(path, key, state):
+    if not path:
+        return
+    data = read_vox_state(path)
+    data[key] = state
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"Failed to write VOX state '{path}': {e}")
 
-    def close(self):
-        pass
 
+def configure_logging(cfg, level=None, suffix=None):
+    global logger
+    log_level = level or cfg.get("logging", {}).get("level", "INFO")
+    logfile = cfg.get("logging", {}).get("file", DEFAULT_LOGFILE)
+    if suffix:
+        base, ext = os.path.splitext(logfile)
+        logfile = f"{base}.{suffix}{ext or '.log'}"
+    logger = setup_logging(level=log_level, logfile=logfile)
+    return logger
 
-def choose_radio_type(cfg, args):
-    explicit = getattr(args, "radio_type", None)
-    if explicit:
-        return explicit.lower()
-
-    cfg_type = str(cfg.get("radio_type", "auto")).lower()
-    if cfg_type != "auto":
-        return cfg_type
-
-    # Auto-detect: prefer CM108 if requested via hints/name, otherwise DigiRig if serial port present.
-    port = str(cfg.get("com_port", "")).lower()
-    hints = " ".join(cfg.get("serial_autodetect_hints", [])).lower()
-    if "cm108" in hints or "aioc" in hints or "cm108" in port or "aioc" in port:
-        # Keep auto conservative: if pyusb is present and a CM108-like device exists, use it.
-        if usb is not None:
-            vendor_id = int(cfg.get("cm108", {}).get("vendor_id", 0x0D8C))
-            product_id = cfg.get("cm108", {}).get("product_id", None)
-            kwargs = {"idVendor": vendor_id}
-            if product_id is not None:
-                kwargs["idProduct"] = product_id
-            try:
-                found = usb.core.find(**kwargs)
-                if found is not None:
-                    return "cm108"
-            except Exception:
-                pass
 
-    return "digirig"
+def init_keyboard(backend="auto"):
+    global keyboard
+    if keyboard is not None:
+        return keyboard
+    try:
+        keyboard = keyinject.open_injector(backend)
+    except Exception as e:
+        logger.error(
+            "Keyboard controller failed to initialize.\n"
+            "- macOS: enable Terminal/iTerm under Privacy & Security -> Accessibility.\n"
+            "- Wayland: grant write access to /dev/uinput or run ydotoold; "
+            "otherwise prefer hardware PTT backends."
+        )
+        raise e
+    logger.info(f"Key injection backend: {keyboard.name}")
+    return keyboard
 
 
-def build_radio_backend(cfg, args):
-    radio_type = choose_radio_type(cfg, args)
-
-    if radio_type == "cm108":
-        cm_cfg = cfg.get("cm108", {})
-        vendor_id = int(cm_cfg.get("vendor_id", 0x0D8C))
-        product_id = cm_cfg.get("product_id", None)
-        gpio_mask = int(cm_cfg.get("gpio_mask", 0x04))
-        active_low = bool(cm_cfg.get("active_low", False))
-        return CM108Radio(
-            vendor_id=vendor_id,
-            product_id=product_id,
-            gpio_mask=gpio_mask,
-            active_low=active_low,
-        )
+def close_keyboard():
+    global keyboard
+    if keyboard is not None:
+        keyboard.close()
+        keyboard = None
 
-    if radio_type == "signalink":
-        return SignalinkRadio()
 
-    # digirig default
-    ptt_output = (args.ptt_output or cfg.get("ptt_output") or "dtr").lower()
-    if args.ptt_active_low and args.ptt_active_high:
-        logger.error("Use only one of --ptt-active-low or --ptt-active-high")
-        sys.exit(8)
+class Backoff:
+    def __init__(self, initial=0.5, maximum=30.0, factor=2.0):
+        self.initial = float(initial)
+        self.maximum = float(maximum)
+        self.factor = float(factor)
+        self.attempts = 0
 
-    if args.ptt_active_low:
-        ptt_active_low = True
-    elif args.ptt_active_high:
-        ptt_active_low = False
-    else:
-        ptt_active_low = bool(cfg.get("ptt_active_low", False))
-
-    serial_port = args.serial or cfg.get("com_port") or ""
-    if not serial_port:
-        serial_port = autodetect_serial(cfg.get("serial_autodetect_hints", []))
-        if serial_port:
-            logger.info(f"Auto-detected serial port: {serial_port}")
-        else:
-            logger.error("No serial port specified and auto-detect found none.")
-            sys.exit(2)
+    def next(self):
+        delay = min(self.initial * (self.factor ** self.attempts), self.maximum)
+        self.attempts += 1
+        return delay
 
-    baud = args.baud if args.baud is not None else int(cfg.get("baud", 9600))
+    def reset(self):
+        self.attempts = 0
 
-    return DigiRigRadio(
-        serial_port=serial_port,
-        baud=baud,
-        ptt_output=ptt_output,
-        active_low=ptt_active_low,
-    )
 
+# Errors that reopening the same config cannot fix; recovery stops instead of retrying them.
+FATAL_ERRORS = (RadioConfigError, ValueError, SystemExit)
 
-class PTTController:
-    def __init__(self, backend, hotkey=None, hotkey_enabled=False, dry_run=False):
-        self.backend = backend
-        self.hotkey = hotkey
-        self.hotkey_enabled = hotkey_enabled
-        self.dry_run = dry_run
-        self.is_down = False
-        self.lock = threading.Lock()
 
-    def down(self, source="unknown"):
-        with self.lock:
-            if self.is_down:
-                return
-            self.is_down = True
-            logger.info(f"PTT DOWN ({source})")
+def _arg_or_cfg(value, cfg_section, key, default):
+    return value if value is not None else cfg_section.get(key, default)
 
-            if self.hotkey_enabled and self.hotkey is not None:
-                logger.info("PTT DOWN -> key down")
-                press_key(self.hotkey, dry=self.dry_run)
 
-            self.backend.ptt_on(dry=self.dry_run)
+# CLI options that describe a single radio; they must not leak into every link or channel.
+RADIO_SCOPED_ARGS = (
+    "key",
+    "serial",
+    "baud",
+    "radio_type",
+    "ptt_output",
+    "audio_input_index",
+    "audio_output_index",
+    "vox_threshold",
+    "vox_attack_ms",
+    "vox_release_ms",
+    "vox_hang_ms",
+    "ptt_active_low",
+    "ptt_active_high",
+)
 
-    def up(self, source="unknown"):
-        with self.lock:
-            if not self.is_down:
-                return
-            self.is_down = False
-            logger.info(f"PTT UP ({source})")
 
-            if self.hotkey_enabled and self.hotkey is not None:
-                logger.info("PTT UP -> key up")
-                release_key(self.hotkey, dry=self.dry_run)
+def scoped_args(args, names=RADIO_SCOPED_ARGS):
+    values = dict(vars(args))
+    for name in names:
+        if name in values:
+            values[name] = False if isinstance(values[name], bool) else None
+    return argparse.Namespace(**values)
 
-            self.backend.ptt_off(dry=self.dry_run)
 
+def tx_params(cfg, args):
+    vox_cfg = cfg.get("vox", {})
+    audio_cfg = cfg.get("audio", {})
+    adaptive_cfg = vox_cfg.get("adaptive", {})
+    denoise_cfg = cfg.get("denoise", {})
+    agc_cfg = cfg.get("agc", {})
+    agc_defaults = DEFAULT_CONFIG["agc"]
+    limiter = str(audio_cfg.get("limiter", "tanh")).lower()
+    if limiter not in LIMITERS:
+        logger.warning(
+            f"Unknown audio.limiter '{limiter}' (choose from {', '.join(LIMITERS)}); using tanh"
+        )
+        limiter = "tanh"
+    return TxParams(
+        tx_gain=float(audio_cfg.get("tx_gain", 0.08)),
+        limit=float(audio_cfg.get("limit", 0.90)),
+        limiter=limiter,
+        dc_block=bool(audio_cfg.get("dc_block", True)),
+        vox_enabled=bool(args.vox or vox_cfg.get("enabled", False)),
+        vox_threshold=float(_arg_or_cfg(args.vox_threshold, vox_cfg, "threshold", 0.02)),
+        vox_attack_ms=int(_arg_or_cfg(args.vox_attack_ms, vox_cfg, "attack_ms", 40)),
+        vox_release_ms=int(_arg_or_cfg(args.vox_release_ms, vox_cfg, "release_ms", 120)),
+        vox_hang_ms=int(_arg_or_cfg(args.vox_hang_ms, vox_cfg, "hang_ms", 300)),
+        vox_log_levels=bool(vox_cfg.get("log_levels", False)),
+        vox_adaptive=bool(adaptive_cfg.get("enabled", False)),
+        open_ratio=float(adaptive_cfg.get("open_ratio", 3.0)),
+        close_ratio=float(adaptive_cfg.get("close_ratio", 1.5)),
+        max_threshold=float(adaptive_cfg.get("max_threshold", 0.25)),
+        window_s=float(adaptive_cfg.get("window_s", 5.0)),
+        denoise_enabled=bool(denoise_cfg.get("enabled", False)),
+        denoise_frame_ms=float(denoise_cfg.get("frame_ms", 10.0)),
+        denoise_reduction_db=float(denoise_cfg.get("reduction_db", 18.0)),
+        denoise_threshold=float(denoise_cfg.get("threshold", 3.0)),
+        denoise_learn_s=float(denoise_cfg.get("learn_s", 2.0)),
+        denoise_budget=float(denoise_cfg.get("cpu_budget", 0.25)),
+        agc_enabled=bool(agc_cfg.get("enabled", False)),
+        agc=tuple(float(agc_cfg.get(k, agc_defaults[k])) for k in AGC_SETTINGS),
+    )
 
-class AudioGate:
-    def __init__(self, threshold=0.02, attack_ms=40, release_ms=120, hang_ms=300):
-        self.threshold = float(threshold)
-        self.attack_ms = int(attack_ms)
-        self.release_ms = int(release_ms)
-        self.hang_ms = int(hang_ms)
 
-        self.active = False
-        self.audio_started_at = None
-        self.silence_started_at = None
-        self.hang_until = 0.0
+def start_live_config(cfg, args, apply, status=None, control=True):
+    """
+    Start config hot-reload and, if enabled, the control channel.
 
-    def reset(self):
-        self.active = False
-        self.audio_started_at = None
-        self.silence_started_at = None
-        self.hang_until = 0.0
-
-    def process(self, level, now=None):
-        now = time.monotonic() if now is None else now
-        above = level >= self.threshold
-
-        if above:
-            self.silence_started_at = None
-            self.hang_until = 0.0
-            if self.audio_started_at is None:
-                self.audio_started_at = now
-
-            if not self.active and (now - self.audio_started_at) * 1000.0 >= self.attack_ms:
-                self.active = True
-                return "start"
-            return None
-
-        self.audio_started_at = None
-
-        if self.active:
-            if self.silence_started_at is None:
-                self.silence_started_at = now
-                return None
-
-            silence_ms = (now - self.silence_started_at) * 1000.0
-            if silence_ms >= self.release_ms:
-                if self.hang_until == 0.0:
-                    self.hang_until = now + (self.hang_ms / 1000.0)
-
-                if now >= self.hang_until:
-                    self.active = False
-                    self.silence_started_at = None
-                    self.hang_until = 0.0
-                    return "stop"
+    Returns (live_config, control_server or None, services to stop()).
+    """
+    try:
+        from .control import ControlServer
+        from .reload import ConfigWatcher, LiveConfig
+    except ImportError:
+        from control import ControlServer
+        from reload import ConfigWatcher, LiveConfig
+
+    live = LiveConfig(args.config, cfg, apply)
+    services = []
+
+    reload_cfg = cfg.get("hot_reload", {})
+    if reload_cfg.get("enabled", True):
+        watcher = ConfigWatcher(args.config, live.reload, reload_cfg.get("poll_interval_s", 1.0))
+        watcher.start()
+        services.append(watcher)
+
+    server = None
+    ctl_cfg = cfg.get("control", {})
+    if control and ctl_cfg.get("enabled", False):
+        server = ControlServer(
+            host=ctl_cfg.get("host", "127.0.0.1"),
+            port=ctl_cfg.get("port", 7355),
+            token=ctl_cfg.get("token"),
+        )
+        server.register("set", lambda req: live.update(req.get("config")))
+        server.register("reload", lambda req: {"reloaded": live.reload()})
+        if status is not None:
+            server.register("status", lambda req: status())
+        try:
+            server.start()
+            services.append(server)
+        except OSError as e:
+            logger.error(f"Control channel failed to start: {e}")
+            server = None
+    return live, server, services
+
+
+class TxChannel:
+    """One logical radio: backend, PTT controller, VOX gate and gain chain."""
+
+    def __init__(self, cfg, args, name=None, input_channel=None, output_channel=0):
+        self.cfg = cfg
+        self.args = args
+        self.name = name
+        self.label = f"[{name}] " if name else ""
+        self.input_channel = input_channel
+        self.output_channel = int(output_channel)
+
+        self.backend = None
+        self.ptt = None
+        self.ptt_timing = None
+        self.arbiter = None
+        self.recorder = None
+        self.on_fault = None
+        self.lockout = None
+
+        self.hotkey_name = args.key or cfg.get("ptt_hotkey") or DEFAULT_KEY
+        self.hotkey = parse_hotkey(self.hotkey_name)
+        force_serial_ptt = bool(args.force_serial_ptt or cfg.get("force_serial_ptt", False))
+        self.hotkey_enabled = not (args.no_hotkey or cfg.get("disable_hotkey", False))
+        if force_serial_ptt:
+            self.hotkey_enabled = False
+        self.zello_cfg = cfg.get("zello", {})
+        if self.zello_cfg.get("enabled", False):
+            # The Zello client replaces the emulator, so there is no window to key.
+            self.hotkey_enabled = False
+        self.zello = None
+        self.rx_buffer = None
+        self.rx_stream = None
+        self.dry_run = bool(args.dry_run)
+        self.hotkey_backend = args.hotkey_backend or cfg.get("hotkey_backend") or "auto"
+        self.hotkey_min_hold_ms = float(cfg.get("hotkey_min_hold_ms", 100))
+        self.ignore_initial_ptt_state = bool(
+            args.ignore_initial_ptt_state or cfg.get("ignore_initial_ptt_state", False)
+        )
 
-        return None
+        self._clips_keyed = False
+        step_db = float(cfg.get("dtmf", {}).get("gain_step_db", 2.0))
+        # What a DTMF command may run; called from the main loop, never the audio thread.
+        self.actions = {
+            "link_enable": self.unlock,
+            "link_disable": lambda: self.lock(None, "disabled by DTMF"),
+            "gain_up": lambda: self.chain.step_gain(step_db),
+            "gain_down": lambda: self.chain.step_gain(-step_db),
+            "force_id": lambda: self.play_clip(CLIP_ACTIONS["force_id"]),
+        }
+        self.chain = TxChain(cfg, tx_params(cfg, args), name=name, actions=self.actions)
+        self.metrics = None
+
+    def metric(self, base):
+        return f"{base}.{self.name}" if self.name else base
+
+    def source(self, source):
+        return f"{self.name}/{source}" if self.name else source
+
+    def init_hotkey(self):
+        if self.hotkey_enabled and not self.dry_run:
+            init_keyboard(self.hotkey_backend)
+            logger.info(f"{self.label}Hotkey set to: {self.hotkey_name}")
+        else:
+            logger.info(f"{self.label}Hotkey injection disabled.")
 
+    def open(self, backend=None):
+        self.backend = backend or build_radio_backend(self.cfg, self.args)
+        self.backend.open()
+        caps = self.backend.capabilities
+        logger.info(
+            f"{self.label}Radio backend: {self.backend.name} (latency={caps.latency_class})"
+        )
 
-def rms_level(data):
-    if np is None or data is None:
-        return 0.0
-    try:
-        arr = np.asarray(data, dtype=np.float32)
-        if arr.size == 0:
-            return 0.0
-        return float(np.sqrt(np.mean(np.square(arr))))
-    except Exception:
-        return 0.0
+        # The client outlives backend recovery: its connection is not tied to the radio.
+        if self.zello is None and self.zello_cfg.get("enabled", False):
+            self.zello = self.build_zello()
+        self.ptt = PTTController(
+            backend=self.backend,
+            hotkey=self.hotkey,
+            hotkey_enabled=self.hotkey_enabled,
+            dry_run=self.dry_run,
+            hotkey_min_hold_ms=self.hotkey_min_hold_ms,
+            zello=self.zello,
+        )
+        timing = self.cfg.get("ptt_timing", {})
+        if timing.get("enabled", False):
+            self.ptt_timing = PttScheduler(
+                self.ptt,
+                keyup_ms=timing.get("keyup_ms", 40),
+                tail_ms=timing.get("tail_ms", 30),
+                preroll_ms=self.chain.preroll_ms,
+                spin_us=timing.get("spin_us", 500),
+                metrics=self.metrics,
+                wake_metric=self.metric("ptt_wake_ms"),
+                on_error=self._ptt_fault,
+                name=f"ptt-timing-{self.name}" if self.name else "ptt-timing",
+            )
+        self.open_arbiter()
+
+    def build_zello(self):
+        z = self.zello_cfg
+        client = ZelloClient(
+            url=z.get("url") or ZELLO_URL,
+            channel=z.get("channel", ""),
+            username=z.get("username", ""),
+            password=z.get("password", ""),
+            auth_token=z.get("auth_token", ""),
+            codec_rate=int(z.get("samplerate", 16000)),
+            frame_ms=int(z.get("frame_ms", 60)),
+            on_rx=self.on_zello_rx,
+            name=f"zello-{self.name}" if self.name else "zello",
+        )
+        logger.info(
+            f"{self.label}Zello: channel '{client.channel}' at {client.url} "
+            f"(Opus {client.codec_rate} Hz, {client.frame_ms} ms packets)"
+        )
+        return client
 
+    def on_zello_rx(self, pcm):
+        if self.rx_buffer is not None:
+            self.rx_buffer.write(pcm)
 
-def zero_out(outdata):
-    try:
-        outdata.fill(0)
-    except Exception:
-        try:
-            outdata[:] = 0
-        except Exception:
-            pass
+    def start_rx(self, samplerate, blocksize=0):
+        """Play decoded Zello audio on zello.rx_output_index, if one is set."""
+        index = self.zello_cfg.get("rx_output_index")
+        if self.zello is None or index is None or self.rx_stream is not None:
+            return
+        buffer_ms = float(self.zello_cfg.get("rx_buffer_ms", 300))
+        self.rx_buffer = RxBuffer(int(samplerate * buffer_ms / 1000.0))
+        self.rx_stream = sd.OutputStream(
+            device=index,
+            samplerate=samplerate,
+            blocksize=blocksize,
+            channels=1,
+            dtype="float32",
+            callback=self._rx_callback,
+        )
+        self.rx_stream.start()
+        logger.info(f"{self.label}Zello RX audio on output [{index}]")
 
+    def _rx_callback(self, outdata, frames, time_info, status):
+        self.rx_buffer.read_into(outdata[:, 0])
 
-def sanitize_audio(indata, tx_gain=0.02, limit=0.80, dc_block=True):
-    if np is None:
-        return indata
+    def stop_rx(self):
+        if self.rx_stream is not None:
+            try:
+                self.rx_stream.stop()
+                self.rx_stream.close()
+            except Exception:
+                pass
+            self.rx_stream = None
 
-    arr = np.asarray(indata, dtype=np.float32)
+    def _ptt_fault(self, error):
+        if self.on_fault is not None:
+            self.on_fault(self, error)
+        else:
+            logger.error(f"{self.label}PTT failed: {error}")
 
-    if arr.ndim == 2 and arr.shape[1] > 1:
-        mono = np.mean(arr, axis=1, dtype=np.float32)
-    elif arr.ndim == 2 and arr.shape[1] == 1:
-        mono = arr[:, 0]
-    else:
-        mono = arr.reshape(-1)
+    def open_arbiter(self):
+        """Build the PTT arbiter from ptt_sources and start polling the input line."""
+        debounce = self.cfg.get("debounce", {})
+        self.arbiter = PttArbiter(
+            self.ptt_timing or self.ptt, prefix=self.source(""), on_error=self._ptt_fault
+        )
+        # The scheduler already holds release back until the queued audio has played.
+        preroll_ms = self.chain.preroll_ms if self.ptt_timing is None else 0.0
+        for name, entry in self.cfg.get("ptt_sources", {}).items():
+            if not isinstance(entry, dict) or not entry.get("enabled", True):
+                continue
+            # With pre-roll the last preroll_ms of audio is still queued at release.
+            release_ms = entry.get("release_ms", debounce.get("release_ms", 0))
+            self.arbiter.add_source(
+                name,
+                priority=entry.get("priority", 0),
+                press_ms=entry.get("press_ms", debounce.get("press_ms", 0)),
+                release_ms=float(release_ms or 0) + preroll_ms,
+                ignore_initial=name == "line" and self.ignore_initial_ptt_state,
+            )
 
-    if dc_block and mono.size:
-        mono = mono - np.mean(mono, dtype=np.float32)
+        line = self.arbiter.sources.get("line")
+        if line is not None:
+            if self.backend.capabilities.input_sensing:
+                poll_ms = self.cfg["ptt_sources"]["line"].get("poll_ms", 10)
+                self.arbiter.add_poll("line", self.backend.get_input, poll_ms)
+                logger.info(
+                    f"{self.label}PTT input: polling {self.backend.name} every {poll_ms}ms"
+                    f" (debounce {line.press_s * 1000:.0f}/{line.release_s * 1000:.0f}ms)"
+                )
+            else:
+                logger.warning(f"{self.label}{self.backend.name} cannot sense a PTT input line")
+
+        if self.lockout is not None:
+            self.arbiter.lock(*self.lockout)
+
+    def request_ptt(self, source, state):
+        """Key or unkey on behalf of an external source (GUI, control channel)."""
+        if self.arbiter is None:
+            raise RuntimeError(f"{self.name or 'radio'} is not open")
+        if source not in self.arbiter.sources:
+            raise RuntimeError(f"unknown or disabled PTT source: {source}")
+        if source in ("vox", "line"):
+            raise RuntimeError(f"PTT source {source} is driven internally")
+        self.arbiter.set(source, state)
+
+    def lock(self, level=None, reason="locked"):
+        # Kept on the channel so a lockout survives backend recovery.
+        self.lockout = (level, reason)
+        if self.arbiter is not None:
+            self.arbiter.lock(level, reason)
+
+    def unlock(self):
+        self.lockout = None
+        if self.arbiter is not None:
+            self.arbiter.unlock()
+
+    def log_settings(self):
+        p = self.chain.params
+        if self.input_channel is not None:
+            logger.info(
+                f"{self.label}Channel map: input ch {self.input_channel}"
+                f" -> output ch {self.output_channel}"
+            )
+        logger.info(
+            f"{self.label}TX VOX: "
+            + ("enabled" if p.vox_enabled else "disabled")
+            + (" adaptive" if p.vox_adaptive else "")
+            + f" threshold={p.vox_threshold} attack={p.vox_attack_ms}ms"
+            + f" release={p.vox_release_ms}ms hang={p.vox_hang_ms}ms"
+        )
+        if self.chain.preroll_ms:
+            logger.info(
+                f"{self.label}TX pre-roll: {self.chain.preroll_ms:g}ms, "
+                "PTT release delayed to match"
+            )
+        sq = self.cfg.get("squelch", {})
+        mode = str(sq.get("mode", "off") or "off").lower()
+        if mode == "ctcss":
+            logger.info(f"{self.label}TX squelch: CTCSS {sq.get('ctcss_hz')} Hz")
+        elif mode == "dcs":
+            polarity = "I" if sq.get("dcs_inverted", False) else "N"
+            logger.info(f"{self.label}TX squelch: DCS {str(sq.get('dcs_code')).zfill(3)}{polarity}")
+        clips_cfg = self.cfg.get("clips", {})
+        if clips_cfg.get("enabled", False):
+            logger.info(
+                f"{self.label}TX clips: ID '{clips_cfg.get('callsign') or '-'}' every "
+                f"{clips_cfg.get('id_interval_s')}s, courtesy tone "
+                f"{'on' if clips_cfg.get('courtesy') else 'off'}, "
+                f"{len(clips_cfg.get('announcements') or [])} announcement(s)"
+            )
+        dtmf_cfg = self.cfg.get("dtmf", {})
+        if dtmf_cfg.get("enabled", False):
+            commands = dtmf_cfg.get("commands") or {}
+            logger.info(
+                f"{self.label}DTMF control: "
+                + ", ".join(f"{code}={action}" for code, action in sorted(commands.items()))
+            )
+        logger.info(
+            f"{self.label}TX gain: {p.tx_gain}, limiter: {p.limiter} {p.limit}, "
+            f"dc_block: {p.dc_block}"
+        )
+        if p.agc_enabled:
+            agc = dict(zip(AGC_SETTINGS, p.agc))
+            logger.info(
+                f"{self.label}TX AGC: target={agc['target_dbfs']}dBFS "
+                f"gain={agc['min_gain_db']}..{agc['max_gain_db']}dB "
+                f"compressor={agc['threshold_dbfs']}dBFS {agc['ratio']}:1 "
+                f"lookahead={agc['lookahead_ms']}ms"
+            )
+        if p.denoise_enabled:
+            logger.info(
+                f"{self.label}TX denoise: frame={p.denoise_frame_ms}ms "
+                f"reduction={p.denoise_reduction_db}dB threshold={p.denoise_threshold} "
+                f"cpu_budget={p.denoise_budget:.0%}"
+            )
 
-    mono = mono * np.float32(tx_gain)
+    def sync_params(self):
+        """Audio thread only: adopt a swapped snapshot. Returns True if it changed."""
+        vox_open = self.chain.gate.active
+        if not self.chain.sync_params():
+            return False
+        if vox_open and not self.chain.gate.active and self.arbiter is not None:
+            self.arbiter.set("vox", False)
+        return True
+
+    def prepare(self, samplerate, blocksize=0):
+        """Bind to a started stream's rate and block size."""
+        self.chain.prepare(samplerate, blocksize)
+        self._clips_keyed = False
+        if self.zello is not None:
+            self.zello.prepare(self.chain.samplerate)
+            self.zello.start()
+
+    def poll_dtmf(self):
+        """Main loop: feed the digits decoded since the last call and run finished commands."""
+        if self.chain.dtmf is None:
+            return
+        digits = self.chain.dtmf.digits
+        while digits:
+            digit, at = digits.popleft()
+            action = self.chain.dtmf_commands.feed(digit, at)
+            if action is None:
+                continue
+            logger.info(f"{self.label}DTMF command: {action}")
+            try:
+                self.actions[action]()
+            except Exception as e:
+                logger.error(f"{self.label}DTMF command {action} failed: {e}")
+
+    def play_clip(self, name):
+        """Queue a clip now; a timer for it restarts from here."""
+        if self.chain.clip_schedule is None:
+            raise RuntimeError(f"{self.name or 'radio'} has no clips enabled")
+        self.chain.clip_schedule.force(name, time.monotonic())
+
+    def poll_clips(self, now):
+        """Main loop: note traffic and queue the clips whose timers are due."""
+        schedule = self.chain.clip_schedule
+        if schedule is None:
+            return
+        if self.ptt is not None and self.ptt.is_down and not self.chain.clips.keyed:
+            schedule.activity()
+        schedule.tick(now)
+
+    def mix_clips(self, out):
+        """Audio thread: mix the playing clip into out and key PTT around it."""
+        keyed = self.chain.clips.mix(out, self.chain.active_params.limit)
+        if keyed != self._clips_keyed:
+            self._clips_keyed = keyed
+            self.arbiter.set("clips", keyed)
+
+    def on_level(self, level, now=None):
+        action = self.chain.gate_level(level, now=now)
+        schedule = self.chain.clip_schedule
+        if action == "start":
+            if self.ptt_timing is not None:
+                self.ptt_timing.mark_onset(self.chain.gate.audio_started_at)
+            if schedule is not None:
+                schedule.activity()
+            self.arbiter.set("vox", True)
+        elif action == "stop":
+            if schedule is not None and schedule.released():
+                # Hand PTT to the courtesy clip before VOX lets go, so it stays keyed.
+                self._clips_keyed = True
+                self.arbiter.set("clips", True)
+            self.arbiter.set("vox", False)
+
+    def start_recorder(self, samplerate, metrics, fallback_source="tx"):
+        rec_cfg = self.cfg.get("recorder", {})
+        if self.recorder is not None or not rec_cfg.get("enabled", False):
+            return
+        self.recorder = TxRecorder(
+            directory=rec_cfg.get("directory", "recordings"),
+            samplerate=samplerate,
+            channels=1,
+            source=self.name or fallback_source,
+            fmt=rec_cfg.get("format", "wav"),
+            slot_frames=int(rec_cfg.get("slot_frames", 4096)),
+            slots=int(rec_cfg.get("slots", 256)),
+            max_total_mb=rec_cfg.get("max_total_mb", 500),
+            max_files=rec_cfg.get("max_files", 1000),
+            max_session_s=rec_cfg.get("max_session_s", 600),
+            metrics=metrics,
+        )
+        self.recorder.start()
 
-    if limit > 0:
-        drive = 1.0 / max(limit, 1e-6)
-        mono = np.tanh(mono * drive) * np.float32(limit)
+    def stop(self):
+        if self.arbiter is not None:
+            self.arbiter.close()
+        if self.ptt_timing is not None:
+            self.ptt_timing.cancel()
+        try:
+            if self.ptt is not None:
+                self.ptt.up(source=self.source("shutdown"))
+        except Exception:
+            pass
+        wake = self.metrics.timings.get(self.metric("ptt_wake_ms")) if self.metrics else None
+        if wake is not None and wake.count:
+            logger.info(
+                f"{self.label}PTT scheduler wake-up jitter: {wake.count} event(s), "
+                f"p50 {wake.percentile(50):.3f} ms, p99 {wake.percentile(99):.3f} ms, "
+                f"max {wake.max:.3f} ms, {self.ptt_timing.late} late"
+            )
+        if self.zello is not None:
+            self.zello.stop()
+            logger.info(f"{self.label}Zello: {self.zello.stats()}")
+            self.zello = None
+
+    def stop_recorder(self):
+        if self.recorder is not None:
+            self.recorder.stop()
+            logger.info(
+                f"{self.label}TX recorder: {self.recorder.files} file(s), "
+                f"{self.recorder.dropped} dropped block(s)"
+            )
+            self.recorder = None
 
-    return mono.astype(np.float32).reshape(-1, 1)
+    def close(self):
+        if self.arbiter is not None:
+            self.arbiter.close()
+            self.arbiter = None
+        if self.ptt_timing is not None:
+            self.ptt_timing.close()
+            self.ptt_timing = None
+        if self.ptt is not None:
+            self.ptt.close()
+        try:
+            if self.backend is not None:
+                self.backend.close()
+        except Exception:
+            pass
 
 
-def log_runtime_diagnostics():
-    if platform.system() != "Linux":
-        return
+class LinkRuntime:
+    """
+    One audio stream and the radio channels it carries.
+
+    Without a channel_map the stream is mono and input is downmixed, as before.
+    With one, each entry is a separate radio (backend, VOX, gain) bound to an
+    input and output column of the same duplex stream, and the whole block is
+    shaped as a single 2-D array per callback.
+    """
+
+    def __init__(self, cfg, args, name=None):
+        self.cfg = cfg
+        self.args = args
+        self.name = name
+        self.label = f"[{name}] " if name else ""
+        self.metrics = Metrics()
+        self.error = None
+
+        self.stream = None
+        self.samplerate = None
+        self.output_latency = 0.0
+        self.ptt_timed = False
+
+        self.input_index = args.audio_input_index
+        if self.input_index is None:
+            self.input_index = cfg.get("audio_input_index")
+        self.output_index = args.audio_output_index
+        if self.output_index is None:
+            self.output_index = cfg.get("audio_output_index")
+
+        audio_cfg = cfg.get("audio", {})
+        self.configured_sr = int(audio_cfg.get("samplerate", 48000))
+        self.blocksize = int(audio_cfg.get("blocksize", 0) or 0)
+        self.engine_name = _arg_or_cfg(
+            getattr(args, "audio_engine", None), audio_cfg, "engine", "sounddevice"
+        )
 
-    session_type = os.environ.get("XDG_SESSION_TYPE", "").lower() or "unknown"
-    desktop = os.environ.get("XDG_CURRENT_DESKTOP", "") or "unknown"
-    logger.info(f"Runtime session: {session_type} (desktop={desktop})")
+        channel_map = cfg.get("channel_map") or []
+        self.split = bool(channel_map)
+        if self.split:
+            base = {k: v for k, v in cfg.items() if k != "channel_map"}
+            ch_args = scoped_args(args)
+            self.channels = []
+            for i, entry in enumerate(channel_map):
+                ch_name = str(entry.get("name") or f"ch{i}")
+                self.channels.append(TxChannel(
+                    merge_defaults(base, entry),
+                    ch_args,
+                    name=f"{name}/{ch_name}" if name else ch_name,
+                    input_channel=int(entry.get("input_channel", i)),
+                    output_channel=int(entry.get("output_channel", i)),
+                ))
+        else:
+            self.channels = [TxChannel(cfg, args, name=name)]
+        for ch in self.channels:
+            ch.metrics = ch.chain.metrics = self.metrics
+            ch.on_fault = self._ptt_fault
+
+        self.splitter = None
+
+        rec_cfg = cfg.get("recovery", {})
+        self.recovery_enabled = bool(rec_cfg.get("enabled", True))
+        self.stall_timeout = float(rec_cfg.get("stall_timeout_s", 2.0))
+        self.reinit_portaudio = bool(rec_cfg.get("reinit_portaudio", True))
+        self.backoff = Backoff(
+            rec_cfg.get("initial_backoff_s", 0.5),
+            rec_cfg.get("max_backoff_s", 30.0),
+        )
+        self.fault_reason = None
+        self.fault_at = None
+        self.fault_fatal = False
+        self.recovering = False
+        self.failed = False
+        self.next_attempt_at = 0.0
+        self.input_name = None
+        self.output_name = None
+        self._stopping = False
+        self._last_callbacks = 0
+        self._last_progress = time.monotonic()
+        self._vox_state_saved_at = time.monotonic()
+
+        rt_cfg = cfg.get("realtime", {})
+        self.realtime = None
+        if getattr(args, "realtime", False) or rt_cfg.get("enabled", False):
+            self.realtime = RealtimeMode.from_config(rt_cfg, label=self.label)
+        self.rt_compare_s = float(rt_cfg.get("compare_s", 10.0) or 0.0)
+        self._rt_phase = None
+        self._rt_since = 0.0
+        self._rt_promote = False
+
+    @property
+    def backend(self):
+        return self.channels[0].backend
+
+    @property
+    def ptt(self):
+        return self.channels[0].ptt
+
+    @property
+    def hotkey_enabled(self):
+        return any(ch.hotkey_enabled for ch in self.channels)
+
+    def init_hotkey(self):
+        for ch in self.channels:
+            ch.init_hotkey()
 
-    if session_type == "wayland":
-        logger.warning(
-            "Wayland session detected. Global key injection may be blocked. "
-            "Prefer serial or CM108 PTT with --force-serial-ptt."
+    def open(self):
+        for ch in self.channels:
+            ch.open()
+
+    def log_settings(self):
+        if self.engine_name not in PORTAUDIO_ENGINES:
+            logger.info(f"{self.label}Audio engine: {self.engine_name}")
+            for ch in self.channels:
+                ch.log_settings()
+            return
+        logger.info(f"{self.label}TX input index: {self.input_index}")
+        logger.info(f"{self.label}TX output index: {self.output_index}")
+        for ch in self.channels:
+            ch.log_settings()
+
+        try:
+            in_info = sd.query_devices(self.input_index)
+            out_info = sd.query_devices(self.output_index)
+            logger.info(f"{self.label}Audio input:  [{self.input_index}] {in_info.get('name')}")
+            logger.info(f"{self.label}Audio output: [{self.output_index}] {out_info.get('name')}")
+        except Exception:
+            pass
+
+    def audio_callback(self, indata, outdata, frames, time_info, status):
+        started = time.perf_counter()
+        self.metrics.inc("callbacks")
+        if self._rt_promote:
+            self._promote_audio_thread()
+        if status:
+            self.metrics.inc("status_flags")
+            logger.warning(f"{self.label}TX callback status: {status}")
+        if self.ptt_timed:
+            self._update_dac_latency(time_info)
+
+        try:
+            changed = False
+            for ch in self.channels:
+                if ch.sync_params():
+                    changed = True
+            if self.splitter is not None:
+                levels = self.splitter.shape(indata, outdata, changed)
+                for ch, level in zip(self.channels, levels):
+                    self.metrics.set(f"level.{ch.name}", level)
+            else:
+                levels = (self.channels[0].chain.shape(indata, outdata),)
+                self.metrics.set("level", levels[0])
+        except Exception as e:
+            self.metrics.inc("callback_errors")
+            self.report_fault(f"audio callback failed: {e}")
+            zero_out(outdata)
+            return
+
+        now = time.monotonic()
+        for ch, level in zip(self.channels, levels):
+            try:
+                ch.on_level(level, now=now)
+            except Exception as e:
+                self._ptt_fault(ch, e)
+            col = ch.output_channel if self.split else 0
+            if ch.chain.clips is not None:
+                try:
+                    ch.mix_clips(outdata[:, col])
+                except Exception as e:
+                    self._ptt_fault(ch, e)
+            if ch.recorder is not None:
+                ch.recorder.push(outdata[:, col:col + 1], ch.ptt is not None and ch.ptt.is_down)
+            if ch.zello is not None:
+                ch.zello.push(outdata[:, col])
+
+        self.metrics.observe("callback_ms", (time.perf_counter() - started) * 1000.0)
+
+    def _update_dac_latency(self, time_info):
+        # Some host APIs leave currentTime at 0; fall back to the stream's output latency.
+        latency = self.output_latency
+        if time_info is not None and time_info.currentTime > 0:
+            dac = time_info.outputBufferDacTime - time_info.currentTime
+            if 0.0 < dac < 1.0:
+                latency = dac
+        for ch in self.channels:
+            if ch.ptt_timing is not None:
+                ch.ptt_timing.latency = latency
+
+    def _promote_audio_thread(self):
+        # Runs once on each new stream's callback thread.
+        self._rt_promote = False
+        self.realtime.promote("audio")
+        if self._rt_phase == "compare":
+            timings = self.metrics.timings
+            timings["callback_ms_before_rt"] = timings.pop("callback_ms", Timing())
+
+    def _start_realtime(self):
+        self.realtime.enter()
+        default_wheel().schedule(0, self.realtime.promote, "ptt")
+        self._rt_promote = True
+
+    def _supervise_realtime(self, now):
+        if self._rt_phase == "baseline" and now - self._rt_since >= self.rt_compare_s:
+            self._rt_phase = "compare"
+            self._rt_since = now
+            self._start_realtime()
+        elif self._rt_phase == "compare" and now - self._rt_since >= self.rt_compare_s:
+            self._rt_phase = "on"
+            self.log_realtime_comparison()
+        self.realtime.tick(now)
+
+    def log_realtime_comparison(self):
+        before = self.metrics.timings.get("callback_ms_before_rt")
+        after = self.metrics.timings.get("callback_ms")
+        if before is None or after is None or not before.count or not after.count:
+            return
+        logger.info(
+            f"{self.label}Worst TX callback: {before.max:.2f} ms before realtime mode "
+            f"(p99 {before.percentile(99):.2f} ms, {before.count} callbacks), "
+            f"{after.max:.2f} ms after (p99 {after.percentile(99):.2f} ms, "
+            f"{after.count} callbacks)"
         )
 
+    def _ptt_fault(self, ch, error):
+        self.metrics.inc("backend_errors")
+        self.report_fault(
+            f"{ch.name or 'radio'} PTT failed: {error}", fatal=isinstance(error, FATAL_ERRORS)
+        )
 
-def handle_stop_signal(*_):
-    logger.info("Shutting down...")
-    stop_event.set()
+    def _select_channels(self, name):
+        if name is None:
+            return self.channels
+        found = [ch for ch in self.channels if ch.name == name]
+        if not found:
+            raise RuntimeError(f"unknown channel: {name}")
+        return found
+
+    def remote_ptt(self, req):
+        """Control channel "ptt": {"state": bool, "source": "remote", "channel": name}."""
+        source = str(req.get("source") or "remote")
+        for ch in self._select_channels(req.get("channel")):
+            ch.request_ptt(source, bool(req.get("state")))
+        return {"arbiter": self.arbiter_state()}
+
+    def remote_lock(self, req):
+        """Control channel "lock": keep sources below "level" (default: all) from keying."""
+        level = req.get("level")
+        reason = str(req.get("reason") or "remote lock")
+        for ch in self._select_channels(req.get("channel")):
+            ch.lock(None if level is None else int(level), reason)
+        return {"arbiter": self.arbiter_state()}
+
+    def remote_unlock(self, req):
+        for ch in self._select_channels(req.get("channel")):
+            ch.unlock()
+        return {"arbiter": self.arbiter_state()}
+
+    def remote_play(self, req):
+        """Control channel "play": {"clip": name, "channel": name} queues a clip now."""
+        for ch in self._select_channels(req.get("channel")):
+            ch.play_clip(str(req.get("clip") or "id"))
+        return {"clips": {ch.name or "radio": ch.chain.clips.stats() for ch in self.channels
+                          if ch.chain.clips is not None}}
+
+    def arbiter_state(self):
+        return {
+            ch.name or "radio": ch.arbiter.state() if ch.arbiter is not None else None
+            for ch in self.channels
+        }
+
+    def _on_stream_finished(self):
+        if not self._stopping:
+            self.report_fault("audio stream finished unexpectedly")
+
+    def open_engine(self, channels):
+        """Build the audio engine; its rate and block size are final once this returns."""
+        jack_cfg = self.cfg.get("jack", {})
+        blocking_cfg = self.cfg.get("blocking", {})
+        client_name = jack_cfg.get("client_name") or "zpttlink"
+        return build_engine(
+            self.engine_name,
+            callback=self.audio_callback,
+            finished_callback=self._on_stream_finished,
+            channels=channels,
+            samplerate=(
+                choose_samplerate(
+                    self.input_index, self.output_index, default_sr=self.configured_sr
+                )
+                if self.engine_name in PORTAUDIO_ENGINES
+                else self.configured_sr
+            ),
+            blocksize=self.blocksize,
+            device=(self.input_index, self.output_index),
+            client_name=f"{client_name}-{self.name}" if self.name else client_name,
+            server=jack_cfg.get("server"),
+            connect_inputs=jack_cfg.get("connect_inputs") or (),
+            connect_outputs=jack_cfg.get("connect_outputs") or (),
+            jitter_blocks=blocking_cfg.get("jitter_blocks", 2),
+            max_batch=blocking_cfg.get("max_batch", 4),
+        )
 
+    def start(self):
+        for ch in self.channels:
+            ch.sync_params()
+
+        channels = 1
+        if self.split:
+            self.splitter = SplitChains(
+                [ch.chain for ch in self.channels],
+                [ch.input_channel for ch in self.channels],
+                [ch.output_channel for ch in self.channels],
+                label=self.label,
+            )
+            self.splitter.metrics = self.metrics
+            channels = (self.splitter.in_channels, self.splitter.out_channels)
+            logger.info(
+                f"{self.label}Channel split: {len(self.channels)} radio(s) on "
+                f"{self.splitter.in_channels} in / {self.splitter.out_channels} out channel(s)"
+            )
 
-def choose_samplerate(input_index, output_index, default_sr=48000):
-    if not sd:
-        return default_sr
-    try:
-        in_info = sd.query_devices(input_index)
-        out_info = sd.query_devices(output_index)
-        in_sr = in_info.get("default_samplerate") or default_sr
-        out_sr = out_info.get("default_samplerate") or default_sr
-        if abs(float(in_sr) - float(out_sr)) < 1.0:
-            return int(round(float(in_sr)))
-    except Exception:
-        pass
-    return default_sr
+        self.stream = self.open_engine(channels)
+        self.samplerate = self.stream.samplerate
+        blocksize = self.stream.blocksize
+        logger.info(
+            f"{self.label}TX samplerate: {self.samplerate} ({self.stream.name}"
+            + (f", {blocksize}-frame blocks)" if blocksize else ")")
+        )
+        for ch in self.channels:
+            ch.prepare(self.samplerate, blocksize)
+        try:
+            self.output_latency = float(self.stream.latency()[1])
+        except Exception:
+            self.output_latency = 0.0
+        self.ptt_timed = any(ch.ptt_timing is not None for ch in self.channels)
 
+        if self.engine_name in PORTAUDIO_ENGINES:
+            try:
+                self.input_name = sd.query_devices(self.input_index).get("name")
+                self.output_name = sd.query_devices(self.output_index).get("name")
+            except Exception:
+                pass
+        self.load_vox_state()
+
+        for ch in self.channels:
+            ch.start_recorder(self.samplerate, self.metrics, fallback_source=self.name or "tx")
+            ch.start_rx(self.samplerate, blocksize)
+
+        self._stopping = False
+        self.stream.start()
+        _live_runtimes.add(self)
+        self._last_progress = time.monotonic()
+        if self.realtime is not None:
+            if self._rt_phase is None and self.rt_compare_s > 0:
+                self._rt_phase = "baseline"
+                self._rt_since = self._last_progress
+                logger.info(
+                    f"{self.label}Realtime mode starts in {self.rt_compare_s:g}s "
+                    "(measuring callbacks without it first)"
+                )
+            elif self._rt_phase != "baseline":
+                self._rt_phase = self._rt_phase or "on"
+                self._start_realtime()
+        logger.info(f"{self.label}TX audio stream active.")
+
+    def vox_state_key(self, ch):
+        return f"{self.input_name or self.input_index}#{ch.input_channel or 0}"
+
+    def load_vox_state(self):
+        for ch in self.channels:
+            estimator = ch.chain.gate.noise_floor
+            if estimator is None or estimator.floor is not None:
+                continue
+            path = ch.cfg.get("vox", {}).get("adaptive", {}).get("state_file")
+            entry = read_vox_state(path).get(self.vox_state_key(ch))
+            if entry and entry.get("floor"):
+                estimator.seed(entry["floor"])
+                logger.info(f"{ch.label}VOX noise floor restored: {entry['floor']:.6f}")
+
+    def save_vox_state(self):
+        for ch in self.channels:
+            estimator = ch.chain.gate.noise_floor
+            if estimator is None or estimator.floor is None:
+                continue
+            path = ch.cfg.get("vox", {}).get("adaptive", {}).get("state_file")
+            write_vox_state(path, self.vox_state_key(ch), estimator.state())
+
+    def apply_config(self, cfg):
+        """Push gain, limiter and VOX settings from cfg to the running channels."""
+        if not self.split:
+            return self.channels[0].chain.set_params(tx_params(cfg, self.args))
+
+        channel_map = cfg.get("channel_map") or []
+        if len(channel_map) != len(self.channels):
+            logger.warning(f"{self.label}channel_map layout changed; restart to apply it")
+            return False
+        base = {k: v for k, v in cfg.items() if k != "channel_map"}
+        changed = False
+        for ch, entry in zip(self.channels, channel_map):
+            if ch.chain.set_params(tx_params(merge_defaults(base, entry), ch.args)):
+                changed = True
+        return changed
+
+    def stop(self):
+        for ch in self.channels:
+            ch.stop()
+        self._close_stream()
+        self.save_vox_state()
+        for ch in self.channels:
+            ch.stop_recorder()
+        if self.realtime is not None:
+            if self._rt_phase == "compare":
+                self.log_realtime_comparison()
+            self.realtime.leave()
+
+    def _close_stream(self, abort=False):
+        self._stopping = True
+        _live_runtimes.discard(self)
+        for ch in self.channels:
+            ch.stop_rx()
+        try:
+            if self.stream is not None:
+                if abort:
+                    self.stream.abort()
+                else:
+                    self.stream.stop()
+                self.stream.close()
+        except Exception:
+            pass
+        self.stream = None
+
+    def report_fault(self, reason, fatal=False):
+        # Called from the audio thread or PTT paths: record only, recovery runs in supervise().
+        if self.fault_reason is None:
+            self.fault_reason = reason
+            self.fault_fatal = fatal
+            if self.fault_at is None:
+                self.fault_at = time.monotonic()
+
+    def _check_stream(self, now):
+        if self.stream is None:
+            return
+        callbacks = self.metrics.counters.get("callbacks", 0)
+        if callbacks != self._last_callbacks:
+            self._last_callbacks = callbacks
+            self._last_progress = now
+        elif now - self._last_progress > self.stall_timeout:
+            self.report_fault("audio stream stalled")
+            return
 
-def maybe_log_level(level, enabled):
-    global _last_level_log
-    if not enabled:
-        return
-    now = time.monotonic()
-    if now - _last_level_log >= 0.25:
-        logger.info(f"VOX level={level:.6f}")
-        _last_level_log = now
+        try:
+            active = bool(self.stream.active)
+        except Exception:
+            active = False
+        if not active:
+            self.report_fault("audio stream inactive")
+
+    def supervise(self):
+        """Detect a dead stream or backend and drive recovery; call from the main loop."""
+        now = time.monotonic()
+        if now - self._vox_state_saved_at >= VOX_STATE_SAVE_INTERVAL_S:
+            self._vox_state_saved_at = now
+            self.save_vox_state()
+        if self.realtime is not None:
+            self._supervise_realtime(now)
+        for ch in self.channels:
+            ch.poll_dtmf()
+            ch.poll_clips(now)
+
+        if not self.recovery_enabled or self.failed:
+            return
+        if not self.recovering:
+            self._check_stream(now)
+            if self.fault_reason is None:
+                return
+            self._begin_recovery(now)
+            if self.fault_fatal:
+                self._fail(self.fault_reason)
+                return
+        if now >= self.next_attempt_at:
+            self._attempt_recovery()
+
+    def _begin_recovery(self, now):
+        self.recovering = True
+        self.metrics.inc("faults")
+        self.metrics.set("state", "recovering")
+        logger.error(f"{self.label}Link fault: {self.fault_reason}; forcing PTT off and recovering")
+
+        for ch in self.channels:
+            if ch.arbiter is not None:
+                ch.arbiter.reset()
+            if ch.ptt_timing is not None:
+                ch.ptt_timing.cancel()
+            if ch.ptt is not None:
+                ch.ptt.force_off(source=ch.source("recovery"))
+            ch.chain.gate.reset()
+
+        self._close_stream(abort=True)
+        self.close()
+        self.next_attempt_at = now + self.backoff.next()
+
+    def _reinit_audio(self):
+        if sd is None or self.engine_name not in PORTAUDIO_ENGINES:
+            return
+        # PortAudio only rescans devices on (re)initialize; skip if other streams share it.
+        if self.reinit_portaudio and not _live_runtimes:
+            try:
+                sd._terminate()
+                sd._initialize()
+            except Exception as e:
+                logger.warning(f"{self.label}PortAudio reinitialize failed: {e}")
+
+        for attr, name, kind in (
+            ("input_index", self.input_name, "input"),
+            ("output_index", self.output_name, "output"),
+        ):
+            idx = find_audio_device(name, kind)
+            if idx is not None and idx != getattr(self, attr):
+                logger.info(f"{self.label}Audio {kind} '{name}' moved to index {idx}")
+                setattr(self, attr, idx)
+
+    def _attempt_recovery(self):
+        reason = self.fault_reason
+        self.fault_reason = None
+        self.metrics.inc("recovery_attempts")
+        try:
+            self._reinit_audio()
+            self.open()
+            self.start()
+        except FATAL_ERRORS as e:
+            self._close_stream(abort=True)
+            self.close()
+            self._fail(str(e) or e.__class__.__name__)
+            return
+        except Exception as e:
+            delay = self.backoff.next()
+            logger.warning(f"{self.label}Recovery attempt failed: {e}; retrying in {delay:.1f}s")
+            self._close_stream(abort=True)
+            self.close()
+            if self.fault_reason is None:
+                self.fault_reason = reason
+            self.next_attempt_at = time.monotonic() + delay
+            return
 
+        elapsed = time.monotonic() - self.fault_at
+        self.metrics.observe("recovery_s", elapsed)
+        self.metrics.inc("recoveries")
+        self.metrics.set("state", "running")
+        logger.info(f"{self.label}Recovered from '{reason}' in {elapsed:.2f}s")
+        self.recovering = False
+        self.fault_at = None
+        self.error = None
+        self.backoff.reset()
+
+    def _fail(self, reason):
+        """Give up on a fault that is a config error; PTT is already off and the link stays down."""
+        self.recovering = False
+        self.failed = True
+        self.error = reason
+        self.metrics.set("state", "failed")
+        logger.error(
+            f"{self.label}Recovery stopped: {reason}. This is a configuration error; "
+            "fix the config and restart."
+        )
 
-def main():
-    global keyboard, logger, audio_stream
+    def close(self):
+        for ch in self.channels:
+            ch.close()
 
+    def health(self):
+        stream_active = False
+        try:
+            stream_active = bool(self.stream is not None and self.stream.active)
+        except Exception:
+            pass
+        return {
+            "name": self.name,
+            "backend": self.backend.name if self.backend is not None else None,
+            "ptt": any(ch.ptt is not None and ch.ptt.is_down for ch in self.channels),
+            "channels": [
+                {
+                    "name": ch.name,
+                    "backend": ch.backend.name if ch.backend is not None else None,
+                    "ptt": bool(ch.ptt is not None and ch.ptt.is_down),
+                    "ptt_timing": ch.ptt_timing.stats() if ch.ptt_timing is not None else None,
+                    "squelch_open": (
+                        ch.chain.squelch.open if ch.chain.squelch is not None else None
+                    ),
+                    "dtmf": (
+                        ch.chain.dtmf_commands.stats()
+                        if ch.chain.dtmf_commands is not None
+                        else None
+                    ),
+                    "clips": ch.chain.clips.stats() if ch.chain.clips is not None else None,
+                    "hotkey": (
+                        ch.ptt.hotkeys.stats()
+                        if ch.ptt is not None and ch.ptt.hotkeys is not None
+                        else None
+                    ),
+                    "arbiter": ch.arbiter.state() if ch.arbiter is not None else None,
+                    "zello": ch.zello.stats() if ch.zello is not None else None,
+                }
+                for ch in self.channels
+            ],
+            "engine": self.engine_name,
+            "engine_stats": self.stream.stats() if self.stream is not None else None,
+            "realtime": self.realtime.report() if self.realtime is not None else None,
+            "stream_active": stream_active,
+            "recovering": self.recovering,
+            "failed": self.failed,
+            "fault": self.fault_reason,
+            "error": self.error,
+            "metrics": self.metrics.snapshot(),
+        }
+
+
+def build_arg_parser():
     parser = argparse.ArgumentParser(prog="zpttlink", description="ZPTTLink 2.1 TX bridge")
     parser.add_argument("--config", default=DEFAULT_CONFIG_FILE)
     parser.add_argument("--key", help="Hotkey to send to Zello")
     parser.add_argument("--serial", help="Serial port override")
     parser.add_argument("--baud", type=int, default=None)
-    parser.add_argument("--radio-type", choices=["auto", "cm108", "digirig", "signalink"], default=None)
+    parser.add_argument("--radio-type", default=None,
+                        help="auto, digirig, cm108, signalink or an installed plugin backend")
     parser.add_argument("--ptt-output", choices=["none", "dtr", "rts"], default=None)
     parser.add_argument("--no-hotkey", action="store_true")
+    parser.add_argument("--hotkey-backend", choices=["auto"] + sorted(keyinject.INJECTORS),
+                        default=None, help="How hotkeys are injected (default: auto)")
+    parser.add_argument("--bench-hotkey", action="store_true",
+                        help="Time key injection per backend (presses --key, default F20)")
     parser.add_argument("--test-ptt", action="store_true")
     parser.add_argument("--list-serial", action="store_true")
     parser.add_argument("--list-audio", action="store_true")
+    parser.add_argument("--list-backends", action="store_true")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--log-level", default=None)
 
     parser.add_argument("--audio-input-index", type=int, default=None)
     parser.add_argument("--audio-output-index", type=int, default=None)
+    parser.add_argument("--realtime", action="store_true",
+                        help="SCHED_FIFO audio/PTT threads, locked memory, frozen GC")
+    parser.add_argument("--audio-engine", choices=sorted(ENGINES), default=None,
+                        help="Audio API for the TX stream (default: audio.engine)")
 
     parser.add_argument("--vox", action="store_true")
     parser.add_argument("--vox-threshold", type=float, default=None)
@@ -700,13 +1922,34 @@ def main():
     parser.add_argument("--ptt-active-low", action="store_true")
     parser.add_argument("--ptt-active-high", action="store_true")
 
+    parser.add_argument("--measure-latency", action="store_true",
+                        help="Inject test bursts through a null audio device and "
+                             "report PTT latency")
+    parser.add_argument("--latency-bursts", type=int, default=30)
+    parser.add_argument("--latency-backend", choices=["both", "loopback", "configured"],
+                        default="both")
+    return parser
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        try:
+            from .replay import main as replay_main
+        except ImportError:
+            from replay import main as replay_main
+        sys.exit(replay_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        try:
+            from .bench import main as bench_main
+        except ImportError:
+            from bench import main as bench_main
+        sys.exit(bench_main(sys.argv[2:]))
+
+    parser = build_arg_parser()
     args = parser.parse_args()
 
     cfg = load_config(args.config)
-
-    log_level = args.log_level or cfg.get("logging", {}).get("level", "INFO")
-    logfile = cfg.get("logging", {}).get("file", DEFAULT_LOGFILE)
-    logger = setup_logging(level=log_level, logfile=logfile)
+    configure_logging(cfg, args.log_level)
 
     logger.info("Starting ZPTTLink core...")
     log_runtime_diagnostics()
@@ -724,57 +1967,57 @@ def main():
         list_audio_devices()
         return
 
-    hotkey_name = args.key or cfg.get("ptt_hotkey") or DEFAULT_KEY
-    hotkey_obj = parse_hotkey(hotkey_name)
+    if args.list_backends:
+        list_radio_backends()
+        return
 
-    force_serial_ptt = bool(args.force_serial_ptt or cfg.get("force_serial_ptt", False))
-    hotkey_enabled = not (args.no_hotkey or cfg.get("disable_hotkey", False))
-    if force_serial_ptt:
-        hotkey_enabled = False
+    if args.bench_hotkey:
+        bench_hotkey(args)
+        return
 
-    if hotkey_enabled:
+    if cfg.get("links"):
+        if sd is None or np is None:
+            logger.error("sounddevice and numpy are required for audio bridge mode")
+            sys.exit(5)
+        signal.signal(signal.SIGINT, handle_stop_signal)
         try:
-            keyboard = Controller()
-        except Exception as e:
-            logger.error(
-                "Keyboard controller failed to initialize.\n"
-                "- macOS: enable Terminal/iTerm under Privacy & Security -> Accessibility.\n"
-                "- Wayland: key injection may be blocked; prefer hardware PTT backends."
-            )
-            raise e
-        logger.info(f"Hotkey set to: {hotkey_name}")
-    else:
-        logger.info("Hotkey injection disabled.")
-
-    backend = build_radio_backend(cfg, args)
-    backend.open()
-    logger.info(f"Radio backend: {backend.name}")
-
-    ptt = PTTController(
-        backend=backend,
-        hotkey=hotkey_obj,
-        hotkey_enabled=hotkey_enabled,
-        dry_run=args.dry_run,
-    )
+            signal.signal(signal.SIGTERM, handle_stop_signal)
+        except Exception:
+            pass
+        try:
+            from .gateway import run_gateway
+        except ImportError:
+            from gateway import run_gateway
+        sys.exit(run_gateway(cfg, args, stop_event))
+
+    if args.measure_latency:
+        if np is None:
+            logger.error("numpy is required for latency measurement")
+            sys.exit(5)
+        try:
+            from .latency import run_latency
+        except ImportError:
+            from latency import run_latency
+        sys.exit(run_latency(cfg, args))
+
+    runtime = LinkRuntime(cfg, args)
+    runtime.init_hotkey()
+    runtime.open()
 
     if args.test_ptt:
         logger.info("Testing PTT for 1 second...")
-        ptt.down(source="test")
+        for ch in runtime.channels:
+            ch.ptt.down(source=ch.source("test"))
         time.sleep(1.0)
-        ptt.up(source="test")
+        for ch in runtime.channels:
+            ch.ptt.up(source=ch.source("test"))
         logger.info("PTT test complete.")
-        try:
-            backend.close()
-        except Exception:
-            pass
+        runtime.close()
         return
 
     if sd is None or np is None:
         logger.error("sounddevice and numpy are required for audio bridge mode")
-        try:
-            backend.close()
-        except Exception:
-            pass
+        runtime.close()
         sys.exit(5)
 
     signal.signal(signal.SIGINT, handle_stop_signal)
@@ -783,139 +2026,71 @@ def main():
     except Exception:
         pass
 
-    input_index = args.audio_input_index
-    if input_index is None:
-        input_index = cfg.get("audio_input_index")
-
-    output_index = args.audio_output_index
-    if output_index is None:
-        output_index = cfg.get("audio_output_index")
-
-    if input_index is None or output_index is None:
+    if runtime.engine_name in PORTAUDIO_ENGINES and (
+        runtime.input_index is None or runtime.output_index is None
+    ):
         logger.error("audio_input_index and audio_output_index must be set in config.json")
-        try:
-            backend.close()
-        except Exception:
-            pass
+        runtime.close()
         sys.exit(6)
 
-    vox_cfg = cfg.get("vox", {})
-    vox_enabled = bool(args.vox or vox_cfg.get("enabled", False))
-    vox_threshold = float(args.vox_threshold if args.vox_threshold is not None else vox_cfg.get("threshold", 0.02))
-    vox_attack_ms = int(args.vox_attack_ms if args.vox_attack_ms is not None else vox_cfg.get("attack_ms", 40))
-    vox_release_ms = int(args.vox_release_ms if args.vox_release_ms is not None else vox_cfg.get("release_ms", 120))
-    vox_hang_ms = int(args.vox_hang_ms if args.vox_hang_ms is not None else vox_cfg.get("hang_ms", 300))
-    vox_log_levels = bool(vox_cfg.get("log_levels", False))
-
-    audio_cfg = cfg.get("audio", {})
-    tx_gain = float(audio_cfg.get("tx_gain", 0.08))
-    configured_sr = int(audio_cfg.get("samplerate", 48000))
-    limiter = float(audio_cfg.get("limit", 0.90))
-    dc_block = bool(audio_cfg.get("dc_block", True))
-
-    logger.info(f"TX input index: {input_index}")
-    logger.info(f"TX output index: {output_index}")
-    logger.info(
-        "TX VOX: "
-        + ("enabled" if vox_enabled else "disabled")
-        + f" threshold={vox_threshold} attack={vox_attack_ms}ms release={vox_release_ms}ms hang={vox_hang_ms}ms"
-    )
-    logger.info(
-        f"TX gain: {tx_gain}, limiter: {limiter}, dc_block: {dc_block}"
-    )
-
-    try:
-        in_info = sd.query_devices(input_index)
-        out_info = sd.query_devices(output_index)
-        logger.info(f"Audio input:  [{input_index}] {in_info.get('name')}")
-        logger.info(f"Audio output: [{output_index}] {out_info.get('name')}")
-    except Exception:
-        pass
-
-    gate = AudioGate(
-        threshold=vox_threshold,
-        attack_ms=vox_attack_ms,
-        release_ms=vox_release_ms,
-        hang_ms=vox_hang_ms,
-    )
-
-    samplerate = choose_samplerate(input_index, output_index, default_sr=configured_sr)
-    logger.info(f"TX samplerate: {samplerate}")
-
-    def audio_callback(indata, outdata, frames, time_info, status):
-        if status:
-            logger.warning(f"TX callback status: {status}")
-
-        level = rms_level(indata)
-        maybe_log_level(level, vox_log_levels)
+    runtime.log_settings()
 
+    # Before the stream opens, so ZPTTLink's own output lands on the TX sink.
+    router = None
+    if cfg.get("routing", {}).get("enabled", False):
         try:
-            shaped = sanitize_audio(
-                indata,
-                tx_gain=tx_gain,
-                limit=limiter,
-                dc_block=dc_block,
-            )
-            outdata[:] = shaped
+            router = AudioRouter.from_config(cfg["routing"]).start()
         except Exception as e:
-            logger.error(f"Audio shaping failed: {e}")
-            zero_out(outdata)
-
-        if not vox_enabled:
-            return
-
-        action = gate.process(level)
-        if action == "start":
-            ptt.down(source="vox")
-        elif action == "stop":
-            ptt.up(source="vox")
+            logger.error(f"Audio routing failed: {e}")
+            runtime.close()
+            sys.exit(8)
 
     try:
-        audio_stream = sd.Stream(
-            device=(input_index, output_index),
-            samplerate=samplerate,
-            channels=1,
-            dtype="float32",
-            callback=audio_callback,
-        )
-        audio_stream.start()
-        logger.info("TX audio stream active.")
+        runtime.start()
     except Exception as e:
         logger.error(f"Failed to start TX stream: {e}")
-        try:
-            backend.close()
-        except Exception:
-            pass
+        if router is not None:
+            router.stop()
+        runtime.close()
         sys.exit(7)
 
     logger.info(
-        f"PTT system ready (radio_backend={backend.name}, hotkey_enabled={hotkey_enabled}, dry_run={args.dry_run})"
+        f"PTT system ready (radio_backend={','.join(ch.backend.name for ch in runtime.channels)}, "
+        f"hotkey_enabled={runtime.hotkey_enabled}, "
+        f"dry_run={args.dry_run})"
     )
     logger.info("ZPTTLink 2.1 TX bridge is running successfully! (Ctrl+C to exit)")
 
+    _, server, services = start_live_config(
+        cfg, args, runtime.apply_config, status=runtime.health
+    )
+    if server is not None:
+        server.register("ptt", runtime.remote_ptt)
+        server.register("lock", runtime.remote_lock)
+        server.register("unlock", runtime.remote_unlock)
+        server.register("play", runtime.remote_play)
+        if router is not None:
+            server.register("routing", lambda req: router.report())
+
     try:
         while not stop_event.is_set():
             time.sleep(0.1)
+            runtime.supervise()
+            if runtime.failed:
+                break
     finally:
-        try:
-            ptt.up(source="shutdown")
-        except Exception:
-            pass
-
-        try:
-            if audio_stream is not None:
-                audio_stream.stop()
-                audio_stream.close()
-        except Exception:
-            pass
-
-        try:
-            backend.close()
-        except Exception:
-            pass
-
+        for service in services:
+            service.stop()
+        runtime.stop()
+        runtime.close()
+        if router is not None:
+            router.stop()
+        close_keyboard()
         logger.info("ZPTTLink stopped. Goodbye.")
 
+    if runtime.failed:
+        sys.exit(2)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,81 @@
+import time
+
+# Per-name ring size for timing percentiles.
+WINDOW = 512
+
+
+class Timing:
+    def __init__(self, window=WINDOW):
+        self.count = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self._ring = [0.0] * int(window)
+        self._pos = 0
+
+    def observe(self, value):
+        value = float(value)
+        self.count += 1
+        self.last = value
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self._ring[self._pos] = value
+        self._pos = (self._pos + 1) % len(self._ring)
+
+    def percentile(self, q):
+        n = min(self.count, len(self._ring))
+        if n == 0:
+            return 0.0
+        values = sorted(self._ring[:n])
+        idx = int(round((q / 100.0) * (n - 1)))
+        return values[max(0, min(n - 1, idx))]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "last": self.last,
+            "max": self.max,
+            "mean": (self.total / self.count) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+class Metrics:
+    """
+    Counters, gauges and timings for one link.
+
+    Every name is expected to have a single writer (usually the audio
+    callback); updates are plain dict/attribute stores, so writers never
+    take a lock and readers just take a best-effort snapshot.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.timings = {}
+
+    def inc(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def timing(self, name):
+        t = self.timings.get(name)
+        if t is None:
+            t = self.timings[name] = Timing()
+        return t
+
+    def observe(self, name, value):
+        self.timing(name).observe(value)
+
+    def snapshot(self):
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timings": {k: v.snapshot() for k, v in list(self.timings.items())},
+        }
@@ -1,10 +1,152 @@
+import heapq
+import itertools
 import logging
-logger = logging.getLogger("ZPTTLink")
+import threading
+import time
 
-def init(com_port, hotkey):
-    logger.info(f"Listening for PTT on {com_port} (Hotkey: {hotkey})")
-    # TODO: Initialize serial port or USB listener
+logger = logging.getLogger("zpttlink")
 
-def check_ptt():
-    # TODO: Replace with actual PTT detection
-    return False
+
+class PttScheduler:
+    """
+    Keys the radio against the audio path rather than the gate decision.
+
+    Sits between the PTT arbiter and the PTTController. The audio thread
+    keeps latency up to date (outputBufferDacTime - currentTime of the last
+    block), so a request made now is timed for when the audio it belongs to
+    reaches the DAC: assert keyup_ms before the speech onset plays out,
+    release tail_ms after the current audio (and pre-roll) has played out.
+    Events run on a dedicated thread that sleeps until spin_us before the
+    target and then yields with sleep(0) until it, so they land within a few
+    tens of microseconds without holding the GIL against the audio thread.
+    A request drops whatever is still pending at or after its own target,
+    so events run in request order: a down() inside the tail of an up()
+    cancels that release instead of being followed by it. An event whose
+    target has already passed runs at once and counts as late. How late the
+    thread woke against each target is observed as wake_metric: this is
+    scheduling jitter only, the latency estimate itself is not checked
+    against the DAC.
+    """
+
+    def __init__(
+        self,
+        ptt,
+        keyup_ms=40,
+        tail_ms=30,
+        preroll_ms=0,
+        spin_us=500,
+        metrics=None,
+        wake_metric="ptt_wake_ms",
+        on_error=None,
+        name="ptt-scheduler",
+    ):
+        self.ptt = ptt
+        self.keyup_s = max(float(keyup_ms), 0.0) / 1000.0
+        self.tail_s = max(float(tail_ms), 0.0) / 1000.0
+        self.preroll_s = max(float(preroll_ms), 0.0) / 1000.0
+        self.spin_s = max(float(spin_us), 0.0) / 1e6
+        self.metrics = metrics
+        self.wake_metric = wake_metric
+        self.on_error = on_error
+        self.name = name
+
+        # Written by the audio thread; a plain float store.
+        self.latency = 0.0
+        self._onset = None
+
+        self.events = []
+        self._seq = itertools.count()
+        self.cond = threading.Condition()
+        self.late = 0
+        self.last_wake_ms = None
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_down(self):
+        return self.ptt.is_down
+
+    @property
+    def hotkeys(self):
+        return self.ptt.hotkeys
+
+    def mark_onset(self, at):
+        """Monotonic time the speech behind the next down() started (VOX attack)."""
+        self._onset = at
+
+    def down(self, source="unknown"):
+        now = time.monotonic()
+        onset = self._onset if self._onset is not None else now
+        self._onset = None
+        self._schedule(onset + self.latency + self.preroll_s - self.keyup_s, True, source)
+
+    def up(self, source="unknown"):
+        now = time.monotonic()
+        self._schedule(now + self.latency + self.preroll_s + self.tail_s, False, source)
+
+    def force_off(self, source="unknown"):
+        self.cancel()
+        self.ptt.force_off(source=source)
+
+    def cancel(self):
+        with self.cond:
+            self.events = []
+
+    def _schedule(self, target, down, source):
+        with self.cond:
+            if self.events and max(self.events)[0] >= target:
+                self.events = [e for e in self.events if e[0] < target]
+                heapq.heapify(self.events)
+            heapq.heappush(self.events, (target, next(self._seq), down, source))
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.events and not self._stop:
+                    self.cond.wait()
+                if self._stop:
+                    return
+                target = self.events[0][0]
+                delay = target - time.monotonic()
+                if delay > self.spin_s:
+                    self.cond.wait(delay - self.spin_s)
+                    continue
+                _, _, down, source = heapq.heappop(self.events)
+            while time.monotonic() < target:
+                time.sleep(0)
+            self._fire(target, down, source)
+
+    def _fire(self, target, down, source):
+        wake_ms = (time.monotonic() - target) * 1000.0
+        self.last_wake_ms = wake_ms
+        if wake_ms > 1.0:
+            self.late += 1
+        if self.metrics is not None:
+            self.metrics.observe(self.wake_metric, wake_ms)
+        try:
+            if down:
+                self.ptt.down(source=source)
+            else:
+                self.ptt.up(source=source)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+            else:
+                logger.error(f"PTT write failed: {e}")
+
+    def close(self):
+        with self.cond:
+            self._stop = True
+            self.events = []
+            self.cond.notify()
+        self._thread.join(1.0)
+
+    def stats(self):
+        return {
+            "latency_ms": self.latency * 1000.0,
+            "pending": len(self.events),
+            "late": self.late,
+            "last_wake_ms": self.last_wake_ms,
+        }
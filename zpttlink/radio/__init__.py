@@ -1,21 +1,57 @@
-from .cm108 import CM108Radio
-from .digirig import DigiRigRadio
-from .signalink import SignalinkRadio
+from .base import (
+    Capabilities,
+    RadioConfigError,
+    RadioInterface,
+    RadioInterfaceBase,
+    apply_active_low,
+)
+from .registry import (
+    ENTRY_POINT_GROUP,
+    available_backends,
+    backend_capabilities,
+    create_backend,
+    load_backend,
+    register_backend,
+)
 
-def get_radio(config):
-    mode = config.get("radio_type", "auto")
 
-    if mode == "cm108":
-        return CM108Radio(config)
+def choose_radio_type(cfg, args=None):
+    explicit = getattr(args, "radio_type", None) if args is not None else None
+    if explicit and explicit.lower() != "auto":
+        return explicit.lower()
 
-    if mode == "digirig":
-        return DigiRigRadio(config)
+    cfg_type = str(cfg.get("radio_type", "auto")).lower()
+    if cfg_type != "auto":
+        return cfg_type
 
-    if mode == "signalink":
-        return SignalinkRadio(config)
+    # Auto-detect: prefer CM108 if requested via hints/name, otherwise DigiRig.
+    port = str(cfg.get("com_port", "")).lower()
+    hints = " ".join(cfg.get("serial_autodetect_hints", [])).lower()
+    if "cm108" in hints or "aioc" in hints or "cm108" in port or "aioc" in port:
+        # Keep auto conservative: only pick CM108 if a matching USB device is present.
+        if load_backend("cm108").detect(cfg):
+            return "cm108"
 
-    # AUTO
-    if "aioc" in config.get("com_port", "").lower():
-        return CM108Radio(config)
+    return "digirig"
 
-    return DigiRigRadio(config)
+
+def get_radio(cfg, args=None):
+    """Build (but do not open) the backend selected by radio_type."""
+    return create_backend(choose_radio_type(cfg, args), cfg, args)
+
+
+__all__ = [
+    "Capabilities",
+    "ENTRY_POINT_GROUP",
+    "RadioConfigError",
+    "RadioInterface",
+    "RadioInterfaceBase",
+    "apply_active_low",
+    "available_backends",
+    "backend_capabilities",
+    "choose_radio_type",
+    "create_backend",
+    "get_radio",
+    "load_backend",
+    "register_backend",
+]
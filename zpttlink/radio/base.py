@@ -1,15 +1,67 @@
-class RadioInterface:
-    def __init__(self, config):
-        self.config = config
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger("zpttlink")
+
+# What a backend can do, so callers can decide without opening hardware.
+#   input_sensing: can report an external PTT/COS line (get_input())
+#   multi_line:    can drive more than one output line at once
+#   latency_class: "immediate" (no I/O), "kernel" (modem-line ioctl) or
+#                  "usb" (control transfer, bound to USB frame timing)
+Capabilities = namedtuple("Capabilities", ["input_sensing", "multi_line", "latency_class"])
+
+LATENCY_CLASSES = ("immediate", "kernel", "usb")
+
+
+class RadioConfigError(RuntimeError):
+    """The backend cannot be built from the given config (missing port, bad option)."""
+
+
+def apply_active_low(state, active_low):
+    return (not state) if active_low else state
+
+
+def arg(args, name):
+    return getattr(args, name, None) if args is not None else None
+
+
+class RadioInterfaceBase:
+    """
+    Base class for radio PTT backends.
+
+    Backends import their hardware library in open() (or a classmethod that
+    needs it), never at module import, so listing or selecting a backend
+    costs nothing for the ones that are not used.
+    """
+
+    name = "base"
+    capabilities = Capabilities(input_sensing=False, multi_line=False, latency_class="immediate")
+
+    @classmethod
+    def from_config(cls, cfg, args=None):
+        return cls()
+
+    @classmethod
+    def detect(cls, cfg):
+        """True if matching hardware is present; used by radio_type "auto"."""
+        return False
 
     def open(self):
         pass
 
-    def ptt_on(self):
+    def ptt_on(self, dry=False):
         pass
 
-    def ptt_off(self):
+    def ptt_off(self, dry=False):
         pass
 
+    def get_input(self):
+        """Logical state of the PTT/COS input line; only if capabilities.input_sensing."""
+        raise RuntimeError(f"{self.name} backend cannot sense a PTT input")
+
     def close(self):
         pass
+
+
+# Older name used by code written against zpttlink.radio.
+RadioInterface = RadioInterfaceBase
@@ -1,17 +1,117 @@
-import usb.core
-from .base import RadioInterface
+from .base import Capabilities, RadioInterfaceBase, apply_active_low, logger
+
+
+def _usb_core():
+    try:
+        import usb.core
+    except Exception:
+        return None
+    return usb.core
+
+
+class CM108Radio(RadioInterfaceBase):
+    name = "cm108"
+    # gpio_mask may set several GPIO pins in one transfer.
+    capabilities = Capabilities(input_sensing=True, multi_line=True, latency_class="usb")
+
+    def __init__(
+        self,
+        vendor_id=0x0D8C,
+        product_id=None,
+        gpio_mask=0x04,
+        active_low=False,
+        input_mask=0x02,
+        input_active_low=False,
+    ):
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.gpio_mask = int(gpio_mask) & 0xFF
+        self.active_low = bool(active_low)
+        self.input_mask = int(input_mask) & 0xFF
+        self.input_active_low = bool(input_active_low)
+        self.dev = None
+
+    @staticmethod
+    def _find_kwargs(vendor_id, product_id):
+        kwargs = {"idVendor": vendor_id}
+        if product_id is not None:
+            kwargs["idProduct"] = product_id
+        return kwargs
+
+    @classmethod
+    def from_config(cls, cfg, args=None):
+        cm_cfg = cfg.get("cm108", {})
+        return cls(
+            vendor_id=int(cm_cfg.get("vendor_id", 0x0D8C)),
+            product_id=cm_cfg.get("product_id", None),
+            gpio_mask=int(cm_cfg.get("gpio_mask", 0x04)),
+            active_low=bool(cm_cfg.get("active_low", False)),
+            input_mask=int(cm_cfg.get("input_mask", 0x02)),
+            input_active_low=bool(cm_cfg.get("input_active_low", False)),
+        )
+
+    @classmethod
+    def detect(cls, cfg):
+        core = _usb_core()
+        if core is None:
+            return False
+        cm_cfg = cfg.get("cm108", {})
+        kwargs = cls._find_kwargs(
+            int(cm_cfg.get("vendor_id", 0x0D8C)), cm_cfg.get("product_id", None)
+        )
+        try:
+            return core.find(**kwargs) is not None
+        except Exception:
+            return False
 
-class CM108Radio(RadioInterface):
     def open(self):
-        self.dev = usb.core.find(idVendor=0x0d8c)
+        core = _usb_core()
+        if core is None:
+            raise RuntimeError("pyusb not installed. Install with: pip install pyusb")
+        self.dev = core.find(**self._find_kwargs(self.vendor_id, self.product_id))
         if self.dev is None:
-            raise RuntimeError("CM108 device not found")
+            raise RuntimeError(
+                f"CM108/CM119 device not found (vendor=0x{self.vendor_id:04x}"
+                + (f", product=0x{self.product_id:04x}" if self.product_id is not None else "")
+                + ")"
+            )
 
-    def ptt_on(self):
-        self.dev.ctrl_transfer(0x21, 0x09, 0x0200, 0, [0x04])
+    def _write_gpio(self, logical_state, dry=False):
+        if self.dev is None:
+            raise RuntimeError("CM108 device not open")
+
+        # Many CM108 node interfaces use inverted logic externally; keep this configurable.
+        effective_on = apply_active_low(bool(logical_state), self.active_low)
+        value = self.gpio_mask if effective_on else 0x00
+
+        if dry:
+            logger.debug(
+                f"[DRY] CM108 GPIO logical={logical_state} effective_on={effective_on} "
+                f"mask=0x{self.gpio_mask:02x} value=0x{value:02x}"
+            )
+            return
+
+        # Standard CM108-style HID control transfer used by radio node software.
+        self.dev.ctrl_transfer(0x21, 0x09, 0x0200, 0, [value])
+        logger.info(
+            f"CM108 PTT -> {'ON' if logical_state else 'OFF'} "
+            f"(gpio=0x{value:02x}, active_low={self.active_low})"
+        )
 
-    def ptt_off(self):
-        self.dev.ctrl_transfer(0x21, 0x09, 0x0200, 0, [0x00])
+    def ptt_on(self, dry=False):
+        self._write_gpio(True, dry=dry)
+
+    def ptt_off(self, dry=False):
+        self._write_gpio(False, dry=dry)
+
+    def get_input(self):
+        if self.dev is None:
+            raise RuntimeError("CM108 device not open")
+        # HID GET_REPORT (input): byte 0 carries the button/GPIO inputs, where
+        # node interfaces usually wire COS (VOLDN, bit 1 by default).
+        report = self.dev.ctrl_transfer(0xA1, 0x01, 0x0100, 0, 4)
+        physical = bool(report[0] & self.input_mask) if len(report) else False
+        return apply_active_low(physical, self.input_active_low)
 
     def close(self):
-        pass
+        self.dev = None
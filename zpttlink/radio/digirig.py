@@ -1,15 +1,143 @@
-import serial
-from .base import RadioInterface
+import time
+
+from .base import (
+    Capabilities,
+    RadioConfigError,
+    RadioInterfaceBase,
+    apply_active_low,
+    arg,
+    logger,
+)
+
+
+def autodetect_serial(match_substrings):
+    from serial.tools import list_ports
+
+    ranked = []
+    for p in list_ports.comports():
+        score = 0
+        text = f"{p.device} {p.description} {p.hwid}".lower()
+        for s in match_substrings:
+            if s.lower() in text:
+                score += 1
+        ranked.append((score, p.device))
+    ranked.sort(reverse=True)
+    return ranked[0][1] if ranked else None
+
+
+class DigiRigRadio(RadioInterfaceBase):
+    name = "digirig"
+    capabilities = Capabilities(input_sensing=True, multi_line=False, latency_class="kernel")
+
+    # Modem control lines that can key the radio.
+    OUTPUT_LINES = ("dtr", "rts")
+    # Modem status lines that can carry an external PTT or COS signal.
+    INPUT_LINES = ("cts", "dsr", "cd", "ri")
+
+    def __init__(
+        self,
+        serial_port,
+        baud,
+        ptt_output="dtr",
+        active_low=False,
+        ptt_input="cts",
+        input_active_low=False,
+    ):
+        self.serial_port = serial_port
+        self.baud = baud
+        self.ptt_output = (ptt_output or "dtr").lower()
+        self.active_low = bool(active_low)
+        self.ptt_input = (ptt_input or "cts").lower()
+        self.input_active_low = bool(input_active_low)
+        if self.ptt_output not in self.OUTPUT_LINES:
+            raise RadioConfigError(
+                f"Unsupported ptt_output for DigiRig: {self.ptt_output} "
+                f"(use one of {', '.join(self.OUTPUT_LINES)})"
+            )
+        if self.ptt_input not in self.INPUT_LINES:
+            raise RadioConfigError(f"Unsupported ptt_input for DigiRig: {self.ptt_input}")
+        self.ser = None
+
+    @classmethod
+    def from_config(cls, cfg, args=None):
+        ptt_output = (arg(args, "ptt_output") or cfg.get("ptt_output") or "dtr").lower()
+
+        if arg(args, "ptt_active_low"):
+            active_low = True
+        elif arg(args, "ptt_active_high"):
+            active_low = False
+        else:
+            active_low = bool(cfg.get("ptt_active_low", False))
+
+        serial_port = arg(args, "serial") or cfg.get("com_port") or ""
+        if not serial_port:
+            serial_port = autodetect_serial(cfg.get("serial_autodetect_hints", []))
+            if not serial_port:
+                raise RadioConfigError("No serial port specified and auto-detect found none.")
+            logger.info(f"Auto-detected serial port: {serial_port}")
+
+        baud = arg(args, "baud")
+        if baud is None:
+            baud = int(cfg.get("baud", 9600))
+
+        return cls(
+            serial_port=serial_port,
+            baud=baud,
+            ptt_output=ptt_output,
+            active_low=active_low,
+            ptt_input=cfg.get("ptt_input") or "cts",
+            input_active_low=bool(cfg.get("ptt_input_active_low", False)),
+        )
 
-class DigiRigRadio(RadioInterface):
     def open(self):
-        self.ser = serial.Serial(self.config["com_port"], 9600)
+        import serial
+
+        self.ser = serial.Serial(self.serial_port, baudrate=self.baud, timeout=0)
+        try:
+            self.ser.dtr = apply_active_low(False, self.active_low)
+            self.ser.rts = apply_active_low(False, self.active_low)
+            time.sleep(0.1)
+        except Exception:
+            pass
+
+    def _set(self, logical_state, dry=False):
+        if self.ser is None:
+            raise RuntimeError("Serial port not open")
+        physical_state = apply_active_low(bool(logical_state), self.active_low)
+
+        if dry:
+            logger.debug(
+                f"[DRY] DigiRig {self.ptt_output.upper()} logical={logical_state} "
+                f"physical={physical_state} active_low={self.active_low}"
+            )
+            return
+
+        if self.ptt_output == "dtr":
+            self.ser.dtr = physical_state
+        else:
+            self.ser.rts = physical_state
+
+        logger.info(
+            f"Serial PTT {self.ptt_output.upper()} -> {'ON' if logical_state else 'OFF'} "
+            f"(physical={'HIGH' if physical_state else 'LOW'}, active_low={self.active_low})"
+        )
+
+    def ptt_on(self, dry=False):
+        self._set(True, dry=dry)
 
-    def ptt_on(self):
-        self.ser.rts = True
+    def ptt_off(self, dry=False):
+        self._set(False, dry=dry)
 
-    def ptt_off(self):
-        self.ser.rts = False
+    def get_input(self):
+        if self.ser is None:
+            raise RuntimeError("Serial port not open")
+        physical = bool(getattr(self.ser, self.ptt_input))
+        return apply_active_low(physical, self.input_active_low)
 
     def close(self):
-        self.ser.close()
+        try:
+            if self.ser is not None:
+                self.ser.close()
+        except Exception:
+            pass
+        self.ser = None
@@ -0,0 +1,93 @@
+import importlib
+
+from .base import RadioConfigError, logger
+
+ENTRY_POINT_GROUP = "zpttlink.radio_backends"
+
+# name -> "module:Class" relative to this package; imported only when selected.
+BUILTIN_BACKENDS = {
+    "digirig": ".digirig:DigiRigRadio",
+    "cm108": ".cm108:CM108Radio",
+    "signalink": ".signalink:SignalinkRadio",
+}
+
+_loaded = {}
+_entry_points = None
+
+
+def _discover():
+    """Installed third-party backends, as {name: EntryPoint}; nothing is imported."""
+    global _entry_points
+    if _entry_points is not None:
+        return _entry_points
+    found = {}
+    try:
+        from importlib import metadata
+
+        eps = metadata.entry_points()
+        if hasattr(eps, "select"):
+            group = eps.select(group=ENTRY_POINT_GROUP)
+        else:
+            group = eps.get(ENTRY_POINT_GROUP, [])
+        for ep in group:
+            name = ep.name.lower()
+            if name in BUILTIN_BACKENDS:
+                logger.warning(
+                    f"Ignoring radio backend entry point '{ep.name}' ({ep.value}): "
+                    "it would shadow the built-in backend of that name"
+                )
+                continue
+            found[name] = ep
+    except Exception as e:
+        logger.debug(f"Radio backend discovery failed: {e}")
+    _entry_points = found
+    return found
+
+
+def available_backends():
+    names = set(BUILTIN_BACKENDS)
+    names.update(_discover())
+    return sorted(names)
+
+
+def _import_target(target):
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name, package=__package__), attr)
+
+
+def register_backend(name, cls):
+    """Register a backend class directly, e.g. from an application embedding ZPTTLink."""
+    _loaded[str(name).lower()] = cls
+
+
+def load_backend(name):
+    name = str(name).lower()
+    cls = _loaded.get(name)
+    if cls is not None:
+        return cls
+
+    ep = _discover().get(name)
+    if ep is not None:
+        cls = ep.load()
+    elif name in BUILTIN_BACKENDS:
+        cls = _import_target(BUILTIN_BACKENDS[name])
+    else:
+        raise RadioConfigError(
+            f"Unknown radio_type '{name}' (available: {', '.join(available_backends())})"
+        )
+    _loaded[name] = cls
+    return cls
+
+
+def create_backend(name, cfg, args=None):
+    """Build (but do not open) backend `name`; it reports the registry name if it has none."""
+    name = str(name).lower()
+    backend = load_backend(name).from_config(cfg, args)
+    # Name the instance, not the class: a plugin class may be registered under several names.
+    if not getattr(backend, "name", None) or backend.name == "base":
+        backend.name = name
+    return backend
+
+
+def backend_capabilities(name):
+    return load_backend(name).capabilities
@@ -1,14 +1,24 @@
-from .base import RadioInterface
+from .base import Capabilities, RadioInterfaceBase, logger
+
+
+class SignalinkRadio(RadioInterfaceBase):
+    name = "signalink"
+    capabilities = Capabilities(input_sensing=False, multi_line=False, latency_class="immediate")
 
-class SignalinkRadio(RadioInterface):
     def open(self):
-        pass
+        logger.info("Signalink selected: hardware VOX/PTT expected; no software PTT control.")
 
-    def ptt_on(self):
-        pass
+    def ptt_on(self, dry=False):
+        if dry:
+            logger.debug("[DRY] Signalink PTT ON (no-op)")
+        else:
+            logger.info("Signalink PTT ON (no-op)")
 
-    def ptt_off(self):
-        pass
+    def ptt_off(self, dry=False):
+        if dry:
+            logger.debug("[DRY] Signalink PTT OFF (no-op)")
+        else:
+            logger.info("Signalink PTT OFF (no-op)")
 
     def close(self):
         pass
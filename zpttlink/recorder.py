@@ -0,0 +1,284 @@
+import logging
+import os
+import re
+import threading
+import time
+import wave
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import soundfile
+except Exception:
+    soundfile = None
+
+logger = logging.getLogger("zpttlink")
+
+SESSION_START = 1
+SESSION_END = 2
+
+RECORDING_EXTENSIONS = (".wav", ".flac")
+
+
+def safe_source_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name or "tx")).strip("_") or "tx"
+
+
+class _WavSink:
+    def __init__(self, path, samplerate, channels):
+        self.f = wave.open(path, "wb")
+        self.f.setnchannels(channels)
+        self.f.setsampwidth(2)
+        self.f.setframerate(samplerate)
+
+    def write(self, frames):
+        pcm = np.clip(frames, -1.0, 1.0)
+        self.f.writeframes((pcm * 32767.0).astype("<i2").tobytes())
+
+    def close(self):
+        self.f.close()
+
+
+class _FlacSink:
+    def __init__(self, path, samplerate, channels):
+        self.f = soundfile.SoundFile(
+            path,
+            mode="w",
+            samplerate=samplerate,
+            channels=channels,
+            format="FLAC",
+            subtype="PCM_16",
+        )
+
+    def write(self, frames):
+        self.f.write(frames)
+
+    def close(self):
+        self.f.close()
+
+
+class TxRecorder:
+    """
+    Records what was transmitted, one file per PTT session.
+
+    push() runs in the audio callback: it copies the block into a
+    preallocated ring of fixed-size slots and only moves an integer index,
+    so it never allocates buffers, takes a lock or touches the disk. A
+    background thread drains the ring into WAV/FLAC files and enforces the
+    disk quota. The quota only counts and removes this recorder's own files
+    (named <time>-<source>.<ext>), so links sharing a directory, and other
+    files kept there, are left alone. If the writer falls behind, blocks
+    are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        directory,
+        samplerate,
+        channels=1,
+        source="tx",
+        fmt="wav",
+        slot_frames=4096,
+        slots=256,
+        max_total_mb=500.0,
+        max_files=1000,
+        max_session_s=600.0,
+        metrics=None,
+    ):
+        self.directory = directory
+        self.samplerate = int(samplerate)
+        self.channels = int(channels)
+        self.source = safe_source_name(source)
+        # What _session_path() names files, so the quota touches nothing else.
+        extensions = "|".join(re.escape(ext) for ext in RECORDING_EXTENSIONS)
+        self._own_file = re.compile(
+            r"\d{8}-\d{6}\.\d{3}-" + re.escape(self.source) + f"(?:{extensions})$"
+        )
+        self.fmt = str(fmt).lower()
+        if self.fmt == "flac" and soundfile is None:
+            logger.warning("soundfile not installed; recording WAV instead of FLAC")
+            self.fmt = "wav"
+        self.slot_frames = int(slot_frames)
+        self.slots = int(slots)
+        self.max_total_bytes = int(float(max_total_mb) * 1024 * 1024) if max_total_mb else 0
+        self.max_files = int(max_files or 0)
+        self.max_session_frames = int(float(max_session_s or 0) * self.samplerate)
+        self.metrics = metrics
+
+        self._ring = np.zeros((self.slots, self.slot_frames, self.channels), dtype=np.float32)
+        self._lengths = [0] * self.slots
+        self._flags = [0] * self.slots
+
+        # Single producer (callback) owns _write, single consumer (writer) owns _read.
+        self._write = 0
+        self._read = 0
+        self._in_session = False
+        self._pending_end = False
+
+        self.blocks = 0
+        self.dropped = 0
+        self.files = 0
+
+        self._sink = None
+        self._sink_frames = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._run, name=f"recorder-{self.source}", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"TX recorder writing {self.fmt.upper()} to {self.directory}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self._close_sink()
+
+    # --- audio thread side -------------------------------------------------
+
+    def _claim(self, flag, frames):
+        if self._write - self._read >= self.slots:
+            return -1
+        slot = self._write % self.slots
+        self._flags[slot] = flag
+        self._lengths[slot] = frames
+        return slot
+
+    def _commit(self):
+        self._write += 1
+
+    def push(self, block, active):
+        """Queue a shaped (frames, channels) block; active is the current PTT state."""
+        if self._pending_end or (self._in_session and not active):
+            if self._claim(SESSION_END, 0) < 0:
+                self._pending_end = True
+                return
+            self._commit()
+            self._pending_end = False
+            self._in_session = False
+
+        if not active:
+            return
+
+        flag = 0
+        if not self._in_session:
+            self._in_session = True
+            flag = SESSION_START
+
+        total = len(block)
+        offset = 0
+        while offset < total:
+            n = min(self.slot_frames, total - offset)
+            slot = self._claim(flag, n)
+            if slot < 0:
+                if flag == SESSION_START:
+                    self._in_session = False
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.inc("recorder_dropped_blocks")
+                return
+            np.copyto(self._ring[slot, :n], block[offset:offset + n])
+            self._commit()
+            flag = 0
+            offset += n
+
+        self.blocks += 1
+        if self.metrics is not None:
+            self.metrics.inc("recorder_blocks")
+
+    # --- writer thread side ------------------------------------------------
+
+    def _session_path(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        ms = int((time.time() % 1) * 1000)
+        return os.path.join(self.directory, f"{stamp}.{ms:03d}-{self.source}.{self.fmt}")
+
+    def _open_sink(self):
+        self._close_sink()
+        path = self._session_path()
+        try:
+            sink_cls = _FlacSink if self.fmt == "flac" else _WavSink
+            self._sink = sink_cls(path, self.samplerate, self.channels)
+            self._sink_frames = 0
+            self.files += 1
+            if self.metrics is not None:
+                self.metrics.inc("recorder_files")
+            logger.debug(f"Recording TX to {path}")
+        except Exception as e:
+            self._sink = None
+            logger.error(f"Failed to open recording {path}: {e}")
+
+    def _close_sink(self):
+        if self._sink is None:
+            return
+        try:
+            self._sink.close()
+        except Exception as e:
+            logger.warning(f"Failed to close recording: {e}")
+        self._sink = None
+        self.enforce_quota()
+
+    def _drain(self):
+        while self._read < self._write:
+            slot = self._read % self.slots
+            flag = self._flags[slot]
+            n = self._lengths[slot]
+
+            if flag == SESSION_START:
+                self._open_sink()
+            if n and self._sink is not None:
+                if self.max_session_frames and self._sink_frames >= self.max_session_frames:
+                    self._open_sink()
+                try:
+                    self._sink.write(self._ring[slot, :n])
+                    self._sink_frames += n
+                except Exception as e:
+                    logger.error(f"Recording write failed: {e}")
+                    self._close_sink()
+            if flag == SESSION_END:
+                self._close_sink()
+
+            self._read += 1
+
+        if self.metrics is not None:
+            self.metrics.set("recorder_backlog", self._write - self._read)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain()
+            self._stop.wait(0.05)
+        self._drain()
+
+    def enforce_quota(self):
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not self._own_file.match(name):
+                    continue
+                path = os.path.join(self.directory, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        except Exception:
+            return
+
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        while entries and (
+            (self.max_total_bytes and total > self.max_total_bytes)
+            or (self.max_files and len(entries) > self.max_files)
+        ):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"Recording quota: removed {os.path.basename(path)}")
+            except Exception:
+                break
@@ -0,0 +1,168 @@
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import threading
+
+try:
+    from . import main as core
+except ImportError:
+    import main as core
+
+logger = logging.getLogger("zpttlink")
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+_EVENT = struct.Struct("iIII")
+
+# Editors and the GUI often write in several steps; wait for them to settle.
+SETTLE_S = 0.2
+
+
+def _inotify_fd(directory):
+    """Return an inotify fd watching directory, or None where inotify is unavailable."""
+    if not hasattr(os, "O_NONBLOCK"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = init(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+    if fd < 0:
+        return None
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    if add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class ConfigWatcher:
+    """
+    Calls on_change() from a background thread whenever the file changes.
+
+    Uses inotify on the containing directory (so atomic rename-over saves
+    are seen) and falls back to polling mtime/size where inotify is missing.
+    """
+
+    def __init__(self, path, on_change, poll_interval=1.0):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = max(float(poll_interval), 0.1)
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._stamp = self._file_stamp()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        self._fd = _inotify_fd(os.path.dirname(self.path))
+        self.mode = "inotify" if self._fd is not None else "poll"
+        target = self._run_inotify if self._fd is not None else self._run_poll
+        self._thread = threading.Thread(target=target, name="config-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for changes ({self.mode})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _fire(self):
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return
+        self._stamp = stamp
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Config reload failed: {e}")
+
+    def _run_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self._fire()
+
+    def _read_events(self):
+        name = os.path.basename(self.path)
+        hit = False
+        try:
+            buf = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            _, _, _, length = _EVENT.unpack_from(buf, offset)
+            raw = buf[offset + _EVENT.size:offset + _EVENT.size + length]
+            if raw.rstrip(b"\0").decode(errors="replace") == name:
+                hit = True
+            offset += _EVENT.size + length
+        return hit
+
+    def _run_inotify(self):
+        pending = False
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], SETTLE_S if pending else 0.5)
+            if ready:
+                if self._read_events():
+                    pending = True
+            elif pending:
+                pending = False
+                self._fire()
+
+
+class LiveConfig:
+    """
+    The running config of this process.
+
+    Changes arrive from the config file or the control channel; each is
+    merged over the defaults and handed to apply(cfg), which only swaps
+    parameter snapshots, so the stream keeps running.
+    """
+
+    def __init__(self, path, cfg, apply):
+        self.path = path
+        self.cfg = cfg
+        self.apply = apply
+        self.lock = threading.Lock()
+
+    def reload(self):
+        # Unlike load_config(), a broken file keeps the current settings.
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring config change, cannot read '{self.path}': {e}")
+            return False
+        self._apply(core.merge_defaults(core.DEFAULT_CONFIG, data))
+        return True
+
+    def update(self, values):
+        if not isinstance(values, dict):
+            raise RuntimeError("config update must be an object")
+        with self.lock:
+            cfg = core.merge_defaults(self.cfg, values)
+        self._apply(cfg)
+
+    def _apply(self, cfg):
+        with self.lock:
+            self.cfg = cfg
+            self.apply(cfg)
@@ -0,0 +1,382 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import soundfile
+except Exception:
+    soundfile = None
+
+try:
+    from .dsp import (
+        AGC_SETTINGS,
+        AudioGate,
+        LookaheadAgc,
+        NoiseFloorEstimator,
+        SpectralGate,
+        TruePeakLimiter,
+        sanitize_audio,
+    )
+except ImportError:
+    from dsp import (
+        AGC_SETTINGS,
+        AudioGate,
+        LookaheadAgc,
+        NoiseFloorEstimator,
+        SpectralGate,
+        TruePeakLimiter,
+        sanitize_audio,
+    )
+
+VOX_KEYS = ("threshold", "attack_ms", "release_ms", "hang_ms")
+
+
+def read_audio(path):
+    """Return (float32 array of shape (frames, channels), samplerate)."""
+    if soundfile is not None and not path.lower().endswith(".wav"):
+        data, sr = soundfile.read(path, dtype="float32", always_2d=True)
+        return data, int(sr)
+
+    with wave.open(path, "rb") as w:
+        sr = w.getframerate()
+        channels = w.getnchannels()
+        width = w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise RuntimeError(f"Unsupported WAV sample width: {width}")
+    return data.reshape(-1, channels), sr
+
+
+def write_wav(path, data, samplerate):
+    pcm = np.clip(np.asarray(data, dtype=np.float32), -1.0, 1.0)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(pcm.shape[1] if pcm.ndim == 2 else 1)
+        w.setsampwidth(2)
+        w.setframerate(int(samplerate))
+        w.writeframes((pcm * 32767.0).astype("<i2").tobytes())
+
+
+def read_labels(path):
+    """Audacity label track: start<TAB>end[<TAB>text] in seconds, one speech segment per line."""
+    segments = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split("\t")
+            if len(parts) < 2 or line.startswith("\\"):
+                continue
+            try:
+                start, end = float(parts[0]), float(parts[1])
+            except ValueError:
+                continue
+            if end > start:
+                segments.append((start, end))
+    return sorted(segments)
+
+
+def block_levels(data, blocksize):
+    """RMS per block exactly as the runtime computes it, vectorized over the whole file."""
+    frames = (len(data) // blocksize) * blocksize
+    blocks = data[:frames].reshape(-1, blocksize * data.shape[1])
+    return np.sqrt(np.mean(np.square(blocks), axis=1))
+
+
+def build_gate(vox, adaptive=None):
+    adaptive = adaptive or {}
+    return AudioGate(
+        threshold=vox["threshold"],
+        attack_ms=vox["attack_ms"],
+        release_ms=vox["release_ms"],
+        hang_ms=vox["hang_ms"],
+        noise_floor=NoiseFloorEstimator(
+            window_s=float(adaptive.get("window_s", 5.0)),
+        ) if adaptive.get("enabled") else None,
+        open_ratio=float(adaptive.get("open_ratio", 3.0)),
+        close_ratio=float(adaptive.get("close_ratio", 1.5)),
+        max_threshold=float(adaptive.get("max_threshold", 0.25)),
+    )
+
+
+def run_gate(levels, block_s, vox, adaptive=None):
+    """Replay block levels through AudioGate on a simulated clock; return PTT sessions (s)."""
+    gate = build_gate(vox, adaptive)
+    sessions = []
+    started = None
+    for i, level in enumerate(levels.tolist()):
+        # The runtime evaluates the gate at the end of each callback.
+        now = (i + 1) * block_s
+        action = gate.process(level, now=now)
+        if action == "start":
+            started = now
+        elif action == "stop" and started is not None:
+            sessions.append((started, now))
+            started = None
+    if started is not None:
+        sessions.append((started, len(levels) * block_s))
+    return sessions
+
+
+def score(sessions, duration, segments=None, tolerance_s=0.0):
+    on_time = sum(end - start for start, end in sessions)
+    result = {
+        "keys": len(sessions),
+        "duty_cycle": (on_time / duration) if duration > 0 else 0.0,
+        "false_keys": None,
+        "clipped": None,
+        "missed": None,
+    }
+    if segments is None:
+        return result
+
+    def overlaps(a, b):
+        return a[0] < b[1] and b[0] < a[1]
+
+    result["false_keys"] = sum(1 for s in sessions if not any(overlaps(s, seg) for seg in segments))
+    clipped = missed = 0
+    for seg in segments:
+        covering = [s for s in sessions if overlaps(s, seg)]
+        if not covering:
+            missed += 1
+        elif not any(s[0] <= seg[0] + tolerance_s for s in covering):
+            clipped += 1
+    result["clipped"] = clipped
+    result["missed"] = missed
+    return result
+
+
+def evaluate(job):
+    vox, files, tolerance_s, adaptive = job
+    totals = {"keys": 0, "on_s": 0.0, "duration_s": 0.0}
+    totals.update(false_keys=None, clipped=None, missed=None)
+    for levels, block_s, segments in files:
+        duration = len(levels) * block_s
+        sessions = run_gate(levels, block_s, vox, adaptive)
+        r = score(sessions, duration, segments, tolerance_s)
+        totals["keys"] += r["keys"]
+        totals["on_s"] += r["duty_cycle"] * duration
+        totals["duration_s"] += duration
+        for key in ("false_keys", "clipped", "missed"):
+            if r[key] is not None:
+                totals[key] = (totals[key] or 0) + r[key]
+    totals["duty_cycle"] = totals["on_s"] / totals["duration_s"] if totals["duration_s"] else 0.0
+    return dict(vox, **totals)
+
+
+def denoise_file(data, sr, blocksize, denoise):
+    """Run the file through the TX spectral gate block by block; returns mono (frames, 1)."""
+    gate = SpectralGate(
+        sr,
+        frame_ms=float(denoise.get("frame_ms", 10.0)),
+        blocksize=blocksize,
+        reduction_db=float(denoise.get("reduction_db", 18.0)),
+        threshold=float(denoise.get("threshold", 3.0)),
+        learn_s=float(denoise.get("learn_s", 2.0)),
+        budget=0.0,
+    )
+    mono = data.mean(axis=1, dtype=np.float32)
+    out = np.zeros((len(mono), 1), dtype=np.float32)
+    for start in range(0, len(mono), blocksize):
+        block = mono[start:start + blocksize]
+        out[start:start + len(block), 0] = gate.process(block)
+    return out
+
+
+def shape_file(data, blocksize, audio, sr):
+    agc_cfg = audio.get("agc") or {}
+    agc = None
+    if agc_cfg.get("enabled"):
+        agc = LookaheadAgc(sr, **{k: float(agc_cfg[k]) for k in AGC_SETTINGS if k in agc_cfg})
+    limiter = audio.get("limiter", "tanh")
+    if limiter == "truepeak":
+        limiter = TruePeakLimiter(sr)
+    out = np.zeros((len(data), 1), dtype=np.float32)
+    for start in range(0, len(data), blocksize):
+        block = data[start:start + blocksize]
+        out[start:start + len(block)] = sanitize_audio(
+            block,
+            tx_gain=audio["tx_gain"],
+            limit=audio["limit"],
+            dc_block=audio["dc_block"],
+            agc=agc,
+            limiter=limiter,
+        )
+    return out
+
+
+def parse_grid(value, cast):
+    return [cast(v) for v in str(value).split(",") if v.strip()]
+
+
+def load_settings(path):
+    """VOX, audio, adaptive and denoise settings exactly as the runtime derives them from path."""
+    try:
+        from . import main as runtime
+        from .txchain import tx_preroll_ms
+    except ImportError:
+        import main as runtime
+        from txchain import tx_preroll_ms
+    if path and os.path.exists(path):
+        cfg = runtime.load_config(path)
+    else:
+        cfg = runtime.merge_defaults(runtime.DEFAULT_CONFIG, {})
+    p = runtime.tx_params(cfg, runtime.build_arg_parser().parse_args([]))
+    vox = {
+        "threshold": p.vox_threshold,
+        "attack_ms": p.vox_attack_ms,
+        "release_ms": p.vox_release_ms,
+        "hang_ms": p.vox_hang_ms,
+        "preroll_ms": tx_preroll_ms(cfg),
+    }
+    audio = {
+        "tx_gain": p.tx_gain,
+        "limit": p.limit,
+        "dc_block": p.dc_block,
+        "limiter": p.limiter,
+        "agc": cfg.get("agc"),
+    }
+    return vox, audio, dict(cfg["vox"]["adaptive"]), dict(cfg["denoise"])
+
+
+def fmt_opt(value):
+    return "-" if value is None else str(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="zpttlink replay",
+        description="Run recorded audio through the TX pipeline offline and score VOX settings.",
+    )
+    parser.add_argument("files", nargs="+", help="WAV files (other formats need soundfile)")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--blocksize", type=int, default=960, help="Frames per simulated callback")
+    parser.add_argument("--labels", nargs="*", default=None,
+                        help="Audacity label files marking real speech, one per input file")
+    parser.add_argument("--threshold", help="Comma-separated values to sweep")
+    parser.add_argument("--attack-ms", help="Comma-separated values to sweep")
+    parser.add_argument("--release-ms", help="Comma-separated values to sweep")
+    parser.add_argument("--hang-ms", help="Comma-separated values to sweep")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Use the adaptive noise-floor VOX (vox.adaptive settings)")
+    parser.add_argument("--denoise", action="store_true",
+                        help="Spectral-gate the input first, as with denoise.enabled")
+    parser.add_argument("--clip-tolerance-ms", type=float, default=None,
+                        help="Speech may start this long before PTT without counting as clipped "
+                             "(default: one block; vox.preroll_ms is added)")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: all cores)")
+    parser.add_argument("--timeline", action="store_true",
+                        help="Print the PTT timeline (single setting)")
+    parser.add_argument("--output", help="Write shaped TX audio of the first file to this WAV")
+    parser.add_argument("--json", help="Write results as JSON")
+    return parser
+
+
+def main(argv=None):
+    if np is None:
+        print("numpy is required for replay")
+        return 5
+
+    args = build_parser().parse_args(argv)
+    base_vox, audio, adaptive, denoise = load_settings(args.config)
+    adaptive["enabled"] = bool(args.adaptive or adaptive.get("enabled", False))
+    denoise["enabled"] = bool(args.denoise or denoise.get("enabled", False))
+
+    if args.labels is not None and len(args.labels) != len(args.files):
+        print("--labels needs one label file per input file")
+        return 2
+
+    started = time.perf_counter()
+    prepared = []
+    audio_s = 0.0
+    for i, path in enumerate(args.files):
+        data, sr = read_audio(path)
+        if denoise["enabled"]:
+            data = denoise_file(data, sr, args.blocksize, denoise)
+        levels = block_levels(data, args.blocksize)
+        block_s = args.blocksize / float(sr)
+        segments = read_labels(args.labels[i]) if args.labels else None
+        prepared.append((levels, block_s, segments))
+        audio_s += len(levels) * block_s
+
+        if args.output and i == 0:
+            write_wav(args.output, shape_file(data, args.blocksize, audio, sr), sr)
+            print(f"Shaped TX audio written to {args.output}")
+
+    casts = {"threshold": float, "attack_ms": int, "release_ms": int, "hang_ms": int}
+    grid = {}
+    for key in VOX_KEYS:
+        value = getattr(args, key)
+        grid[key] = parse_grid(value, casts[key]) if value else [base_vox[key]]
+    combos = itertools.product(*(grid[k] for k in VOX_KEYS))
+    settings = [dict(zip(VOX_KEYS, combo)) for combo in combos]
+    if args.clip_tolerance_ms is None:
+        tolerance_s = max(block_s for _, block_s, _ in prepared)
+    else:
+        tolerance_s = args.clip_tolerance_ms / 1000.0
+    # Pre-roll delays the audio behind PTT, so speech that far ahead of it still airs whole.
+    tolerance_s += base_vox["preroll_ms"] / 1000.0
+    jobs = [(vox, prepared, tolerance_s, adaptive) for vox in settings]
+
+    if args.timeline and len(settings) == 1:
+        for path, (levels, block_s, _) in zip(args.files, prepared):
+            print(f"# {path}")
+            for start, end in run_gate(levels, block_s, settings[0], adaptive):
+                print(f"{start:10.3f}  {end:10.3f}  ({(end - start) * 1000.0:.0f} ms)")
+
+    if len(jobs) == 1:
+        results = [evaluate(jobs[0])]
+    else:
+        workers = args.jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(evaluate, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda r: (
+        r["missed"] or 0,
+        (r["false_keys"] or 0) + (r["clipped"] or 0),
+        r["duty_cycle"],
+    ))
+
+    print(f"{'threshold':>10} {'attack':>7} {'release':>8} {'hang':>6} {'keys':>6} "
+          f"{'false':>6} {'clipped':>8} {'missed':>7} {'duty':>7}")
+    for r in results:
+        print(
+            f"{r['threshold']:>10.4f} {r['attack_ms']:>7} {r['release_ms']:>8} {r['hang_ms']:>6} "
+            f"{r['keys']:>6} {fmt_opt(r['false_keys']):>6} {fmt_opt(r['clipped']):>8} "
+            f"{fmt_opt(r['missed']):>7} {r['duty_cycle'] * 100.0:>6.1f}%"
+        )
+    speed = (audio_s * len(settings)) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{len(settings)} setting(s) over {audio_s:.1f}s of audio in {elapsed:.2f}s "
+        f"({speed:.0f}x realtime)"
+    )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import threading
+import time
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+logger = logging.getLogger("zpttlink")
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+GC_MODES = ("freeze", "disable", "off")
+
+# Process-wide state shared by every RealtimeMode in the process.
+_lock = threading.Lock()
+_users = 0
+_memory_locked = False
+_gc_was_enabled = True
+
+
+def _libc():
+    return ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+
+
+def set_fifo(priority):
+    """Run the calling thread under SCHED_FIFO at priority (Linux: per thread)."""
+    if not hasattr(os, "sched_setscheduler"):
+        raise RuntimeError("SCHED_FIFO is not supported on this platform")
+    os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(priority)))
+
+
+def pin_thread(cores):
+    """Restrict the calling thread to cores (Linux: per thread)."""
+    if not hasattr(os, "sched_setaffinity"):
+        raise RuntimeError("CPU affinity is not supported on this platform")
+    os.sched_setaffinity(0, {int(c) for c in cores})
+
+
+def lock_memory():
+    """
+    mlockall() the process so the audio path never takes a page fault.
+    Future mappings are locked too only when RLIMIT_MEMLOCK is unlimited;
+    otherwise a later numpy allocation could fail outright.
+    """
+    flags = MCL_CURRENT
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_MEMLOCK)
+        if soft == resource.RLIM_INFINITY:
+            flags |= MCL_FUTURE
+    libc = _libc()
+    if libc.mlockall(flags) != 0:
+        raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    return flags
+
+
+def unlock_memory():
+    _libc().munlockall()
+
+
+class RealtimeMode:
+    """
+    Opt-in realtime scheduling for the audio and PTT threads.
+
+    enter() applies the process-wide part: memory is locked and the objects
+    alive at stream start are moved out of the garbage collector's reach
+    (gc.freeze), so collections stay short. With gc "disable" automatic
+    collection is off entirely and tick() collects from the supervisor
+    loop instead, away from the audio callback. promote(role) is called on
+    the thread itself ("audio" from the first callback, "ptt" on the timer
+    wheel) and switches it to SCHED_FIFO, pinned to cores if set.
+
+    Needs rtprio and memlock limits (e.g. "@audio - rtprio 95" and
+    "@audio - memlock unlimited" in /etc/security/limits.d) or
+    CAP_SYS_NICE/CAP_IPC_LOCK; anything refused is logged and skipped.
+    """
+
+    def __init__(
+        self,
+        priority=70,
+        ptt_priority=60,
+        cores=None,
+        lock_memory=True,
+        gc_mode="freeze",
+        gc_interval_s=10.0,
+        label="",
+    ):
+        self.priorities = {"audio": int(priority), "ptt": int(ptt_priority)}
+        self.cores = [int(c) for c in cores] if cores else None
+        self.lock_memory = bool(lock_memory)
+        self.gc_mode = gc_mode if gc_mode in GC_MODES else "freeze"
+        if gc_mode not in GC_MODES:
+            logger.warning(
+                f"{label}Unknown realtime.gc '{gc_mode}' (choose from {', '.join(GC_MODES)}); "
+                "using freeze"
+            )
+        self.gc_interval_s = max(float(gc_interval_s), 1.0)
+        self.label = label
+        self.entered = False
+        self.threads = {}
+        self._collected_at = 0.0
+
+    @classmethod
+    def from_config(cls, cfg, label=""):
+        return cls(
+            priority=cfg.get("priority", 70),
+            ptt_priority=cfg.get("ptt_priority", 60),
+            cores=cfg.get("cores"),
+            lock_memory=cfg.get("lock_memory", True),
+            gc_mode=cfg.get("gc", "freeze"),
+            gc_interval_s=cfg.get("gc_interval_s", 10.0),
+            label=label,
+        )
+
+    def enter(self):
+        global _users, _memory_locked, _gc_was_enabled
+        if self.entered:
+            return
+        self.entered = True
+        with _lock:
+            _users += 1
+            if _users > 1:
+                return
+            if self.lock_memory and not _memory_locked:
+                try:
+                    flags = lock_memory()
+                    _memory_locked = True
+                    scope = "current and future" if flags & MCL_FUTURE else "current"
+                    logger.info(f"{self.label}Realtime: locked {scope} memory")
+                except Exception as e:
+                    logger.warning(f"{self.label}Realtime: mlockall failed: {e}")
+            if self.gc_mode != "off":
+                _gc_was_enabled = gc.isenabled()
+                gc.collect()
+                gc.freeze()
+                if self.gc_mode == "disable":
+                    gc.disable()
+                logger.info(
+                    f"{self.label}Realtime: {gc.get_freeze_count()} objects frozen, "
+                    f"automatic GC {'off' if self.gc_mode == 'disable' else 'on'}"
+                )
+
+    def leave(self):
+        global _users, _memory_locked
+        if not self.entered:
+            return
+        self.entered = False
+        with _lock:
+            _users -= 1
+            if _users > 0:
+                return
+            if self.gc_mode != "off":
+                gc.unfreeze()
+                if _gc_was_enabled:
+                    gc.enable()
+            if _memory_locked:
+                try:
+                    unlock_memory()
+                except Exception:
+                    pass
+                _memory_locked = False
+
+    def promote(self, role):
+        """Apply priority and affinity to the calling thread; never raises."""
+        result = {"thread": threading.current_thread().name, "fifo": False, "pinned": False}
+        try:
+            set_fifo(self.priorities[role])
+            result["fifo"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        if self.cores:
+            try:
+                pin_thread(self.cores)
+                result["pinned"] = True
+            except Exception as e:
+                result["error"] = str(e)
+        first = role not in self.threads
+        self.threads[role] = result
+        if first:
+            if "error" in result:
+                logger.warning(f"{self.label}Realtime: {role} thread not fully promoted: "
+                               f"{result['error']}")
+            else:
+                pinned = f", cores {self.cores}" if result["pinned"] else ""
+                logger.info(
+                    f"{self.label}Realtime: {role} thread SCHED_FIFO "
+                    f"{self.priorities[role]}{pinned}"
+                )
+        return "error" not in result
+
+    def tick(self, now=None):
+        """With automatic GC off, collect from the (non-realtime) caller now and then."""
+        if not self.entered or self.gc_mode != "disable":
+            return
+        now = time.monotonic() if now is None else now
+        if now - self._collected_at >= self.gc_interval_s:
+            self._collected_at = now
+            gc.collect()
+
+    def report(self):
+        return {
+            "entered": self.entered,
+            "memory_locked": _memory_locked,
+            "gc": self.gc_mode,
+            "threads": dict(self.threads),
+        }
@@ -0,0 +1,312 @@
+import math
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# EIA standard CTCSS tones, Hz.
+CTCSS_TONES = (
+    67.0, 69.3, 71.9, 74.4, 77.0, 79.7, 82.5, 85.4, 88.5, 91.5,
+    94.8, 97.4, 100.0, 103.5, 107.2, 110.9, 114.8, 118.8, 123.0, 127.3,
+    131.8, 136.5, 141.3, 146.2, 151.4, 156.7, 159.8, 162.2, 165.5, 167.9,
+    171.3, 173.8, 177.3, 179.9, 183.5, 186.2, 189.9, 192.8, 196.6, 199.5,
+    203.5, 206.5, 210.7, 218.1, 225.7, 229.1, 233.6, 241.8, 250.3, 254.1,
+)
+
+# Standard DCS codes (octal).
+DCS_CODES = (
+    "023", "025", "026", "031", "032", "036", "043", "047", "051", "053",
+    "054", "065", "071", "072", "073", "074", "114", "115", "116", "122",
+    "125", "131", "132", "134", "143", "145", "152", "155", "156", "162",
+    "165", "172", "174", "205", "212", "223", "225", "226", "243", "244",
+    "245", "246", "251", "252", "255", "261", "263", "265", "266", "271",
+    "274", "306", "311", "315", "325", "331", "332", "343", "346", "351",
+    "356", "364", "365", "371", "411", "412", "413", "423", "431", "432",
+    "445", "446", "452", "454", "455", "462", "464", "465", "466", "503",
+    "506", "516", "523", "526", "532", "546", "565", "606", "612", "624",
+    "627", "631", "632", "654", "662", "664", "703", "712", "723", "731",
+    "732", "734", "743", "754",
+)
+
+DCS_BAUD = 134.4
+DCS_MASK = (1 << 23) - 1
+
+SQUELCH_MODES = ("off", "ctcss", "dcs")
+
+
+def dcs_codeword(code, inverted=False):
+    """
+    23-bit DCS word for an octal code, bit 0 sent first: the 9 code bits,
+    the fixed 100, then 11 Golay (23,12) check bits.
+    """
+    data = 0x800 | int(str(code), 8)
+    word = data
+    for _ in range(12):
+        word <<= 1
+        if word & 0x1000:
+            word ^= 0x08EA
+    word = data | ((word & 0x0FFE) << 11)
+    return word ^ DCS_MASK if inverted else word
+
+
+def dcs_bits(code, inverted=False):
+    word = dcs_codeword(code, inverted)
+    return [(word >> i) & 1 for i in range(23)]
+
+
+class Decimator:
+    """
+    Low-pass FIR and integer decimation in one step: only the kept output
+    samples are computed, one matrix-vector product per block. The Kaiser
+    filter passes up to cutoff and stops above out_rate - cutoff, so
+    nothing aliases below cutoff (voice at 700-1000 Hz would otherwise
+    fold onto the CTCSS band). Buffers are reused and only grow when a
+    larger block arrives.
+    """
+
+    def __init__(self, samplerate, factor, cutoff=300.0):
+        self.factor = max(int(factor), 1)
+        out_rate = samplerate / float(self.factor)
+        transition = max(out_rate - 2.0 * cutoff, 50.0)
+        n = int(4.4 * samplerate / transition) | 1
+        k = np.arange(n) - (n - 1) / 2.0
+        # Transition band centred on out_rate / 2: flat to cutoff, stopped from out_rate - cutoff.
+        h = np.sinc(k / self.factor) * np.kaiser(n, 6.0)
+        self.taps = (h / h.sum()).astype(np.float32)
+        self.history = n - 1
+        self.work = np.zeros(self.history, dtype=np.float32)
+        self.offset = 0
+
+    def process(self, x):
+        n = len(self.taps)
+        h = self.history
+        total = h + len(x)
+        if len(self.work) < total:
+            work = np.zeros(total + 4096, dtype=np.float32)
+            work[:h] = self.work[:h]
+            self.work = work
+        work = self.work
+        work[h:total] = x
+        f = self.factor
+        if total - n >= self.offset:
+            m = (total - n - self.offset) // f + 1
+            # Row i is the n samples behind output i: a strided view, nothing copied.
+            step = work.itemsize
+            windows = np.ndarray(
+                (m, n), work.dtype, work, self.offset * step, (f * step, step)
+            )
+            # np.dot, not @: matmul takes a slow path on overlapping strided rows.
+            y = np.dot(windows, self.taps)
+        else:
+            m = 0
+            y = work[:0]
+        self.offset += m * f - (total - h)
+        work[:h] = work[total - h:total]
+        return y
+
+
+class SquelchDecoder:
+    """Shared hold logic: open on a detection, close after hold_ms without one."""
+
+    def __init__(self, rate, hold_ms):
+        self.rate = float(rate)
+        self.hold = max(int(round(hold_ms * self.rate / 1000.0)), 1)
+        self.open = False
+        self._missed = self.hold
+
+    def _update(self, detected, samples):
+        if detected:
+            self._missed = 0
+            self.open = True
+        else:
+            self._missed += samples
+            if self._missed >= self.hold:
+                self.open = False
+
+
+class CtcssDecoder(SquelchDecoder):
+    """
+    Opens only on one CTCSS tone.
+
+    The input is decimated to rate and a window_ms Hann window of it is
+    run through a Goertzel bank covering every standard tone. The bank is
+    evaluated in direct form as one matrix product per block, so the cost
+    hardly depends on the number of tones. A block counts as a detection
+    when the wanted tone is above min_level (peak amplitude), is the
+    strongest of its two neighbours on either side and carries at least
+    threshold of their combined energy. Judging it against its neighbours
+    only keeps a voice fundamental elsewhere in the band from masking it.
+    The closest tones are 2.4 Hz apart, so windows much shorter than
+    400 ms confuse them.
+    """
+
+    def __init__(
+        self, samplerate, tone_hz, rate=1000, window_ms=400, threshold=0.45,
+        min_level=0.003, hold_ms=250,
+    ):
+        factor = max(int(round(samplerate / float(rate))), 1)
+        super().__init__(samplerate / float(factor), hold_ms)
+        self.decimator = Decimator(samplerate, factor)
+        self.tones = np.array(CTCSS_TONES, dtype=np.float64)
+        self.index = int(np.argmin(np.abs(self.tones - float(tone_hz))))
+        self.tone_hz = float(self.tones[self.index])
+        self.threshold = float(threshold)
+        self.min_level = float(min_level)
+
+        n = max(int(self.rate * window_ms / 1000.0), 32)
+        self.n = n
+        w = np.hanning(n)
+        t = np.arange(n) / self.rate
+        self.bank = (w[:, None] * np.exp(-2j * np.pi * t[:, None] * self.tones[None, :])).astype(
+            np.complex64
+        )
+        self.w_sum = float(w.sum())
+        self.near = slice(max(self.index - 2, 0), self.index + 3)
+        # Every sample is stored twice, so the last n are always one contiguous slice.
+        self.ring = np.zeros(2 * n, dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+        self.powers = np.zeros(len(self.tones), dtype=np.float32)
+        self.score = 0.0
+        self.level = 0.0
+
+    def _push(self, y):
+        n = self.n
+        k = len(y)
+        if k >= n:
+            self.ring[:n] = y[k - n:]
+            self.ring[n:] = y[k - n:]
+            self.pos = 0
+        else:
+            a = min(k, n - self.pos)
+            self.ring[self.pos:self.pos + a] = y[:a]
+            self.ring[self.pos + n:self.pos + n + a] = y[:a]
+            if a < k:
+                self.ring[:k - a] = y[a:]
+                self.ring[n:n + k - a] = y[a:]
+            self.pos = (self.pos + k) % n
+        self.filled = min(self.filled + k, n)
+
+    def process(self, x):
+        y = self.decimator.process(x)
+        if len(y) == 0:
+            return self.open
+        self._push(y)
+        if self.filled < self.n:
+            return self.open
+        window = self.ring[self.pos:self.pos + self.n]
+        spectrum = window @ self.bank
+        np.square(np.abs(spectrum), out=self.powers)
+        near = self.powers[self.near]
+        power = float(self.powers[self.index])
+        self.score = power / (float(near.sum()) + 1e-20)
+        self.level = 2.0 * math.sqrt(power) / self.w_sum
+        detected = (
+            power >= float(near.max()) and self.score >= self.threshold
+            and self.level >= self.min_level
+        )
+        self._update(detected, len(y))
+        return self.open
+
+
+class DcsDecoder(SquelchDecoder):
+    """
+    Opens only on one DCS code.
+
+    The input is decimated to rate and run through a linear-phase FIR
+    low-pass that is flat to 120 Hz and 60 dB down from 180 Hz: DCS at
+    134.4 baud keeps its main lobe, while voice (even when the radio does
+    not high-pass it first) is removed before it can flip bits. The result
+    is sliced around its running mean and a bit clock locked to the
+    transitions samples each bit at its centre. The last 23 bits are
+    checked against every rotation of the code word, since the word
+    repeats continuously and decoding may start anywhere in it. One full
+    word of matching bits opens the squelch. With inverted, the complement
+    word (the "I" polarity, or a receiver that inverts audio) is expected
+    instead.
+    """
+
+    def __init__(self, samplerate, code, inverted=False, rate=1000, hold_ms=250):
+        factor = max(int(round(samplerate / float(rate))), 1)
+        super().__init__(samplerate / float(factor), hold_ms)
+        self.decimator = Decimator(samplerate, factor)
+        self.code = str(code).zfill(3)
+        self.inverted = bool(inverted)
+        word = dcs_codeword(self.code, self.inverted)
+        self.words = {((word >> r) | (word << (23 - r))) & DCS_MASK for r in range(23)}
+        self.spb = self.rate / DCS_BAUD
+        # Kaiser window for 60 dB over the 120-180 Hz transition.
+        beta = 5.65
+        n = int(math.ceil(52.0 / (2.285 * 2.0 * math.pi * 60.0 / self.rate))) | 1
+        k = np.arange(n) - (n - 1) / 2.0
+        h = np.sinc(2.0 * 150.0 / self.rate * k) * np.kaiser(n, beta)
+        self.taps = (h / h.sum()).astype(np.float32)
+        self.history = np.zeros(n - 1, dtype=np.float32)
+        # The slicer reference tracks the mean over ~20 bits.
+        self.b = 1.0 / (20.0 * self.spb)
+        self.mean = 0.0
+        self.last = 0
+        self.phase = 0.0
+        self.reg = 0
+        self.matched = 0
+
+    def process(self, x):
+        y = self.decimator.process(x)
+        if len(y) == 0:
+            return self.open
+        work = np.concatenate((self.history, y))
+        self.history = work[len(y):]
+        filtered = np.convolve(work, self.taps, mode="valid")
+        b, spb = self.b, self.spb
+        half = spb / 2.0
+        mean, last, phase = self.mean, self.last, self.phase
+        detected = False
+        for lp in filtered.tolist():
+            mean += b * (lp - mean)
+            bit = 1 if lp > mean else 0
+            if bit != last:
+                # A transition marks a bit boundary (phase 0); pull halfway towards it.
+                phase -= 0.5 * (phase if phase < half else phase - spb)
+                last = bit
+            before = phase
+            phase += 1.0
+            if before < half <= phase:
+                self.reg = (self.reg >> 1) | (bit << 22)
+                if self.reg in self.words:
+                    self.matched += 1
+                    if self.matched >= 23:
+                        detected = True
+                else:
+                    self.matched = 0
+            if phase >= spb:
+                phase -= spb
+        self.mean, self.last, self.phase = mean, last, phase
+        self._update(detected, len(y))
+        return self.open
+
+
+def build_squelch(cfg, samplerate):
+    """Decoder for the "squelch" config section, or None when it is off."""
+    mode = str(cfg.get("mode", "off") or "off").lower()
+    if mode == "off":
+        return None
+    rate = cfg.get("rate", 1000)
+    hold_ms = cfg.get("hold_ms", 250)
+    if mode == "ctcss":
+        tone = float(cfg.get("ctcss_hz", 100.0))
+        if min(abs(t - tone) for t in CTCSS_TONES) > 0.5:
+            raise RuntimeError(f"squelch.ctcss_hz {tone} is not a standard CTCSS tone")
+        return CtcssDecoder(
+            samplerate, tone, rate=rate, window_ms=cfg.get("window_ms", 400),
+            threshold=cfg.get("threshold", 0.45), min_level=cfg.get("min_level", 0.003),
+            hold_ms=hold_ms,
+        )
+    if mode == "dcs":
+        code = str(cfg.get("dcs_code", "023")).zfill(3)
+        if code not in DCS_CODES:
+            raise RuntimeError(f"squelch.dcs_code {code} is not a standard DCS code")
+        return DcsDecoder(
+            samplerate, code, inverted=cfg.get("dcs_inverted", False), rate=rate, hold_ms=hold_ms
+        )
+    raise RuntimeError(f"Unknown squelch.mode '{mode}' (choose from {', '.join(SQUELCH_MODES)})")
@@ -0,0 +1,430 @@
+import logging
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from .clips import build_clips
+    from .dsp import (
+        AGC_SETTINGS,
+        AudioGate,
+        DelayLine,
+        LookaheadAgc,
+        NoiseFloorEstimator,
+        SpectralGate,
+        TruePeakLimiter,
+        rms_level,
+        rms_levels,
+        sanitize_audio,
+        sanitize_channels,
+        zero_out,
+    )
+    from .dtmf import MUTE_LOOKAHEAD_MS, build_dtmf
+    from .squelch import build_squelch
+except ImportError:
+    from clips import build_clips
+    from dsp import (
+        AGC_SETTINGS,
+        AudioGate,
+        DelayLine,
+        LookaheadAgc,
+        NoiseFloorEstimator,
+        SpectralGate,
+        TruePeakLimiter,
+        rms_level,
+        rms_levels,
+        sanitize_audio,
+        sanitize_channels,
+        zero_out,
+    )
+    from dtmf import MUTE_LOOKAHEAD_MS, build_dtmf
+    from squelch import build_squelch
+
+logger = logging.getLogger("zpttlink")
+
+# Everything the callback needs to shape audio and run VOX. Instances are never
+# mutated: a reload builds a new one and swaps the reference.
+TxParams = namedtuple("TxParams", [
+    "tx_gain",
+    "limit",
+    "limiter",
+    "dc_block",
+    "vox_enabled",
+    "vox_threshold",
+    "vox_attack_ms",
+    "vox_release_ms",
+    "vox_hang_ms",
+    "vox_log_levels",
+    "vox_adaptive",
+    "open_ratio",
+    "close_ratio",
+    "max_threshold",
+    "window_s",
+    "denoise_enabled",
+    "denoise_frame_ms",
+    "denoise_reduction_db",
+    "denoise_threshold",
+    "denoise_learn_s",
+    "denoise_budget",
+    "agc_enabled",
+    "agc",
+])
+DENOISE_FIELDS = tuple(f for f in TxParams._fields if f.startswith("denoise_"))
+
+
+def tx_preroll_ms(cfg):
+    """TX delay-line length: vox.preroll_ms, raised to the DTMF mute lookahead when that is on."""
+    preroll_ms = max(float(cfg.get("vox", {}).get("preroll_ms", 0) or 0), 0.0)
+    dtmf_cfg = cfg.get("dtmf", {})
+    if dtmf_cfg.get("enabled", False) and dtmf_cfg.get("mute", True):
+        # The delay line is the lookahead that lets a digit be muted from its start.
+        preroll_ms = max(preroll_ms, MUTE_LOOKAHEAD_MS)
+    return preroll_ms
+
+
+class TxChain:
+    """
+    The TX audio path of one radio, run by the audio thread block by block.
+
+    Squelch and DTMF detection see the raw input; it is then denoised, gained,
+    levelled by the AGC, limited, delayed by the pre-roll and DTMF-muted. The
+    VOX gate and clips live here too, but keying PTT for them is left to the
+    owner. actions are the DTMF command names the owner can run.
+    """
+
+    def __init__(self, cfg, params, name=None, actions=()):
+        self.cfg = cfg
+        self.name = name
+        self.label = f"[{name}] " if name else ""
+        self.actions = tuple(actions)
+
+        # params is the latest snapshot (any thread may swap it); active_params
+        # is the one the audio thread has adopted, see sync_params().
+        self.params = params
+        self.active_params = params
+        self._gain = params.tx_gain
+        self._last_level_log = 0.0
+
+        p = params
+        self.gate = AudioGate(
+            threshold=p.vox_threshold,
+            attack_ms=p.vox_attack_ms,
+            release_ms=p.vox_release_ms,
+            hang_ms=p.vox_hang_ms,
+            noise_floor=NoiseFloorEstimator(window_s=p.window_s) if p.vox_adaptive else None,
+            open_ratio=p.open_ratio,
+            close_ratio=p.close_ratio,
+            max_threshold=p.max_threshold,
+        )
+        self.denoiser = None
+        self.agc = None
+        self.preroll_ms = tx_preroll_ms(cfg)
+        dtmf_cfg = cfg.get("dtmf", {})
+        self.dtmf_mute = bool(dtmf_cfg.get("enabled", False) and dtmf_cfg.get("mute", True))
+        self.preroll = None
+        self.squelch = None
+        self.dtmf = None
+        self.dtmf_commands = None
+        self._dtmf_hold = 0
+        self.clips = None
+        self.clip_schedule = None
+        self.limiter = p.limiter if p.limiter != "truepeak" else "tanh"
+        self.samplerate = None
+        self.blocksize = 0
+        self.metrics = None
+
+    def metric(self, base):
+        return f"{base}.{self.name}" if self.name else base
+
+    def set_params(self, params):
+        """Swap in a new snapshot; the audio thread adopts it at its next block."""
+        old = self.params
+        if params == old:
+            return False
+        changes = [
+            f"{k}={getattr(old, k)}->{getattr(params, k)}"
+            for k in params._fields
+            if getattr(old, k) != getattr(params, k)
+        ]
+        self.params = params
+        logger.info(f"{self.label}Live update: " + ", ".join(changes))
+        return True
+
+    def step_gain(self, step_db):
+        """Scale tx_gain by step_db; like a live update, it lasts until the next reload."""
+        gain = self.params.tx_gain * 10.0 ** (step_db / 20.0)
+        self.set_params(self.params._replace(tx_gain=round(gain, 6)))
+
+    def sync_params(self):
+        """Audio thread only: adopt a swapped snapshot. Returns True if it changed."""
+        p = self.params
+        prev = self.active_params
+        if p is prev:
+            return False
+        self.active_params = p
+
+        gate = self.gate
+        gate.configure(
+            p.vox_threshold,
+            p.vox_attack_ms,
+            p.vox_release_ms,
+            p.vox_hang_ms,
+            p.open_ratio,
+            p.close_ratio,
+            p.max_threshold,
+        )
+        if p.vox_adaptive != prev.vox_adaptive or p.window_s != prev.window_s:
+            old = gate.noise_floor
+            gate.noise_floor = None
+            if p.vox_adaptive:
+                estimator = NoiseFloorEstimator(window_s=p.window_s)
+                if old is not None and old.floor is not None:
+                    estimator.seed(old.floor)
+                gate.noise_floor = estimator
+        if gate.active and not p.vox_enabled:
+            gate.reset()
+        if self.samplerate is not None and any(
+            getattr(p, f) != getattr(prev, f) for f in DENOISE_FIELDS
+        ):
+            self.build_denoiser(keep=p.denoise_frame_ms == prev.denoise_frame_ms)
+        if self.samplerate is not None and (p.agc_enabled, p.agc) != (prev.agc_enabled, prev.agc):
+            self.build_agc(prev)
+        if self.samplerate is not None and p.limiter != prev.limiter:
+            self.build_limiter()
+        return True
+
+    def build_limiter(self):
+        """Soft-clip engines are stateless names; truepeak needs a look-ahead instance."""
+        engine = self.active_params.limiter
+        self.limiter = TruePeakLimiter(self.samplerate) if engine == "truepeak" else engine
+
+    def build_agc(self, prev=None):
+        """(Re)build the AGC; a change that keeps its buffer sizes is applied in place."""
+        p = self.active_params
+        if not p.agc_enabled:
+            self.agc = None
+            return
+        settings = dict(zip(AGC_SETTINGS, p.agc))
+        if prev is not None and self.agc is not None:
+            old = dict(zip(AGC_SETTINGS, prev.agc))
+            buffers = ("lookahead_ms", "sub_block_ms")
+            if all(settings[k] == old[k] for k in buffers):
+                self.agc.configure(**{k: v for k, v in settings.items() if k not in buffers})
+                return
+        self.agc = LookaheadAgc(self.samplerate, **settings)
+
+    def build_denoiser(self, keep=False):
+        """(Re)build the spectral gate for the stream rate; keep the old one if the frame fits."""
+        p = self.active_params
+        if not p.denoise_enabled:
+            self.denoiser = None
+            return
+        if keep and self.denoiser is not None:
+            self.denoiser.configure(
+                p.denoise_reduction_db, p.denoise_threshold, p.denoise_learn_s, p.denoise_budget
+            )
+            return
+        self.denoiser = SpectralGate(
+            self.samplerate,
+            frame_ms=p.denoise_frame_ms,
+            blocksize=self.blocksize,
+            reduction_db=p.denoise_reduction_db,
+            threshold=p.denoise_threshold,
+            learn_s=p.denoise_learn_s,
+            budget=p.denoise_budget,
+        )
+
+    def prepare(self, samplerate, blocksize=0):
+        """Bind to a started stream's rate and block size."""
+        self.samplerate = int(samplerate)
+        self.blocksize = int(blocksize or 0)
+        self.build_denoiser()
+        self.build_agc()
+        self.build_limiter()
+        self.preroll = None
+        if self.preroll_ms > 0:
+            self.preroll = DelayLine(round(self.preroll_ms * self.samplerate / 1000.0))
+        self.squelch = build_squelch(self.cfg.get("squelch", {}), self.samplerate)
+        self.gate.condition = self.squelch
+        built = build_clips(self.cfg.get("clips", {}), self.samplerate, self.preroll_ms)
+        self.clips, self.clip_schedule = built or (None, None)
+        built = build_dtmf(
+            self.cfg.get("dtmf", {}), self.samplerate, self.actions, label=self.label,
+            clips=tuple(self.clips.clips) if self.clips is not None else (),
+        )
+        self.dtmf, self.dtmf_commands = built or (None, None)
+        self._dtmf_hold = 0
+
+    def detect(self, mono):
+        """Audio thread: feed squelch and DTMF the raw input, then return it denoised."""
+        if self.squelch is not None:
+            self.squelch.process(mono)
+        if self.dtmf is not None:
+            self.dtmf.process(mono)
+        if self.denoiser is not None:
+            return self.denoise(mono)
+        return mono
+
+    def denoise(self, mono):
+        """Audio thread: spectral-gate a 1-D block; learns the noise only while VOX is closed."""
+        d = self.denoiser
+        if d is None or d.bypassed:
+            return mono
+        try:
+            out = d.process(mono, learn=not self.gate.active)
+        except Exception as e:
+            logger.error(f"{self.label}TX denoise failed, disabling it: {e}")
+            self.denoiser = None
+            return mono
+        if self.metrics is not None:
+            self.metrics.observe(self.metric("denoise_ms"), d.last_ms)
+            if d.bypassed:
+                self.metrics.inc(self.metric("denoise_bypassed"))
+        if d.bypassed:
+            logger.warning(
+                f"{self.label}TX denoise over its CPU budget ({d.last_ms:.2f}ms per block); "
+                "bypassing it until the next settings change"
+            )
+        return out
+
+    def shape(self, indata, outdata):
+        """Audio thread: run the whole chain on a mono stream; returns the input level."""
+        p = self.active_params
+        if self.squelch is not None or self.dtmf is not None or self.denoiser is not None:
+            mono = indata[:, 0] if indata.shape[1] == 1 else indata.mean(axis=1)
+            mono = self.detect(mono)
+            if self.denoiser is not None:
+                indata = mono.reshape(-1, 1)
+        level = rms_level(indata)
+        try:
+            shaped = sanitize_audio(
+                indata,
+                tx_gain=self.block_gain(len(indata)),
+                limit=p.limit,
+                dc_block=p.dc_block,
+                agc=self.agc,
+                limiter=self.limiter,
+            )
+            if self.preroll is not None:
+                self.preroll.process(shaped[:, 0], outdata[:, 0])
+            else:
+                outdata[:] = shaped
+            if self.dtmf_mute and self.dtmf is not None:
+                self.mute_dtmf(outdata[:, 0])
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.inc("shaping_errors")
+            logger.error(f"{self.label}Audio shaping failed: {e}")
+            zero_out(outdata)
+        return level
+
+    def finish(self, shaped, out):
+        """Audio thread: delay an already shaped column into out and mute DTMF in it."""
+        if self.preroll is not None:
+            self.preroll.process(shaped, out)
+        if self.dtmf_mute and self.dtmf is not None:
+            self.mute_dtmf(out)
+
+    def mute_dtmf(self, out):
+        """
+        Audio thread: silence out while a detected digit, or an entry that is
+        on its way to a valid PIN and command, is still passing through the
+        pre-roll delay line, so neither reaches Zello.
+        """
+        if self.dtmf.tone or self.dtmf_commands.entering(time.monotonic()):
+            # Keep muting until what is queued behind the delay has played out.
+            self._dtmf_hold = self.preroll.frames + len(out)
+        if self._dtmf_hold > 0:
+            self._dtmf_hold -= len(out)
+            out[:] = 0.0
+
+    def block_gain(self, frames):
+        """Gain for this block; after a change, ramp across the block so the step doesn't click."""
+        target = self.active_params.tx_gain
+        if self._gain == target:
+            return target
+        ramp = np.linspace(self._gain, target, frames + 1, dtype=np.float32)[1:]
+        self._gain = target
+        return ramp
+
+    def maybe_log_level(self, level):
+        if not self.active_params.vox_log_levels:
+            return
+        now = time.monotonic()
+        if now - self._last_level_log >= 0.25:
+            logger.info(f"{self.label}VOX level={level:.6f}")
+            self._last_level_log = now
+
+    def gate_level(self, level, now=None):
+        """Run VOX on a block level; returns the gate's "start"/"stop" action or None."""
+        self.maybe_log_level(level)
+        if not self.active_params.vox_enabled:
+            return None
+        action = self.gate.process(level, now=now)
+        if self.gate.noise_floor is not None and self.metrics is not None:
+            self.metrics.set(self.metric("noise_floor"), self.gate.noise_floor.floor)
+            self.metrics.set(self.metric("vox_open_threshold"), self.gate.open_threshold)
+            self.metrics.set(self.metric("vox_close_threshold"), self.gate.close_threshold)
+        return action
+
+
+class SplitChains:
+    """
+    Runs several chains over one multi-channel stream, one input and output
+    column each, shaping the whole block as a single 2-D array per callback.
+    """
+
+    def __init__(self, chains, input_channels, output_channels, label=""):
+        self.chains = list(chains)
+        self.label = label
+        self.metrics = None
+        self.in_map = np.array(input_channels, dtype=np.intp)
+        self.out_map = np.array(output_channels, dtype=np.intp)
+        if len(set(self.out_map.tolist())) != len(self.out_map):
+            raise RuntimeError("channel_map output_channel values must be unique")
+        self.in_channels = int(self.in_map.max()) + 1
+        self.out_channels = int(self.out_map.max()) + 1
+        self.gains = self._shaping_arrays()
+        self.fill_unmapped = self.out_channels > len(self.chains)
+
+    def _shaping_arrays(self):
+        params = [c.active_params for c in self.chains]
+        self.limits = np.array([p.limit for p in params], dtype=np.float32)
+        self.dc_mask = np.array([1.0 if p.dc_block else 0.0 for p in params], dtype=np.float32)
+        return np.array([p.tx_gain for p in params], dtype=np.float32)
+
+    def shape(self, indata, outdata, changed=False):
+        """Audio thread: shape every column; returns the input level of each chain."""
+        block = indata[:, self.in_map]
+        for i, chain in enumerate(self.chains):
+            if chain.squelch is not None or chain.dtmf is not None or chain.denoiser is not None:
+                block[:, i] = chain.detect(block[:, i])
+        levels = rms_levels(block)
+        gains = self.gains
+        if changed:
+            target = self._shaping_arrays()
+            if not np.array_equal(target, self.gains):
+                gains = np.linspace(self.gains, target, len(block) + 1, dtype=np.float32)[1:]
+                self.gains = target
+        try:
+            agcs = [c.agc for c in self.chains]
+            shaped = sanitize_channels(
+                block, gains, self.limits, self.dc_mask,
+                agcs=agcs if any(a is not None for a in agcs) else None,
+                limiters=[c.limiter for c in self.chains],
+            )
+            if self.fill_unmapped:
+                outdata.fill(0)
+            outdata[:, self.out_map] = shaped
+            for i, chain in enumerate(self.chains):
+                chain.finish(shaped[:, i], outdata[:, self.out_map[i]])
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.inc("shaping_errors")
+            logger.error(f"{self.label}Audio shaping failed: {e}")
+            zero_out(outdata)
+        return levels
@@ -0,0 +1,797 @@
+import base64
+import collections
+import hashlib
+import json
+import logging
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import opuslib
+except Exception:
+    opuslib = None
+
+try:
+    from .dsp import Resampler
+except ImportError:
+    from dsp import Resampler
+
+logger = logging.getLogger("zpttlink")
+
+DEFAULT_URL = "wss://zello.io/ws"
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+FRAME_MS = (20, 40, 60)
+AUDIO_PACKET = 0x01
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+def _xor(payload, mask):
+    n = len(payload)
+    if not n:
+        return payload
+    # XOR as one big integer: far cheaper than a per-byte loop in Python.
+    key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+    return (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big")
+
+
+class WebSocket:
+    """
+    Minimal RFC 6455 endpoint: enough for the Zello Channel API (text and
+    binary messages, ping/pong, close) without another dependency. Clients
+    mask what they send, servers (StandInServer) do not. send() is safe
+    from several threads; recv() belongs to one reader.
+    """
+
+    def __init__(self, sock, buffered=b"", mask=True):
+        self.sock = sock
+        self.buf = bytearray(buffered)
+        self.mask = mask
+        self.send_lock = threading.Lock()
+        self.closed = False
+
+    @classmethod
+    def connect(cls, url, timeout=5.0):
+        u = urlparse(url)
+        if u.scheme not in ("ws", "wss"):
+            raise RuntimeError(f"unsupported websocket URL: {url}")
+        port = u.port or (443 if u.scheme == "wss" else 80)
+        sock = socket.create_connection((u.hostname, port), timeout=timeout)
+        try:
+            if u.scheme == "wss":
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=u.hostname)
+            key = base64.b64encode(os.urandom(16)).decode("ascii")
+            path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+            sock.sendall((
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {u.hostname}:{port}\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\n"
+                "Sec-WebSocket-Version: 13\r\n\r\n"
+            ).encode("ascii"))
+            response = b""
+            while b"\r\n\r\n" not in response:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    raise RuntimeError("websocket handshake: connection closed")
+                response += chunk
+            head, rest = response.split(b"\r\n\r\n", 1)
+            lines = head.decode("latin-1").split("\r\n")
+            if " 101 " not in lines[0] + " ":
+                raise RuntimeError(f"websocket handshake refused: {lines[0]}")
+            headers = {
+                k.strip().lower(): v.strip() for k, _, v in (ln.partition(":") for ln in lines[1:])
+            }
+            if headers.get("sec-websocket-accept") != ws_accept(key):
+                raise RuntimeError("websocket handshake: bad Sec-WebSocket-Accept")
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            sock.close()
+            raise
+        return cls(sock, rest)
+
+    def send(self, payload, opcode=OP_TEXT):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        n = len(payload)
+        bit = 0x80 if self.mask else 0
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, bit | n)
+        elif n < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, bit | 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, bit | 127, n)
+        if self.mask:
+            mask = os.urandom(4)
+            header += mask
+            payload = _xor(payload, mask)
+        with self.send_lock:
+            self.sock.sendall(header + payload)
+
+    def send_binary(self, payload):
+        self.send(payload, OP_BINARY)
+
+    def _read(self, n):
+        while len(self.buf) < n:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("websocket closed by peer")
+            self.buf += chunk
+        data = bytes(self.buf[:n])
+        del self.buf[:n]
+        return data
+
+    def _frame(self):
+        b0, b1 = self._read(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self._read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self._read(8))[0]
+        mask = self._read(4) if b1 & 0x80 else None
+        payload = self._read(n)
+        if mask:
+            payload = _xor(payload, mask)
+        return bool(b0 & 0x80), b0 & 0x0F, payload
+
+    def recv(self):
+        """Next data message as (opcode, payload); raises ConnectionError once closed."""
+        message = None
+        opcode = None
+        while True:
+            fin, op, payload = self._frame()
+            if op == OP_PING:
+                self.send(payload, OP_PONG)
+                continue
+            if op == OP_PONG:
+                continue
+            if op == OP_CLOSE:
+                self.close()
+                raise ConnectionError("websocket closed by peer")
+            if op != OP_CONT:
+                opcode, message = op, bytearray()
+            if message is None:
+                continue
+            message += payload
+            if fin:
+                data = bytes(message)
+                return opcode, data.decode("utf-8") if opcode == OP_TEXT else data
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.send(struct.pack("!H", 1000), OP_CLOSE)
+        except Exception:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        self.sock.close()
+
+
+def codec_header(samplerate, frames_per_packet=1, frame_ms=60):
+    """Zello's base64 codec header: rate (u16 LE), frames per packet, frame length in ms."""
+    return base64.b64encode(struct.pack("<HBB", samplerate, frames_per_packet, frame_ms)).decode()
+
+
+def parse_codec_header(text):
+    return struct.unpack("<HBB", base64.b64decode(text))
+
+
+def pack_audio(stream_id, packet_id, payload):
+    return struct.pack("!BII", AUDIO_PACKET, stream_id, packet_id) + payload
+
+
+def unpack_audio(data):
+    kind, stream_id, packet_id = struct.unpack("!BII", data[:9])
+    if kind != AUDIO_PACKET:
+        raise ValueError(f"not an audio packet: type {kind}")
+    return stream_id, packet_id, data[9:]
+
+
+class OpusCodec:
+    """Mono Opus encoder/decoder pair on float32 frames (needs opuslib and libopus)."""
+
+    name = "opus"
+
+    def __init__(self, samplerate):
+        if opuslib is None:
+            raise RuntimeError("Zello streaming needs opuslib (pip install opuslib) and libopus")
+        if samplerate not in OPUS_RATES:
+            raise RuntimeError(f"Opus cannot run at {samplerate} Hz (use one of {OPUS_RATES})")
+        self.samplerate = samplerate
+        self.encoder = opuslib.Encoder(samplerate, 1, opuslib.APPLICATION_VOIP)
+        self.decoder = opuslib.Decoder(samplerate, 1)
+
+    def encode(self, frame):
+        return self.encoder.encode_float(frame.tobytes(), len(frame))
+
+    def decode(self, data, frame_size):
+        return np.frombuffer(self.decoder.decode_float(data, frame_size), dtype=np.float32)
+
+
+class RxBuffer:
+    """
+    Single-producer/single-consumer float32 ring for decoded RX audio.
+
+    The reader fills with silence on underrun; a writer that gets more
+    than capacity ahead drops the oldest audio so latency stays bounded.
+    """
+
+    def __init__(self, capacity):
+        self.data = np.zeros(max(int(capacity), 1), dtype=np.float32)
+        self.read_pos = 0
+        self.write_pos = 0
+        self.lock = threading.Lock()
+        self.underruns = 0
+        self.overruns = 0
+
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def write(self, x):
+        n = len(x)
+        size = len(self.data)
+        if n > size:
+            x = x[-size:]
+            n = size
+        with self.lock:
+            start = self.write_pos % size
+            first = min(n, size - start)
+            self.data[start:start + first] = x[:first]
+            self.data[:n - first] = x[first:]
+            self.write_pos += n
+            if self.write_pos - self.read_pos > size:
+                self.overruns += 1
+                self.read_pos = self.write_pos - size
+
+    def read_into(self, out):
+        n = len(out)
+        size = len(self.data)
+        with self.lock:
+            have = min(n, self.write_pos - self.read_pos)
+            start = self.read_pos % size
+            first = min(have, size - start)
+            out[:first] = self.data[start:start + first]
+            out[first:have] = self.data[:have - first]
+            self.read_pos += have
+        if have < n:
+            out[have:] = 0.0
+            if have:
+                self.underruns += 1
+        return have
+
+
+class ZelloClient:
+    """
+    Headless Zello Channel API client, replacing the emulator and hotkey.
+
+    request() only records the wanted TX state, like the hotkey worker; the
+    sender thread opens a stream on key-down, encodes pushed audio into
+    frame_ms Opus packets and closes the stream on key-up. Audio pushed
+    while the stream is being opened is held (up to max_queue_s), so the
+    first words are not lost. Incoming streams are decoded, resampled to the
+    local rate and handed to on_rx. A dropped connection is retried with
+    backoff; audio keyed while offline is counted and discarded.
+    """
+
+    RETRY_S = (0.5, 30.0)
+
+    def __init__(
+        self,
+        url=DEFAULT_URL,
+        channel="",
+        username="",
+        password="",
+        auth_token="",
+        codec_rate=16000,
+        frame_ms=60,
+        on_rx=None,
+        on_rx_state=None,
+        codec=OpusCodec,
+        timeout=5.0,
+        max_queue_s=2.0,
+        name="zello",
+    ):
+        if int(frame_ms) not in FRAME_MS:
+            raise RuntimeError(f"zello.frame_ms must be one of {FRAME_MS}")
+        self.url = url
+        self.channel = channel
+        self.credentials = {"username": username, "password": password, "auth_token": auth_token}
+        self.codec_rate = int(codec_rate)
+        self.frame_ms = int(frame_ms)
+        self.frame_size = self.codec_rate * self.frame_ms // 1000
+        self.codec_factory = codec
+        self.timeout = float(timeout)
+        self.max_queue_s = float(max_queue_s)
+        self.on_rx = on_rx
+        self.on_rx_state = on_rx_state
+        self.name = name
+
+        self.samplerate = None
+        self.encoder = None
+        self.tx_resampler = None
+        self.frame = np.zeros(self.frame_size, dtype=np.float32)
+        self.frame_fill = 0
+        self.audio = collections.deque()
+        self.queued = 0
+
+        self.cond = threading.Condition()
+        self.desired = False
+        self.stream_id = None
+        self.stopping = False
+        self.ws = None
+        self.seq = 0
+        self.pending = {}
+        self.rx = None
+
+        self.streams = 0
+        self.packets = 0
+        self.dropped = 0
+        self.errors = 0
+        self.rx_streams = 0
+        self.rx_packets = 0
+        self.encode_s = 0.0
+        self._thread = None
+
+    @property
+    def connected(self):
+        return self.ws is not None
+
+    def prepare(self, samplerate):
+        """Bind to the local stream rate; call before start() and again if the rate changes."""
+        self.samplerate = int(samplerate)
+        self.encoder = self.codec_factory(self.codec_rate)
+        self.tx_resampler = Resampler(self.samplerate, self.codec_rate)
+
+    def start(self):
+        if self.samplerate is None:
+            raise RuntimeError("ZelloClient.prepare() must be called before start()")
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def request(self, state):
+        with self.cond:
+            self.desired = bool(state)
+            self.cond.notify()
+
+    def push(self, block):
+        """Audio thread: queue a shaped block for the open (or opening) stream."""
+        if not self.desired:
+            return
+        if self.ws is None:
+            self.dropped += 1
+            return
+        with self.cond:
+            if self.queued > self.max_queue_s * self.samplerate:
+                self.dropped += 1
+                return
+            self.audio.append(np.array(block, dtype=np.float32).reshape(-1))
+            self.queued += len(self.audio[-1])
+            self.cond.notify()
+
+    def stop(self, timeout=2.0):
+        with self.cond:
+            self.stopping = True
+            self.desired = False
+            self.cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "streaming": self.stream_id is not None,
+            "streams": self.streams,
+            "packets": self.packets,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "rx_streams": self.rx_streams,
+            "rx_packets": self.rx_packets,
+            "encode_ms": 1000.0 * self.encode_s / self.packets if self.packets else 0.0,
+        }
+
+    # --- connection -------------------------------------------------------
+
+    def _call(self, command, wait=True, **fields):
+        ws = self.ws
+        if ws is None:
+            raise RuntimeError("not connected")
+        with self.cond:
+            self.seq += 1
+            seq = self.seq
+            slot = self.pending[seq] = [threading.Event(), None]
+        ws.send(json.dumps(dict(fields, command=command, seq=seq)))
+        if not wait:
+            return None
+        ok = slot[0].wait(self.timeout)
+        with self.cond:
+            self.pending.pop(seq, None)
+        reply = slot[1]
+        if not ok or reply is None:
+            raise RuntimeError(f"{command}: no reply from server")
+        if reply.get("error") or not reply.get("success", True):
+            raise RuntimeError(f"{command} failed: {reply.get('error', 'refused')}")
+        return reply
+
+    def _connect(self):
+        ws = WebSocket.connect(self.url, timeout=self.timeout)
+        self.ws = ws
+        reader = threading.Thread(
+            target=self._read_loop, args=(ws,), name=f"{self.name}-rx", daemon=True
+        )
+        reader.start()
+        fields = {k: v for k, v in self.credentials.items() if v}
+        try:
+            self._call("logon", channel=self.channel, **fields)
+        except Exception:
+            self._drop(ws)
+            raise
+        logger.info(f"Zello: logged on to '{self.channel}' at {self.url}")
+
+    def _drop(self, ws):
+        with self.cond:
+            if self.ws is ws:
+                self.ws = None
+                self.stream_id = None
+                self.cond.notify()
+            for slot in self.pending.values():
+                slot[0].set()
+        ws.close()
+
+    def _read_loop(self, ws):
+        try:
+            while True:
+                opcode, data = ws.recv()
+                if opcode == OP_BINARY:
+                    self._on_audio(data)
+                else:
+                    self._on_message(json.loads(data))
+        except Exception as e:
+            if self.ws is ws and not self.stopping:
+                logger.warning(f"Zello: connection lost: {e}")
+        self._end_rx()
+        self._drop(ws)
+
+    def _on_message(self, msg):
+        seq = msg.get("seq")
+        if seq is not None:
+            slot = self.pending.get(seq)
+            if slot is not None:
+                slot[1] = msg
+                slot[0].set()
+            return
+        command = msg.get("command")
+        if command == "on_stream_start":
+            self._start_rx(msg)
+        elif command == "on_stream_stop":
+            if self.rx is not None and self.rx["id"] == msg.get("stream_id"):
+                self._end_rx()
+        elif command == "on_channel_status":
+            logger.info(
+                f"Zello: channel '{msg.get('channel')}' {msg.get('status')}, "
+                f"{msg.get('users_online', '?')} online"
+            )
+        elif command == "on_error":
+            self.errors += 1
+            logger.error(f"Zello: server error: {msg.get('error')}")
+
+    # --- receive ----------------------------------------------------------
+
+    def _start_rx(self, msg):
+        self._end_rx()
+        try:
+            rate, frames, frame_ms = parse_codec_header(msg["codec_header"])
+            if msg.get("codec", "opus") != self.encoder.name:
+                raise RuntimeError(f"unsupported codec {msg.get('codec')}")
+            self.rx = {
+                "id": msg.get("stream_id"),
+                "from": msg.get("from"),
+                "decoder": self.codec_factory(rate),
+                "frame_size": rate * frame_ms * frames // 1000,
+                "resampler": Resampler(rate, self.samplerate),
+            }
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Zello: cannot receive stream from {msg.get('from')}: {e}")
+            return
+        self.rx_streams += 1
+        logger.info(f"Zello: RX from {self.rx['from']}")
+        if self.on_rx_state is not None:
+            self.on_rx_state(True, self.rx["from"])
+
+    def _end_rx(self):
+        rx, self.rx = self.rx, None
+        if rx is not None and self.on_rx_state is not None:
+            self.on_rx_state(False, rx["from"])
+
+    def _on_audio(self, data):
+        rx = self.rx
+        try:
+            stream_id, _, payload = unpack_audio(data)
+        except ValueError:
+            return
+        if rx is None or stream_id != rx["id"]:
+            return
+        try:
+            pcm = rx["decoder"].decode(payload, rx["frame_size"])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Zello: RX decode failed: {e}")
+            return
+        self.rx_packets += 1
+        if self.on_rx is not None:
+            self.on_rx(rx["resampler"].process(pcm))
+
+    # --- transmit ---------------------------------------------------------
+
+    def _open_stream(self):
+        reply = self._call(
+            "start_stream",
+            type="audio",
+            codec=self.encoder.name,
+            codec_header=codec_header(self.codec_rate, 1, self.frame_ms),
+            packet_duration=self.frame_ms,
+        )
+        self.stream_id = int(reply["stream_id"])
+        self.streams += 1
+        self.frame_fill = 0
+        logger.info(f"Zello: TX stream {self.stream_id} open")
+
+    def _close_stream(self):
+        stream_id, self.stream_id = self.stream_id, None
+        if self.frame_fill:
+            self.frame[self.frame_fill:] = 0.0
+            self._send_frame(stream_id)
+        self.frame_fill = 0
+        self._call("stop_stream", wait=False, stream_id=stream_id)
+        logger.info(f"Zello: TX stream {stream_id} closed")
+
+    def _send_frame(self, stream_id):
+        started = time.perf_counter()
+        packet = self.encoder.encode(self.frame)
+        self.encode_s += time.perf_counter() - started
+        self.ws.send_binary(pack_audio(stream_id, 0, packet))
+        self.packets += 1
+
+    def _send_audio(self, block):
+        x = self.tx_resampler.process(block)
+        while len(x):
+            take = min(len(x), self.frame_size - self.frame_fill)
+            self.frame[self.frame_fill:self.frame_fill + take] = x[:take]
+            self.frame_fill += take
+            x = x[take:]
+            if self.frame_fill == self.frame_size:
+                self._send_frame(self.stream_id)
+                self.frame_fill = 0
+
+    def _next_block(self):
+        with self.cond:
+            if not self.audio:
+                return None
+            block = self.audio.popleft()
+            self.queued -= len(block)
+            return block
+
+    def _run(self):
+        retry = self.RETRY_S[0]
+        while True:
+            with self.cond:
+                if self.stopping:
+                    break
+            if self.ws is None:
+                try:
+                    self._connect()
+                    retry = self.RETRY_S[0]
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Zello: connect failed: {e}; retrying in {retry:.1f}s")
+                    with self.cond:
+                        self.audio.clear()
+                        self.queued = 0
+                        self.cond.wait_for(lambda: self.stopping, timeout=retry)
+                    retry = min(retry * 2.0, self.RETRY_S[1])
+                continue
+
+            with self.cond:
+                while (
+                    self.ws is not None
+                    and not self.stopping
+                    and self.desired == (self.stream_id is not None)
+                    and not (self.audio and self.stream_id is not None)
+                ):
+                    self.cond.wait()
+                desired = self.desired
+                if not desired and self.stream_id is None:
+                    # Keyed and released before the stream opened: nothing to send.
+                    self.audio.clear()
+                    self.queued = 0
+            if self.ws is None:
+                continue
+
+            if desired and self.stream_id is None:
+                try:
+                    self._open_stream()
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Zello: TX refused: {e}")
+                    # Give up on this transmission; the next key-down tries again.
+                    with self.cond:
+                        self.desired = False
+                        self.audio.clear()
+                        self.queued = 0
+                    continue
+
+            try:
+                while self.stream_id is not None:
+                    block = self._next_block()
+                    if block is None:
+                        break
+                    self._send_audio(block)
+                if not desired and self.stream_id is not None:
+                    self._close_stream()
+                    with self.cond:
+                        self.audio.clear()
+                        self.queued = 0
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Zello: TX failed: {e}")
+                if self.ws is not None:
+                    self._drop(self.ws)
+
+        ws = self.ws
+        if ws is not None:
+            try:
+                if self.stream_id is not None:
+                    self._close_stream()
+            except Exception:
+                pass
+            self._drop(ws)
+
+
+class StandInServer:
+    """
+    Local stand-in for the Zello server, for testing a gateway offline
+    (point zello.url at .url) and for the bench. It accepts any logon,
+    hands out stream ids and counts audio packets. With echo=True each
+    finished TX stream is played back as an incoming stream from "echo",
+    which exercises the RX path.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, echo=False):
+        self.echo = echo
+        self.listener = socket.create_server((host, port))
+        self.host, self.port = self.listener.getsockname()[:2]
+        self.clients = []
+        self.streams = 0
+        self.packets = 0
+        self.bytes = 0
+        self._next_id = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept, name="zello-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.listener.close()
+        for ws in list(self.clients):
+            ws.close()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _handshake(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("client left during handshake")
+            request += chunk
+        head, rest = request.split(b"\r\n\r\n", 1)
+        key = ""
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n"
+        ).encode("ascii"))
+        return WebSocket(sock, rest, mask=False)
+
+    def _serve(self, sock):
+        try:
+            ws = self._handshake(sock)
+        except Exception:
+            sock.close()
+            return
+        self.clients.append(ws)
+        recorded = []
+        header = None
+        try:
+            while True:
+                opcode, data = ws.recv()
+                if opcode == OP_BINARY:
+                    self.packets += 1
+                    self.bytes += len(data)
+                    if self.echo:
+                        recorded.append(unpack_audio(data)[2])
+                    continue
+                msg = json.loads(data)
+                command = msg.get("command")
+                reply = {"seq": msg.get("seq"), "success": True}
+                if command == "logon":
+                    ws.send(json.dumps(reply))
+                    ws.send(json.dumps({
+                        "command": "on_channel_status",
+                        "channel": msg.get("channel"),
+                        "status": "online",
+                        "users_online": len(self.clients),
+                    }))
+                    continue
+                if command == "start_stream":
+                    self._next_id += 1
+                    self.streams += 1
+                    reply["stream_id"] = self._next_id
+                    header = msg.get("codec_header")
+                    recorded = []
+                ws.send(json.dumps(reply))
+                if command == "stop_stream" and self.echo and recorded:
+                    self._play(ws, header, recorded)
+        except Exception:
+            pass
+        finally:
+            if ws in self.clients:
+                self.clients.remove(ws)
+            ws.close()
+
+    def _play(self, ws, header, packets):
+        self._next_id += 1
+        stream_id = self._next_id
+        ws.send(json.dumps({
+            "command": "on_stream_start",
+            "type": "audio",
+            "codec": "opus",
+            "codec_header": header,
+            "stream_id": stream_id,
+            "from": "echo",
+        }))
+        for i, payload in enumerate(packets):
+            ws.send_binary(pack_audio(stream_id, i, payload))
+        ws.send(json.dumps({"command": "on_stream_stop", "stream_id": stream_id}))